@@ -2,8 +2,11 @@ import os
 import logging
 import uuid
 import io
+import json
+import multiprocessing
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_file, make_response
+from flask import (Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_file, make_response,
+                   Response, stream_with_context)
 import pandas as pd
 import pdfkit
 from werkzeug.utils import secure_filename
@@ -14,10 +17,18 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Import utility modules
-from utils.data_processing import process_data, perform_fft, detect_cycles
-from utils.visualization import create_time_series_plot, create_frequency_plot, create_forecast_plot, convert_numpy_to_lists
-from utils.decision_engine import generate_recommendation
-from utils.api_fetcher import fetch_stock_data
+from utils.data_processing import (process_data, perform_fft, detect_cycles, perform_stft, read_price_csv, FFTResult,
+                                   SPECTRUM_PRICE_TAIL)
+from utils.visualization import create_time_series_plot, create_frequency_plot, create_forecast_plot, create_spectrogram_plot, convert_numpy_to_lists
+from utils.decision_engine import generate_recommendation, TROUGH_WINDOW, SIGNAL_CUTOFF
+from utils.api_fetcher import (fetch_stock_data, fetch_processed_data, search_tickers, get_fetch_metrics,
+                               UPSTREAM_UNAVAILABLE)
+from utils.prefetch import get_ticker_analysis, get_live_cycles, live_cycles, PrefetchScheduler, PREFETCH_ENABLED
+from utils.batch_upload import analyze_long_format
+from utils.backtest import run_backtest, MAX_BACKTEST_TICKERS
+from utils.parameter_sweep import run_sweep, expand_grid, grid_size, PARAMS, SWEEP_METRICS, MAX_SWEEP_COMBINATIONS
+from utils.screener import (load_universe, run_screen, rank_screen, screen_records, stream_screen, screen_cache,
+                            SIDES, SCREENER_PERIOD)
 from utils.sentiment_analysis import get_market_sentiment, create_sentiment_gauge
 from utils.sample_data_generator import generate_sample_data_csv, get_sample_data_info, sample_ticker_symbol
 from utils.portfolio_analysis import (create_portfolio, fetch_portfolio_data, calculate_correlation_matrix,
@@ -69,11 +80,20 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 }
 
 # Import and initialize the database
-from models import db, Analysis, MarketSentiment, Portfolio
+from models import db, Analysis, MarketSentiment, Portfolio, generate_uuid, add_missing_columns
 db.init_app(app)
 
 with app.app_context():
     db.create_all()
+    add_missing_columns()
+
+# Warm caches for watched tickers in the background if configured
+# Worker processes of the shared process pools re-import the main module
+# (wsgi.py imports this app); only the serving process runs the scheduler
+prefetch_scheduler = None
+if PREFETCH_ENABLED and multiprocessing.parent_process() is None:
+    prefetch_scheduler = PrefetchScheduler(app)
+    prefetch_scheduler.start()
 
 # Configure uploads
 UPLOAD_FOLDER = 'uploads'
@@ -119,19 +139,16 @@ def upload_file():
 
         if file and allowed_file(file.filename):
             try:
-                # Read the CSV directly
-                df = pd.read_csv(file)
-
-                # Basic validation
-                if 'date' not in df.columns and 'Date' not in df.columns:
-                    flash('CSV must contain a date/Date column', 'danger')
+                # Read only the date and price columns
+                try:
+                    df = read_price_csv(file.stream)
+                except ValueError as e:
+                    flash(str(e), 'danger')
                     return redirect(url_for('index'))
 
-                # Check for price column
-                price_columns = [col for col in df.columns if 'price' in col.lower() or 'close' in col.lower()]
-                if not price_columns:
-                    flash('CSV must contain price/close data', 'danger')
-                    return redirect(url_for('index'))
+                # Long-format files with several tickers get one analysis per ticker
+                if 'ticker' in df.columns:
+                    return save_long_format_upload(df, secure_filename(file.filename))
 
                 # Process the data
                 df = process_data(df)
@@ -149,12 +166,14 @@ def upload_file():
                 # Create a new analysis record in the database
                 analysis = Analysis(
                     source_type='file',
+                    ticker=df.attrs.get('ticker'),
                     filename=secure_filename(file.filename),
                     dominant_cycles=convert_numpy_to_lists(dominant_cycles),
                     recommendation=convert_numpy_to_lists(recommendation),
                     time_series_plot=convert_numpy_to_lists(time_series_plot),
                     frequency_plot=convert_numpy_to_lists(frequency_plot),
-                    forecast_plot=convert_numpy_to_lists(forecast_plot)
+                    forecast_plot=convert_numpy_to_lists(forecast_plot),
+                    spectrum=fft_results.to_bytes(price_tail=SPECTRUM_PRICE_TAIL)
                 )
 
                 # Save to database
@@ -176,16 +195,11 @@ def upload_file():
     elif 'ticker' in request.form and request.form['ticker']:
         ticker = request.form['ticker'].strip().upper()
         try:
-            # Fetch data for the ticker
-            df = fetch_stock_data(ticker)
-
-            # Process the data
-            df = process_data(df)
-            fft_results = perform_fft(df)
-            dominant_cycles = detect_cycles(fft_results)
+            # Fetch, process and analyse the data (warmed by the prefetch scheduler)
+            df, fft_results, dominant_cycles, recommendation = get_ticker_analysis(ticker)
 
-            # Generate recommendation
-            recommendation = generate_recommendation(df, dominant_cycles)
+            if df.attrs.get('stale'):
+                flash(f"Market data provider is unavailable; showing cached prices as of {df.attrs.get('as_of', 'the last update')}", 'warning')
 
             # Create plots
             time_series_plot = create_time_series_plot(df)
@@ -200,7 +214,8 @@ def upload_file():
                 recommendation=convert_numpy_to_lists(recommendation),
                 time_series_plot=convert_numpy_to_lists(time_series_plot),
                 frequency_plot=convert_numpy_to_lists(frequency_plot),
-                forecast_plot=convert_numpy_to_lists(forecast_plot)
+                forecast_plot=convert_numpy_to_lists(forecast_plot),
+                spectrum=fft_results.to_bytes(price_tail=SPECTRUM_PRICE_TAIL)
             )
 
             # Save to database
@@ -218,6 +233,33 @@ def upload_file():
     flash('Please provide a file or ticker symbol', 'warning')
     return redirect(url_for('index'))
 
+def save_long_format_upload(df, filename):
+    """Analyse each ticker of a long-format upload and store the results in one bulk insert."""
+    results, errors = analyze_long_format(df)
+    if not results:
+        flash('No ticker in the file could be analysed', 'danger')
+        return redirect(url_for('index'))
+
+    created_at = datetime.utcnow()
+    rows = [dict(result, id=generate_uuid(), source_type='file', filename=filename, created_at=created_at)
+            for result in results]
+    db.session.bulk_insert_mappings(Analysis, rows)
+    db.session.commit()
+
+    summary = []
+    for row in rows:
+        cycles = row['dominant_cycles']
+        summary.append({
+            'id': row['id'],
+            'ticker': row['ticker'],
+            'action': row['recommendation'].get('action'),
+            'confidence_pct': row['recommendation'].get('confidence_pct'),
+            'top_cycle': cycles[0]['length'] if cycles else None,
+            'cycle_count': len(cycles)
+        })
+
+    return render_template('upload_summary.html', filename=filename, summary=summary, errors=errors)
+
 @app.route('/results/<analysis_id>')
 def results(analysis_id):
     """Display analysis results."""
@@ -228,7 +270,53 @@ def results(analysis_id):
         flash('Analysis not found or expired', 'warning')
         return redirect(url_for('index'))
 
-    return render_template('results.html', analysis=analysis.to_dict())
+    # Checked in SQL so the deferred spectrum blob is not loaded
+    has_spectrum = db.session.query(Analysis.spectrum.isnot(None)).filter(Analysis.id == analysis_id).scalar()
+    return render_template('results.html', analysis=analysis.to_dict(), has_spectrum=bool(has_spectrum))
+
+@app.route('/api/cycles/<analysis_id>', methods=['GET'])
+def cycles_api(analysis_id):
+    """API endpoint re-detecting an analysis' cycles from its stored spectrum.
+
+    Only detect_cycles and generate_recommendation run, so changing the
+    period range or thresholds needs no refetch or FFT.
+    """
+    analysis = Analysis.query.get(analysis_id)
+    if not analysis:
+        return jsonify({'error': 'Analysis not found'}), 404
+    if analysis.spectrum is None:
+        return jsonify({'error': 'No stored spectrum for this analysis; re-run it to enable re-thresholding'}), 409
+
+    try:
+        cycle_params = {
+            'min_period': float(request.args.get('min_period', 2)),
+            'max_period': float(request.args.get('max_period', 252)),
+            'strength_threshold': float(request.args.get('strength_threshold', 0.1)),
+            'mode': request.args.get('mode')
+        }
+        signal_params = {
+            'trough_window': float(request.args.get('trough_window', TROUGH_WINDOW)),
+            'signal_cutoff': float(request.args.get('signal_cutoff', SIGNAL_CUTOFF))
+        }
+        if cycle_params['mode'] not in (None, 'bins', 'peaks'):
+            raise ValueError("mode must be 'bins' or 'peaks'")
+        if cycle_params['min_period'] > cycle_params['max_period']:
+            raise ValueError("min_period must not exceed max_period")
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameters: {str(e)}'}), 400
+
+    fft_results = FFTResult.from_bytes(analysis.spectrum)
+    cycle_params['mode'] = cycle_params['mode'] or fft_results.cycle_mode
+    dominant_cycles = detect_cycles(fft_results, **cycle_params)
+    recommendation = generate_recommendation({'price': fft_results.prices}, dominant_cycles, **signal_params)
+
+    return jsonify({
+        'analysis_id': analysis_id,
+        **cycle_params,
+        **signal_params,
+        'dominant_cycles': convert_numpy_to_lists(dominant_cycles),
+        'recommendation': convert_numpy_to_lists(recommendation)
+    })
 
 @app.route('/api/plots/<analysis_id>/<plot_type>', methods=['GET'])
 def get_plot(analysis_id, plot_type):
@@ -448,7 +536,10 @@ def create_portfolio():
 
             try:
                 # Fetch data for the tickers (this will run, but we won't block portfolio creation on it)
-                stock_data = fetch_portfolio_data(tickers, period="2y")
+                stock_data, fetch_errors = fetch_portfolio_data(tickers, period="2y", return_errors=True)
+
+                if fetch_errors:
+                    flash(f"Could not fetch data for: {', '.join(sorted(fetch_errors))}", 'warning')
 
                 if stock_data:
                     # If we got data, update the portfolio with analysis results
@@ -761,9 +852,8 @@ def get_portfolio_plot(portfolio_id, plot_type):
             heatmap = create_correlation_heatmap(correlation_df)
             return jsonify(heatmap)
         elif plot_type == 'cycles' and portfolio.cycle_analysis:
-            # Fetch stock data and recreate cycle chart
-            stock_data = fetch_portfolio_data(portfolio.stocks, period="2y")
-            cycle_chart = create_portfolio_cycle_chart(portfolio.cycle_analysis, stock_data)
+            # The cycle chart is built from the stored analysis alone
+            cycle_chart = create_portfolio_cycle_chart(portfolio.cycle_analysis)
             return jsonify(cycle_chart)
         else:
             return jsonify({'error': 'Invalid plot type or plot not found'}), 400
@@ -890,6 +980,200 @@ def download_system_report():
         flash('Error generating PDF report: ' + str(e), 'danger')
         return redirect(url_for('system_report'))
 
+@app.route('/api/search_tickers', methods=['GET'])
+def search_tickers_api():
+    """API endpoint for ticker autocomplete."""
+    query = request.args.get('q', '')
+    try:
+        limit = min(int(request.args.get('limit', 10)), 20)
+    except ValueError:
+        limit = 10
+
+    return jsonify({'results': search_tickers(query, limit=limit)})
+
+@app.route('/api/spectrogram/<ticker>', methods=['GET'])
+def spectrogram_api(ticker):
+    """API endpoint for a ticker's rolling spectrum and per-window dominant cycles."""
+    period = request.args.get('period', '2y')
+    try:
+        window = int(request.args.get('window', 252))
+        step = int(request.args.get('step', 5))
+        top_n = min(int(request.args.get('top', 3)), 10)
+    except ValueError:
+        return jsonify({'error': 'window, step and top must be integers'}), 400
+    if top_n < 1:
+        return jsonify({'error': 'top must be at least 1'}), 400
+
+    try:
+        df = fetch_processed_data(ticker.upper(), period=period)
+        window = min(window, len(df))
+        stft_results = perform_stft(df, window=window, step=step, top_n=top_n)
+    except ValueError as e:
+        # Provider outages (open breaker, connection failures) are not the client's fault
+        status = 503 if isinstance(e.__cause__, UPSTREAM_UNAVAILABLE) else 400
+        return jsonify({'error': str(e)}), status
+
+    cycles = stft_results['cycles'].copy()
+    cycles['date'] = cycles['date'].dt.strftime('%Y-%m-%d')
+    response = {
+        'ticker': ticker.upper(),
+        'window': window,
+        'step': step,
+        'cycles': cycles.to_dict(orient='records')
+    }
+    if request.args.get('plot', 'true').lower() != 'false':
+        response['plot'] = create_spectrogram_plot(stft_results, ticker.upper())
+    return jsonify(response)
+
+@app.route('/api/live-cycles/<ticker>', methods=['GET'])
+def live_cycles_api(ticker):
+    """API endpoint for a ticker's dominant cycles, kept up to date bar by bar with a sliding DFT."""
+    try:
+        strength_threshold = float(request.args.get('strength_threshold', 0.1))
+    except ValueError:
+        return jsonify({'error': 'strength_threshold must be a number'}), 400
+
+    try:
+        cycles = get_live_cycles(ticker, strength_threshold=strength_threshold)
+    except ValueError as e:
+        status = 503 if isinstance(e.__cause__, UPSTREAM_UNAVAILABLE) else 400
+        return jsonify({'error': str(e)}), status
+
+    return jsonify({'ticker': ticker.upper(), 'dominant_cycles': convert_numpy_to_lists(cycles)})
+
+@app.route('/api/backtest', methods=['GET'])
+def backtest_api():
+    """API endpoint for walk-forward backtests of the cycle signals."""
+    tickers = [t for t in request.args.get('tickers', '').split(',') if t.strip()]
+    if not tickers:
+        return jsonify({'error': 'tickers is required'}), 400
+    if len(tickers) > MAX_BACKTEST_TICKERS:
+        return jsonify({'error': f'At most {MAX_BACKTEST_TICKERS} tickers per request'}), 400
+
+    try:
+        params = {
+            'window': int(request.args.get('window', 252)),
+            'step': int(request.args.get('step', 1)),
+            'horizon': int(request.args.get('horizon', 20)),
+            'cost_bps': float(request.args.get('cost_bps', 0)),
+            'allow_short': request.args.get('short', 'false').lower() == 'true'
+        }
+    except ValueError:
+        return jsonify({'error': 'window, step and horizon must be integers and cost_bps a number'}), 400
+
+    results, errors = run_backtest(tickers, period=request.args.get('period', '5y'), **params)
+    results = results.astype(object).where(results.notna(), None)
+    return jsonify({
+        'period': request.args.get('period', '5y'),
+        **params,
+        'results': results.reset_index().to_dict(orient='records'),
+        'errors': errors
+    })
+
+@app.route('/api/sweep', methods=['GET'])
+def sweep_api():
+    """API endpoint sweeping cycle-signal parameters against the backtest.
+
+    Grid parameters (min_period, max_period, strength_threshold,
+    trough_window, signal_cutoff) take comma-separated values; omitted ones
+    use the default grid.
+    """
+    tickers = [t for t in request.args.get('tickers', '').split(',') if t.strip()]
+    if not tickers:
+        return jsonify({'error': 'tickers is required'}), 400
+    if len(tickers) > MAX_BACKTEST_TICKERS:
+        return jsonify({'error': f'At most {MAX_BACKTEST_TICKERS} tickers per request'}), 400
+
+    metric = request.args.get('metric', 'sharpe')
+    group_by = request.args.get('group_by', 'sector')
+    if metric not in SWEEP_METRICS:
+        return jsonify({'error': f"metric must be one of {', '.join(SWEEP_METRICS)}"}), 400
+    if group_by not in ('sector', 'universe'):
+        return jsonify({'error': "group_by must be 'sector' or 'universe'"}), 400
+
+    try:
+        grid = expand_grid({name: [float(v) for v in request.args[name].split(',')]
+                            for name in PARAMS if request.args.get(name)})
+        params = {
+            'window': int(request.args.get('window', 252)),
+            'step': int(request.args.get('step', 5)),
+            'horizon': int(request.args.get('horizon', 20)),
+            'cost_bps': float(request.args.get('cost_bps', 0)),
+            'allow_short': request.args.get('short', 'false').lower() == 'true'
+        }
+    except ValueError as e:
+        return jsonify({'error': f'Invalid sweep parameters: {str(e)}'}), 400
+    if grid_size(grid) > MAX_SWEEP_COMBINATIONS:
+        return jsonify({'error': f'The grid has {grid_size(grid)} combinations, at most {MAX_SWEEP_COMBINATIONS} are allowed'}), 400
+
+    results, best, errors = run_sweep(tickers, period=request.args.get('period', '5y'), grid=grid,
+                                      metric=metric, group_by=group_by, **params)
+    best = best.astype(object).where(best.notna(), None)
+    response = {
+        'metric': metric,
+        'group_by': group_by,
+        'combinations': grid_size(grid),
+        'grid': grid,
+        'best': best.reset_index().to_dict(orient='records'),
+        'errors': errors
+    }
+    if request.args.get('details', 'false').lower() == 'true':
+        response['results'] = results.astype(object).where(results.notna(), None).to_dict(orient='records')
+    return jsonify(response)
+
+@app.route('/screener')
+def screener_page():
+    """Render the universe screener page."""
+    return render_template('screener.html', universe_size=len(load_universe()))
+
+@app.route('/api/screener', methods=['GET'])
+def screener_api():
+    """API endpoint ranking the configured universe by cycle signal.
+
+    With stream=true the response is newline-delimited JSON: progress
+    messages while batches are screened, then the page's rows and a summary.
+    """
+    period = request.args.get('period', SCREENER_PERIOD)
+    side = request.args.get('side', 'buy').lower()
+    action = request.args.get('action') or None
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = int(request.args.get('per_page', 50))
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+    if side not in SIDES:
+        return jsonify({'error': f"side must be one of {', '.join(SIDES)}"}), 400
+
+    tickers = load_universe()
+    if not tickers:
+        return jsonify({'error': 'The screening universe is empty'}), 404
+
+    if request.args.get('stream', 'false').lower() == 'true':
+        messages = stream_screen(tickers, period=period, side=side, action=action, page=page, per_page=per_page)
+        return Response(stream_with_context(json.dumps(message) + '\n' for message in messages),
+                        mimetype='application/x-ndjson')
+
+    scores, skipped = run_screen(tickers, period=period)
+    ranked = rank_screen(scores, side, action)
+    return jsonify({
+        'screened': len(scores),
+        'matches': len(ranked),
+        'skipped': len(skipped),
+        'page': page,
+        'per_page': per_page,
+        'results': screen_records(ranked, page, per_page)
+    })
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_api():
+    """API endpoint exposing cache and upstream-throttling counters for monitoring."""
+    metrics = get_fetch_metrics()
+    metrics['screen_cache'] = screen_cache.stats()
+    metrics['live_cycle_tickers'] = len(live_cycles)
+    if prefetch_scheduler is not None:
+        metrics['prefetch'] = prefetch_scheduler.status()
+    return jsonify(metrics)
+
 @app.route('/api/market-sentiment', methods=['GET'])
 def get_market_sentiment_api():
     """API endpoint to get market sentiment data."""
@@ -1,16 +1,56 @@
 import json
 import uuid
+import logging
 from datetime import datetime
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import deferred
 from sqlalchemy.dialects.postgresql import JSON
 
+logger = logging.getLogger(__name__)
+
 db = SQLAlchemy()
 
 def generate_uuid():
     return str(uuid.uuid4())
 
 
+def add_missing_columns():
+    """Add nullable columns that were added to the models after their tables were created.
+
+    db.create_all() only creates missing tables, so existing databases are
+    brought up to date here. Must run inside an application context. Safe to
+    run from several processes at once: a column another process added in
+    the meantime is skipped.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            # SQLite has no ADD COLUMN IF NOT EXISTS; a lost race shows up as an error there
+            if_not_exists = 'IF NOT EXISTS ' if db.engine.dialect.name == 'postgresql' else ''
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(text(
+                        f'ALTER TABLE {table.name} ADD COLUMN {if_not_exists}{column.name} {column_type}'
+                    ))
+            except DBAPIError:
+                columns = {c['name'] for c in inspect(db.engine).get_columns(table.name)}
+                if column.name not in columns:
+                    raise
+                logger.info(f"Column {table.name}.{column.name} was added by another process")
+                continue
+            logger.info(f"Added column {table.name}.{column.name}")
+
+
 class Analysis(db.Model):
     """Model for storing stock analysis data."""
     id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
@@ -24,6 +64,9 @@ class Analysis(db.Model):
     time_series_plot = db.Column(JSON)
     frequency_plot = db.Column(JSON)
     forecast_plot = db.Column(JSON)
+    # FFTResult.to_bytes blob (spectrum plus the last two prices), used to
+    # re-detect cycles without refetching; loaded only when accessed
+    spectrum = deferred(db.Column(db.LargeBinary, nullable=True))
     # Link to Portfolio (optional)
     portfolio_id = db.Column(db.String(36), db.ForeignKey('portfolio.id'), nullable=True)
     
@@ -0,0 +1,77 @@
+"""Parameter sweep of the cycle-signal settings.
+
+Backtests a grid of detect_cycles and recommendation settings across many
+tickers in parallel and prints the best setting per sector (or for the
+whole universe).
+
+Usage:
+    python parameter_sweep.py AAPL MSFT JNJ XOM
+    python parameter_sweep.py --universe --group-by universe --metric hit_rate
+    python parameter_sweep.py AAPL MSFT --grid strength_threshold=0.05,0.1,0.2 --output sweep.csv
+"""
+import argparse
+import logging
+
+import pandas as pd
+from dotenv import load_dotenv
+load_dotenv()
+
+from utils.backtest import BACKTEST_WORKERS
+from utils.parameter_sweep import run_sweep, expand_grid, grid_size, SWEEP_METRICS
+from utils.screener import load_universe
+
+
+def parse_grid(specs):
+    """Parse NAME=V1,V2,... options into a partial grid."""
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if not values:
+            raise argparse.ArgumentTypeError(f"Expected NAME=V1,V2,... but got {spec!r}")
+        grid[name.strip()] = [float(value) for value in values.split(',')]
+    return grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep cycle-signal parameters against the walk-forward backtest")
+    parser.add_argument('tickers', nargs='*', help="tickers to sweep")
+    parser.add_argument('--universe', action='store_true', help="sweep the configured screener universe")
+    parser.add_argument('--period', default='5y', help="history to replay")
+    parser.add_argument('--grid', action='append', default=[], metavar='NAME=V1,V2',
+                        help="values for one parameter (repeatable); others use the default grid")
+    parser.add_argument('--metric', default='sharpe', choices=SWEEP_METRICS, help="metric that picks the best setting")
+    parser.add_argument('--group-by', default='sector', choices=('sector', 'universe'))
+    parser.add_argument('--window', type=int, default=252, help="bars behind each decision")
+    parser.add_argument('--step', type=int, default=5, help="bars between decisions")
+    parser.add_argument('--horizon', type=int, default=20, help="bars ahead used for the hit rate")
+    parser.add_argument('--cost-bps', type=float, default=0.0, help="trading cost per unit of turnover")
+    parser.add_argument('--short', action='store_true', help="go short on SELL instead of flat")
+    parser.add_argument('--workers', type=int, default=BACKTEST_WORKERS, help="worker processes")
+    parser.add_argument('--output', help="write every ticker/setting result to this CSV file")
+    args = parser.parse_args()
+
+    tickers = load_universe() if args.universe else args.tickers
+    if not tickers:
+        parser.error("give tickers or --universe")
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        grid = expand_grid(parse_grid(args.grid))
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Sweeping {grid_size(grid)} settings over {len(tickers)} tickers...")
+
+    results, best, errors = run_sweep(
+        tickers, period=args.period, grid=grid, metric=args.metric, group_by=args.group_by,
+        max_workers=args.workers, window=args.window, step=args.step, horizon=args.horizon,
+        cost_bps=args.cost_bps, allow_short=args.short
+    )
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"Wrote {len(results)} rows to {args.output}")
+
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(best if not best.empty else "No results")
+    for ticker, message in errors.items():
+        print(f"{ticker}: {message}")
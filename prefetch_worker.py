@@ -0,0 +1,44 @@
+"""Standalone prefetch scheduler.
+
+Warms the shared price cache for every ticker referenced by a portfolio or
+a recent analysis, so web workers start from warm data.
+
+Usage:
+    python prefetch_worker.py           # run inside PREFETCH_WINDOWS forever
+    python prefetch_worker.py --once    # warm once and exit
+"""
+import os
+import argparse
+import logging
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# This process is the scheduler; don't also start the in-app one on import
+os.environ['PREFETCH_ENABLED'] = 'false'
+
+from app import app
+from utils.prefetch import PrefetchScheduler, PREFETCH_CONCURRENCY, PREFETCH_WINDOWS
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prefetch price data for watched tickers")
+    parser.add_argument('--once', action='store_true', help="warm all watched tickers once and exit")
+    parser.add_argument('--concurrency', type=int, default=PREFETCH_CONCURRENCY,
+                        help="maximum concurrent fetches")
+    parser.add_argument('--windows', default=PREFETCH_WINDOWS,
+                        help="comma-separated HH:MM-HH:MM UTC schedule windows")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    scheduler = PrefetchScheduler(app, windows=args.windows, concurrency=args.concurrency)
+
+    if args.once:
+        result = scheduler.run_once()
+        print(f"Warmed {len(result['warmed'])} tickers in {result['seconds']}s, {len(result['errors'])} errors")
+    else:
+        print(f"⏱️ Prefetch scheduler running in windows {args.windows} (UTC)...")
+        scheduler.start()
+        try:
+            scheduler.join()
+        except KeyboardInterrupt:
+            scheduler.stop()
@@ -144,13 +144,30 @@ document.addEventListener('DOMContentLoaded', function() {
     });
     
     // Ticker search autocomplete
-    // This would normally connect to a real API for stock symbols
-    // For demonstration purposes, we'll just have a simple example
     const tickerInput = document.getElementById('ticker-input');
-    if (tickerInput) {
+    const tickerList = document.getElementById('common-tickers');
+    if (tickerInput && tickerList) {
+        let searchTimer = null;
         tickerInput.addEventListener('input', function() {
-            // Real implementation would fetch suggestions from server
-            console.log('Would fetch suggestions for:', this.value);
+            const query = this.value.trim();
+            clearTimeout(searchTimer);
+            if (!query) return;
+
+            // Debounce so we only query once the user pauses typing
+            searchTimer = setTimeout(() => {
+                fetch(`/api/search_tickers?q=${encodeURIComponent(query)}`)
+                    .then(response => response.json())
+                    .then(data => {
+                        tickerList.innerHTML = '';
+                        data.results.forEach(result => {
+                            const option = document.createElement('option');
+                            option.value = result.ticker;
+                            option.textContent = result.company;
+                            tickerList.appendChild(option);
+                        });
+                    })
+                    .catch(error => console.error('Ticker search failed:', error));
+            }, 150);
         });
     }
     
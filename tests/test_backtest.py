@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.backtest import TRADING_DAYS_PER_YEAR, evaluate_signals
+
+PRICES = [100.0, 100.0, 110.0, 99.0, 99.0, 120.0]
+
+# Bar returns: 2: +10%, 3: -10%, 4: 0%, 5: +21/99
+SIGNALS = pd.DataFrame({
+    'bar': [1, 2, 3, 4],
+    'action': ['BUY', 'HOLD', 'SELL', 'HOLD']
+})
+
+
+def test_long_only_positions_and_costs():
+    result = evaluate_signals(PRICES, SIGNALS, horizon=1, cost_bps=100)
+
+    # Long for bars 2 and 3, flat for 4 and 5; 1% paid on entry and exit
+    expected_returns = [0.10 - 0.01, -0.10, -0.01, 0.0]
+    np.testing.assert_allclose(result['equity'], np.cumprod(1 + np.array(expected_returns)))
+    assert result['total_return'] == pytest.approx(1.09 * 0.90 * 0.99 - 1)
+    assert result['benchmark_return'] == pytest.approx(0.20)
+    assert result['max_drawdown'] == pytest.approx(1 - 0.90 * 0.99)
+
+    years = 4 / TRADING_DAYS_PER_YEAR
+    assert result['exposure'] == pytest.approx(0.5)
+    assert result['turnover'] == pytest.approx(2 / years)
+
+    # BUY at bar 1 was followed by a rise, SELL at bar 3 by no move
+    assert result['buy_signals'] == 1
+    assert result['sell_signals'] == 1
+    assert result['hit_rate'] == pytest.approx(0.5)
+
+
+def test_short_positions_and_costs():
+    result = evaluate_signals(PRICES, SIGNALS, horizon=1, allow_short=True, cost_bps=100)
+
+    # Flipping from long to short trades two units
+    expected_returns = [0.10 - 0.01, -0.10, -0.02, -21 / 99]
+    np.testing.assert_allclose(result['equity'], np.cumprod(1 + np.array(expected_returns)))
+    assert result['exposure'] == pytest.approx(1.0)
+    assert result['turnover'] == pytest.approx(3 / (4 / TRADING_DAYS_PER_YEAR))
+
+
+def test_no_trades_without_signals():
+    signals = pd.DataFrame({'bar': [1, 2, 3, 4], 'action': ['HOLD'] * 4})
+    result = evaluate_signals(PRICES, signals, cost_bps=100)
+
+    np.testing.assert_allclose(result['equity'], 1.0)
+    assert result['total_return'] == 0.0
+    assert result['turnover'] == 0.0
+    assert result['exposure'] == 0.0
+    assert result['hit_rate'] is None
+    assert result['sharpe'] is None
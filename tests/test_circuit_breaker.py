@@ -0,0 +1,120 @@
+import pytest
+
+from utils import circuit_breaker
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', clock)
+    return clock
+
+
+def _fail():
+    raise ConnectionError('upstream down')
+
+
+def _trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('test', failure_threshold=3, recovery_timeout=30)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+    assert breaker.state == circuit_breaker.CLOSED
+
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == circuit_breaker.OPEN
+
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        breaker.call(calls.append, 'x')
+    assert calls == []
+    assert breaker.stats()['rejected_count'] == 1
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker('test', failure_threshold=2, recovery_timeout=30)
+
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+
+    assert breaker.state == circuit_breaker.CLOSED
+
+
+def test_unlisted_errors_do_not_count_as_failures(clock):
+    breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=30,
+                             failure_exceptions=(ConnectionError,))
+
+    def unknown_ticker():
+        raise ValueError('No data found')
+
+    with pytest.raises(ValueError):
+        breaker.call(unknown_ticker)
+    assert breaker.state == circuit_breaker.CLOSED
+
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker('test', failure_threshold=2, recovery_timeout=30)
+    _trip(breaker)
+
+    clock.now += 29
+    assert breaker.state == circuit_breaker.OPEN
+    clock.now += 1
+    assert breaker.state == circuit_breaker.HALF_OPEN
+
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == circuit_breaker.CLOSED
+    assert breaker.stats()['consecutive_failures'] == 0
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker('test', failure_threshold=2, recovery_timeout=30)
+    _trip(breaker)
+
+    clock.now += 30
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == circuit_breaker.OPEN
+    assert breaker.stats()['opened_count'] == 2
+
+    # The recovery timeout restarts from the failed probe
+    clock.now += 29
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: 'ok')
+    clock.now += 1
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == circuit_breaker.CLOSED
+
+
+def test_only_one_probe_while_half_open(clock):
+    breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=30)
+    _trip(breaker)
+    clock.now += 30
+
+    def probe():
+        # A second caller arriving while the probe is in flight is rejected
+        with pytest.raises(CircuitOpenError):
+            breaker.call(lambda: 'second')
+        return 'probe'
+
+    assert breaker.call(probe) == 'probe'
+    assert breaker.state == circuit_breaker.CLOSED
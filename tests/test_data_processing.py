@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import (is_irregular_spacing, trading_day_positions, process_data, read_price_csv,
+                                   fft_method)
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'sample_stock_data.csv')
+
+
+def _nyse_closes(start='2023-01-02', end='2024-12-31'):
+    # Weekday closes at 16:00 New York time, spanning four DST changes
+    return pd.bdate_range(start, end, tz='America/New_York') + pd.Timedelta(hours=16)
+
+
+def test_tz_aware_exchange_calendar_across_dst_is_regular():
+    dates = _nyse_closes()
+    steps = np.diff(trading_day_positions(dates))
+    assert np.allclose(steps, 1)
+    assert not is_irregular_spacing(dates)
+    assert not is_irregular_spacing(pd.Series(dates))
+
+
+def test_tz_aware_calendar_with_holidays_is_regular():
+    dates = _nyse_closes().delete([10, 60, 120, 200, 300, 400])
+    assert not is_irregular_spacing(dates)
+
+
+def test_hourly_bars_are_irregular():
+    dates = pd.date_range('2024-03-04 09:30', periods=200, freq='h', tz='America/New_York')
+    assert is_irregular_spacing(dates)
+
+
+def test_calendar_day_series_is_regular():
+    dates = pd.date_range('2023-01-01', periods=400, freq='D')
+    positions = trading_day_positions(dates)
+    assert len(np.unique(positions)) == len(dates)
+    assert not is_irregular_spacing(dates)
+
+
+def test_sample_data_is_analysed_with_the_plain_fft():
+    df = process_data(read_price_csv(SAMPLE_CSV))
+    assert not df.attrs['irregular']
+    assert fft_method(df, 'fft') == 'fft'
@@ -0,0 +1,107 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from utils.frame_cache import FrameCache
+
+
+def _array(value, size=100):
+    # 100 float64 values = 800 bytes
+    return np.full(size, float(value))
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out waiting for the background refresh'
+        time.sleep(0.01)
+
+
+def test_evicts_least_recently_used_to_stay_within_bytes():
+    cache = FrameCache(max_bytes=2000, stale_seconds=60)
+    cache.put('a', _array(1))
+    cache.put('b', _array(2))
+    assert cache.get('a') is not None  # 'b' is now the least recently used
+
+    cache.put('c', _array(3))
+
+    assert cache.get('b') is None
+    assert cache.get('a')[0] == 1
+    assert cache.get('c')[0] == 3
+    stats = cache.stats()
+    assert stats['bytes'] == 1600
+    assert stats['evictions'] == 1
+
+
+def test_replacing_a_key_releases_its_bytes():
+    cache = FrameCache(max_bytes=2000, stale_seconds=60)
+    cache.put('a', _array(1))
+    cache.put('a', _array(2, size=200))
+
+    assert cache.stats()['bytes'] == 1600
+    assert cache.get('a')[0] == 2
+
+
+def test_values_larger_than_the_budget_are_not_cached():
+    cache = FrameCache(max_bytes=500, stale_seconds=60)
+    cache.put('a', _array(1))
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_callers_get_copies():
+    cache = FrameCache(max_bytes=10 ** 6, stale_seconds=60)
+    cache.put('a', pd.DataFrame({'price': [1.0, 2.0]}))
+    df = cache.get('a')
+    df['sma'] = 0.0
+    assert list(cache.get('a').columns) == ['price']
+
+
+def test_serves_stale_value_while_refreshing():
+    cache = FrameCache(max_bytes=10 ** 6, stale_seconds=60)
+    cache.put('a', _array(1), expires_at=datetime.utcnow() - timedelta(seconds=1))
+
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return _array(2)
+
+    assert cache.get_or_load('a', loader)[0] == 1
+    # A second stale read does not start another refresh
+    assert cache.get_or_load('a', loader)[0] == 1
+    assert cache.get_fresh('a') is None
+
+    release.set()
+    _wait_for(lambda: cache.get_fresh('a') is not None)
+
+    assert cache.get_fresh('a')[0] == 2
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats['stale_hits'] == 2
+    assert stats['refreshes'] == 1
+
+
+def test_failed_refresh_keeps_stale_value():
+    cache = FrameCache(max_bytes=10 ** 6, stale_seconds=60)
+    cache.put('a', _array(1), expires_at=datetime.utcnow() - timedelta(seconds=1))
+
+    def loader():
+        raise ConnectionError('upstream down')
+
+    assert cache.get_or_load('a', loader)[0] == 1
+    _wait_for(lambda: cache.stats()['refresh_failures'] == 1)
+    assert cache.get('a')[0] == 1
+
+
+def test_loads_synchronously_after_the_stale_window():
+    cache = FrameCache(max_bytes=10 ** 6, stale_seconds=60)
+    cache.put('a', _array(1), expires_at=datetime.utcnow() - timedelta(seconds=61))
+
+    assert cache.get_or_load('a', lambda: _array(2))[0] == 2
+    assert cache.stats()['stale_hits'] == 0
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from utils.lomb_scargle import extirpolate, lomb_scargle
+
+
+def _least_squares_fit(t, y, frequency):
+    """Fit y ~ c cos(2 pi f t) + s sin(2 pi f t) directly.
+
+    Returns (power, amplitude, phase) in lomb_scargle's conventions.
+    """
+    y = y - y.mean()
+    omega = 2 * np.pi * frequency
+    basis = np.column_stack([np.cos(omega * t), np.sin(omega * t)])
+    (c, s), *_ = np.linalg.lstsq(basis, y, rcond=None)
+    residual = y - basis @ np.array([c, s])
+    power = 1 - np.dot(residual, residual) / np.dot(y, y)
+    # c cos(wt) + s sin(wt) = A cos(wt + phase)
+    return power, np.hypot(c, s), np.arctan2(-s, c)
+
+
+@pytest.fixture
+def irregular_series():
+    rng = np.random.default_rng(7)
+    t = np.sort(rng.uniform(0, 400, 300))
+    t -= t[0]
+    y = 3 * np.cos(2 * np.pi * t / 25 + 0.8) + np.cos(2 * np.pi * t / 9) + rng.normal(0, 0.5, len(t))
+    return t, y + 100
+
+
+def test_matches_brute_force_least_squares(irregular_series):
+    t, y = irregular_series
+    df = 1 / (2 * t[-1])
+    n_freq = int(0.45 / df)
+
+    frequencies, power, amplitudes, phases = lomb_scargle(t, y, df, n_freq)
+
+    expected = np.array([_least_squares_fit(t, y, f) for f in frequencies])
+    np.testing.assert_allclose(power, expected[:, 0], atol=5e-5)
+    np.testing.assert_allclose(amplitudes, expected[:, 1], rtol=1e-3, atol=1e-4)
+
+    # Phases are only meaningful where there is a fitted sinusoid
+    significant = expected[:, 1] > 0.05
+    phase_error = np.angle(np.exp(1j * (phases - expected[:, 2])))
+    np.testing.assert_allclose(phase_error[significant], 0, atol=1e-3)
+
+
+def test_matches_brute_force_on_whole_day_samples():
+    # Trading-day positions with gaps, as perform_lomb_scargle passes them
+    rng = np.random.default_rng(11)
+    t = np.flatnonzero(rng.uniform(size=500) > 0.2).astype(float)
+    t -= t[0]
+    y = np.cos(2 * np.pi * t / 40) + rng.normal(0, 0.3, len(t))
+    df = 1 / t[-1]
+    n_freq = int(0.45 / df)
+
+    frequencies, power, _, _ = lomb_scargle(t, y, df, n_freq)
+
+    expected = [_least_squares_fit(t, y, f)[0] for f in frequencies]
+    np.testing.assert_allclose(power, expected, atol=5e-5)
+
+
+def test_recovers_dominant_cycle(irregular_series):
+    t, y = irregular_series
+    df = 1 / (2 * t[-1])
+    frequencies, power, amplitudes, phases = lomb_scargle(t, y, df, int(0.45 / df))
+
+    peak = np.argmax(power)
+    assert 1 / frequencies[peak] == pytest.approx(25, rel=0.05)
+    assert amplitudes[peak] == pytest.approx(3, rel=0.1)
+
+
+def test_extirpolation_preserves_polynomial_sums():
+    rng = np.random.default_rng(3)
+    x = rng.uniform(0, 60, 50)
+    y = rng.normal(size=50)
+    grid = extirpolate(x, y, 64)
+
+    for f in (lambda v: np.ones_like(v), lambda v: v, lambda v: v ** 2, lambda v: v ** 3):
+        assert np.dot(grid, f(np.arange(64.0))) == pytest.approx(np.dot(y, f(x)), rel=1e-9, abs=1e-6)
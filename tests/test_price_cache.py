@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import api_fetcher, price_cache, shared_price_store
+from utils.market_data import MarketDataProvider
+
+
+def _bars(start, periods, first_price=100.0):
+    return pd.DataFrame({
+        'date': pd.bdate_range(start, periods=periods),
+        'price': first_price + np.arange(periods, dtype=float)
+    })
+
+
+class FakeProvider(MarketDataProvider):
+    name = 'fake-price-cache'
+    cacheable = True
+
+    def __init__(self, history):
+        self.history = history
+        self.calls = []
+
+    def fetch_history(self, ticker, period=None, start=None):
+        self.calls.append({'period': period, 'start': start})
+        if start is not None:
+            return self.history[self.history['date'] >= start].reset_index(drop=True)
+        return self.history.copy()
+
+
+@pytest.fixture
+def cache_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_cache, 'PRICE_CACHE_DIR', str(tmp_path / 'prices'))
+    monkeypatch.setattr(shared_price_store, 'SHARED_PRICE_STORE_DIR', str(tmp_path / 'store'))
+    return tmp_path
+
+
+def test_manifest_updates_merge_entries(cache_dirs):
+    price_cache.write_history('AAA', _bars('2024-01-01', 5), None)
+    price_cache.write_history('BBB', _bars('2024-01-01', 3), None)
+
+    manifest = price_cache.load_manifest()
+    assert set(manifest) == {'AAA', 'BBB'}
+    assert manifest['AAA']['rows'] == 5
+    assert manifest['BBB']['last_date'] == '2024-01-03T00:00:00'
+
+    entry = price_cache.get_manifest_entry('aaa')
+    checked = datetime(2030, 1, 1)
+    price_cache.touch_entry('AAA', entry, now=checked)
+
+    manifest = price_cache.load_manifest()
+    assert manifest['AAA']['checked_at'] == checked.isoformat()
+    assert manifest['AAA']['rows'] == 5
+    assert manifest['BBB']['rows'] == 3
+
+
+def test_loaded_manifest_is_a_copy(cache_dirs):
+    price_cache.write_history('AAA', _bars('2024-01-01', 5), None)
+    price_cache.load_manifest()['AAA']['rows'] = 0
+    price_cache.get_manifest_entry('AAA')['rows'] = 0
+    assert price_cache.get_manifest_entry('AAA')['rows'] == 5
+
+
+def test_merge_history_prefers_new_bars():
+    cached = _bars('2024-01-01', 5)
+    new_bars = _bars('2024-01-05', 3, first_price=500.0)
+    merged = price_cache.merge_history(cached, new_bars)
+
+    assert len(merged) == 7
+    assert merged['date'].is_monotonic_increasing
+    assert merged['price'].tolist() == [100.0, 101.0, 102.0, 103.0, 500.0, 501.0, 502.0]
+
+
+def test_stale_cache_only_fetches_new_bars(cache_dirs):
+    provider = FakeProvider(_bars('2024-01-01', 20))
+    price_cache.write_history('AAA', provider.history.iloc[:15], None,
+                              now=datetime.utcnow() - timedelta(days=10))
+
+    df = api_fetcher._load_stock_data('AAA', 'max', provider)
+
+    assert provider.calls == [{'period': None, 'start': pd.Timestamp('2024-01-19')}]
+    assert len(df) == 20
+    assert df['price'].tolist() == provider.history['price'].tolist()
+
+    entry = price_cache.get_manifest_entry('AAA')
+    assert entry['rows'] == 20
+    assert price_cache.is_current(entry)
@@ -0,0 +1,55 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import shared_price_store
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_price_store, 'SHARED_PRICE_STORE_DIR', str(tmp_path))
+    monkeypatch.setattr(shared_price_store, '_mapped', {})
+    return tmp_path
+
+
+def _history(first_price, periods=5):
+    return pd.DataFrame({
+        'date': pd.bdate_range('2024-01-01', periods=periods),
+        'price': first_price + np.arange(periods, dtype=float),
+        'volume': np.full(periods, 1000.0)
+    })
+
+
+def test_round_trip(store_dir):
+    shared_price_store.write_prices('aaa', _history(100))
+    arrays = shared_price_store.read_prices('AAA')
+
+    assert len(arrays) == 5
+    assert arrays['price'].tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    assert arrays['price'].flags['C_CONTIGUOUS']
+    assert np.isnan(arrays['open']).all()
+    assert pd.DatetimeIndex(arrays['date'])[0] == pd.Timestamp('2024-01-01')
+    assert shared_price_store.stored_tickers() == ['AAA']
+
+
+def test_republish_is_picked_up(store_dir):
+    shared_price_store.write_prices('AAA', _history(100))
+    assert shared_price_store.read_prices('AAA')['price'][0] == 100.0
+
+    shared_price_store.write_prices('AAA', _history(200))
+    assert shared_price_store.read_prices('AAA')['price'][0] == 200.0
+
+
+def test_files_from_different_publishes_are_rejected(store_dir):
+    # Same length, so only the generation tells the two publishes apart
+    shared_price_store.write_prices('AAA', _history(100))
+    prices_path, dates_path = shared_price_store._paths('AAA')
+    shutil.copy(dates_path, os.path.join(store_dir, 'old_dates.npy'))
+
+    shared_price_store.write_prices('AAA', _history(200))
+    os.replace(os.path.join(store_dir, 'old_dates.npy'), dates_path)
+
+    assert shared_price_store.read_prices('AAA') is None
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import signal
+
+from utils.data_processing import perform_fft, perform_zoom_fft
+
+# 1/64 .. 1/4 cycles per day in 241 steps of 1/1024, so every zoom frequency
+# falls exactly on a bin of a 4096-point rfft
+MIN_PERIOD = 4
+MAX_PERIOD = 64
+POINTS = 241
+DENSE_LENGTH = 4096
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(5)
+    days = np.arange(300)
+    values = 100 + 0.05 * days + 2 * np.sin(2 * np.pi * days / 23.3 + 0.4) + rng.normal(0, 0.3, 300)
+    return pd.DataFrame({'price': values})
+
+
+def _dense_spectrum(prices):
+    """Zero-padded rfft of the level-removed, Hann-windowed prices."""
+    values = prices['price'].to_numpy()
+    window = signal.windows.hann(len(values))
+    level = np.dot(window, values) / np.sum(window)
+    spectrum = np.fft.rfft((values - level) * window, n=DENSE_LENGTH)
+    bins = np.fft.rfftfreq(DENSE_LENGTH)
+    return bins, spectrum
+
+
+def _assert_matches_dense_rfft(result, prices):
+    bins, spectrum = _dense_spectrum(prices)
+    index = np.rint(result.frequencies * DENSE_LENGTH).astype(int)
+    np.testing.assert_allclose(bins[index], result.frequencies, rtol=1e-12)
+
+    n = len(prices)
+    np.testing.assert_allclose(result.amplitudes, np.abs(spectrum[index]) / (n / 2), rtol=1e-8, atol=1e-10)
+    phase_error = np.angle(np.exp(1j * (result.phases - np.angle(spectrum[index]))))
+    np.testing.assert_allclose(phase_error, 0, atol=1e-7)
+
+
+def test_matches_dense_rfft(prices):
+    result = perform_zoom_fft(prices, MIN_PERIOD, MAX_PERIOD, POINTS)
+    _assert_matches_dense_rfft(result, prices)
+    assert result.cycle_mode == 'peaks'
+
+
+def test_direct_dft_fallback_matches_dense_rfft(prices, monkeypatch):
+    monkeypatch.delattr(signal, 'zoom_fft', raising=False)
+    result = perform_zoom_fft(prices, MIN_PERIOD, MAX_PERIOD, POINTS)
+    _assert_matches_dense_rfft(result, prices)
+
+
+def test_locates_peak_between_rfft_bins(prices):
+    zoom = perform_zoom_fft(prices, MIN_PERIOD, MAX_PERIOD, POINTS)
+    plain = perform_fft(prices, method='fft')
+
+    band = (plain.periods >= MIN_PERIOD) & (plain.periods <= MAX_PERIOD)
+    plain_peak = plain.periods[band][np.argmax(plain.amplitudes[band])]
+    zoom_peak = zoom.periods[np.argmax(zoom.amplitudes)]
+
+    assert abs(zoom_peak - 23.3) < abs(plain_peak - 23.3)
+    assert zoom_peak == pytest.approx(23.3, rel=0.02)
@@ -1,16 +1,44 @@
 import pandas as pd
-import yfinance as yf
 import logging
+import threading
 from datetime import datetime, timedelta
 
+from utils import price_cache, shared_price_store
+from utils.data_processing import process_data
+from utils.frame_cache import frame_cache
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.market_data import get_provider, UpstreamError
+from utils.single_flight import SingleFlight
+from utils.ticker_search import get_symbol_index
+from utils.rate_limiter import yahoo_limiter
+
 logger = logging.getLogger(__name__)
 
-def fetch_stock_data(ticker, period="2y"):
+# Coalesces concurrent fetches of the same (ticker, period, provider)
+_fetch_flight = SingleFlight(name='fetch_stock_data')
+
+# Errors after which cached data is served instead of failing the request
+_UPSTREAM_ERRORS = (ValueError, ConnectionError, TimeoutError, CircuitOpenError)
+
+# Causes of a fetch ValueError that mean the provider is unavailable
+UPSTREAM_UNAVAILABLE = (UpstreamError, ConnectionError, TimeoutError, CircuitOpenError)
+
+# One circuit breaker per provider name
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def fetch_stock_data(ticker, period="2y", provider=None):
     """Fetch stock data for the given ticker.
 
+    History is served from the on-disk price cache when it is current. When
+    the cache is behind, only the bars since the last cached date are fetched
+    and appended.
+
     Args:
         ticker (str): Stock ticker symbol
         period (str): Period to fetch (default: 2y for 2 years)
+        provider (MarketDataProvider, optional): Data source
+            (default: the provider selected by MARKET_DATA_PROVIDER)
 
     Returns:
         DataFrame: Processed dataframe with stock data
@@ -18,125 +46,212 @@ def fetch_stock_data(ticker, period="2y"):
     try:
         logger.info(f"Fetching data for {ticker} with period {period}")
 
-        # Validate ticker format
-        ticker = ticker.strip().upper()
-        if not ticker or len(ticker) > 10:
-            raise ValueError("Invalid ticker symbol")
-
-        # Fetch data from Yahoo Finance with error handling
-        stock = yf.Ticker(ticker)
-        # Add a small delay to avoid rate limiting
-        import time
-        time.sleep(1)
-
-        # Add delay before API call with exponential backoff
-        max_retries = 3
-        retry_delay = 2
-        hist = None
-
-        for attempt in range(max_retries):
-            try:
-                time.sleep(retry_delay * (attempt + 1))
-
-                try:
-                    # Exponential backoff delay
-                    time.sleep(retry_delay * (2 ** attempt))
-                    
-                    # Try to get info first to validate the ticker
-                    info = stock.info
-                    if not info:
-                        raise ValueError(f"Could not validate ticker {ticker}")
-
-                    # Additional delay between calls
-                    time.sleep(2)
-
-                    # Now fetch the historical data with a longer timeout
-                    hist = stock.history(period=period, timeout=20)
-
-                    if not hist.empty:
-                        break
-                except Exception as e:
-                    logger.warning(f"API call attempt {attempt + 1} failed: {str(e)}")
-                    if attempt < max_retries - 1:
-                        continue
-                    raise ValueError(f"Failed to fetch data after {max_retries} attempts: {str(e)}")
-
-
-            except Exception as retry_error:
-                logger.warning(f"Attempt {attempt + 1} failed: {str(retry_error)}")
-                if attempt == max_retries - 1:
-                    raise ValueError(f"Failed to fetch data after {max_retries} attempts: {str(retry_error)}")
-
-        # Check if we got data
-        if hist is None or hist.empty:
-            raise ValueError(f"No data found for ticker {ticker}")
-
-        logger.info(f"Successfully fetched {len(hist)} rows for {ticker}")
-
-        # Reset index to make Date a column
-        hist = hist.reset_index()
-
-        # Rename columns to match our expected format
-        hist.rename(columns={
-            'Date': 'date',
-            'Close': 'price',
-            'Open': 'open',
-            'High': 'high',
-            'Low': 'low',
-            'Volume': 'volume'
-        }, inplace=True)
+        ticker = _validate_ticker(ticker)
+        provider = provider or get_provider()
 
-        return hist
+        # Offline providers bypass the caches so benchmarks see their real cost
+        if not provider.cacheable:
+            return _fetch_coalesced(ticker, period, provider)
+
+        return frame_cache.get_or_load(('raw', ticker, period, provider.name), _fetch_coalesced,
+                                       ticker, period, provider)
 
     except Exception as e:
         logger.error(f"Error in fetch_stock_data for {ticker}: {str(e)}")
-        raise ValueError(f"Error fetching data for {ticker}: {str(e)}")
+        raise ValueError(f"Error fetching data for {ticker}: {str(e)}") from e
+
+def fetch_processed_data(ticker, period="2y", provider=None):
+    """Fetch a ticker's history and run it through process_data, with caching.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        period (str): Period to fetch (default: 2y for 2 years)
+        provider (MarketDataProvider, optional): Data source
+
+    Returns:
+        DataFrame: Processed dataframe with date and price columns
+    """
+    ticker = _validate_ticker(ticker)
+    provider = provider or get_provider()
+
+    if not provider.cacheable:
+        return process_data(fetch_stock_data(ticker, period=period, provider=provider))
+
+    return frame_cache.get_or_load(('processed', ticker, period, provider.name), _load_processed,
+                                   ticker, period, provider)
+
+def _load_processed(ticker, period, provider):
+    """Process a ticker's history, reloading the raw bars unless their cache entry is fresh.
+
+    A stale raw entry is bypassed (and replaced) rather than served, so the
+    background refresh of an expired processed frame picks up new bars.
+    """
+    raw_key = ('raw', ticker, period, provider.name)
+    raw = frame_cache.get_fresh(raw_key)
+    if raw is None:
+        try:
+            raw = _fetch_coalesced(ticker, period, provider)
+        except Exception as e:
+            logger.error(f"Error in fetch_processed_data for {ticker}: {str(e)}")
+            raise ValueError(f"Error fetching data for {ticker}: {str(e)}") from e
+        frame_cache.put(raw_key, raw)
+    return process_data(raw)
 
-def search_tickers(query):
+def _validate_ticker(ticker):
+    """Return the normalized ticker, raising ValueError for an invalid symbol."""
+    ticker = ticker.strip().upper()
+    if not ticker or len(ticker) > 10:
+        raise ValueError("Invalid ticker symbol")
+    return ticker
+
+def _fetch_coalesced(ticker, period, provider):
+    """Load a ticker's history, sharing one in-flight load between concurrent callers."""
+    df, shared = _fetch_flight.do((ticker, period, provider.name), _load_stock_data,
+                                  ticker, period, provider)
+    if shared:
+        # Each caller gets its own frame so in-place edits don't leak between requests
+        return df.copy()
+    return df
+
+def _load_stock_data(ticker, period, provider):
+    """Load a ticker's history through the on-disk cache and the provider.
+
+    While the provider's circuit breaker is open (or a fetch fails), the last
+    cached history is served instead, flagged with df.attrs['stale'] = True.
+    """
+    # Offline providers are already local, so caching them would only
+    # hide their behaviour from benchmarks
+    if not provider.cacheable or not price_cache.cache_available():
+        return _call_provider(provider, ticker, period=period)
+
+    start = price_cache.period_start(period)
+    entry = price_cache.get_manifest_entry(ticker)
+    cached = None
+    if entry is not None and price_cache.covers_period(entry, start):
+        cached = price_cache.read_history(ticker)
+
+    # Nothing usable on disk: fetch the full period and store it
+    if cached is None or cached.empty:
+        try:
+            hist = _call_provider(provider, ticker, period=period)
+        except _UPSTREAM_ERRORS as e:
+            # A shorter cached history beats no answer at all
+            fallback = price_cache.read_history(ticker, start=start) if entry is not None else None
+            if fallback is None or fallback.empty:
+                raise
+            logger.warning(f"Fetch failed for {ticker}, serving partial cached data: {str(e)}")
+            return _mark_stale(fallback)
+        _persist_history(ticker, hist, start)
+        return hist
+
+    if price_cache.is_current(entry):
+        logger.info(f"Serving {ticker} from price cache ({entry['rows']} rows)")
+        return price_cache.read_history(ticker, start=start)
+
+    # Re-request the last cached bar too, in case it was captured intraday
+    last_date = price_cache.naive_dates(cached['date']).iloc[-1]
+    try:
+        new_bars = _call_provider(provider, ticker, start=last_date)
+    except _UPSTREAM_ERRORS as e:
+        logger.warning(f"Incremental fetch failed for {ticker}, serving cached data: {str(e)}")
+        return _mark_stale(price_cache.read_history(ticker, start=start))
+
+    if new_bars.empty:
+        price_cache.touch_entry(ticker, entry)
+    else:
+        merged = price_cache.merge_history(cached, new_bars)
+        logger.info(f"Appended {len(merged) - len(cached)} new rows to cached {ticker} history")
+        cached_start = pd.Timestamp(entry['start']) if entry.get('start') else None
+        _persist_history(ticker, merged, cached_start)
+
+    return price_cache.read_history(ticker, start=start)
+
+def get_breaker(provider):
+    """Return the circuit breaker guarding a provider (one per provider name)."""
+    with _breakers_lock:
+        breaker = _breakers.get(provider.name)
+        if breaker is None:
+            breaker = CircuitBreaker(provider.name, failure_exceptions=(UpstreamError, ConnectionError, TimeoutError))
+            _breakers[provider.name] = breaker
+        return breaker
+
+def _call_provider(provider, ticker, period=None, start=None):
+    """Fetch from a provider through its circuit breaker."""
+    return get_breaker(provider).call(provider.fetch_history, ticker, period=period, start=start)
+
+def _mark_stale(df):
+    """Flag a frame as served from cache because the upstream was unavailable."""
+    df.attrs['stale'] = True
+    dates = price_cache.naive_dates(df['date'])
+    df.attrs['as_of'] = dates.iloc[-1].isoformat() if len(dates) else None
+    return df
+
+def _persist_history(ticker, df, start):
+    """Write a ticker's history to the on-disk cache and the shared memory-mapped store."""
+    price_cache.write_history(ticker, df, start)
+    shared_price_store.write_prices(ticker, df)
+
+def load_price_arrays(ticker, period="2y", provider=None):
+    """Load a ticker's bars as zero-copy arrays from the shared price store.
+
+    When the store is behind, the ticker is refreshed through fetch_stock_data,
+    which republishes it. If it still cannot be mapped, the fetched DataFrame
+    is returned instead; both work with process_data and perform_fft.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        period (str): Period to fetch (default: 2y for 2 years)
+        provider (MarketDataProvider, optional): Data source
+
+    Returns:
+        PriceArrays or DataFrame: The ticker's bars for the period
+    """
+    ticker = ticker.strip().upper()
+    provider = provider or get_provider()
+    start = price_cache.period_start(period)
+
+    if provider.cacheable:
+        entry = price_cache.get_manifest_entry(ticker)
+        if entry is not None and price_cache.covers_period(entry, start) and price_cache.is_current(entry):
+            arrays = shared_price_store.read_prices(ticker, start=start)
+            if arrays is not None and not arrays.empty:
+                return arrays
+
+    df = fetch_stock_data(ticker, period=period, provider=provider)
+
+    if provider.cacheable:
+        arrays = shared_price_store.read_prices(ticker, start=start)
+        if arrays is not None and not arrays.empty:
+            return arrays
+
+    return df
+
+def search_tickers(query, limit=10):
     """Search for ticker symbols matching the query.
 
     Args:
-        query (str): Search query
+        query (str): Search query (symbol prefix or company name, typos allowed)
+        limit (int): Maximum number of results
 
     Returns:
-        list: List of matching ticker symbols with company names
+        list: List of matching ticker symbols with company names, best match first
     """
     try:
-        # This is a simplified version - in production, you would use a more robust ticker search API
-        # For now, we'll return a static list for common tickers
-        common_tickers = {
-            'AAPL': 'Apple Inc.',
-            'MSFT': 'Microsoft Corporation',
-            'GOOG': 'Alphabet Inc.',
-            'GOOGL': 'Alphabet Inc.',
-            'AMZN': 'Amazon.com, Inc.',
-            'FB': 'Meta Platforms, Inc.',
-            'TSLA': 'Tesla, Inc.',
-            'NVDA': 'NVIDIA Corporation',
-            'JPM': 'JPMorgan Chase & Co.',
-            'V': 'Visa Inc.',
-            'JNJ': 'Johnson & Johnson',
-            'WMT': 'Walmart Inc.',
-            'BAC': 'Bank of America Corporation',
-            'PG': 'The Procter & Gamble Company',
-            'MA': 'Mastercard Incorporated',
-            'DIS': 'The Walt Disney Company',
-            'NFLX': 'Netflix, Inc.',
-            'XOM': 'Exxon Mobil Corporation',
-            'T': 'AT&T Inc.',
-            'INTC': 'Intel Corporation'
-        }
-
-        # Filter tickers based on query
-        query = query.upper()
-        matches = []
-
-        for ticker, company in common_tickers.items():
-            if query in ticker or query.lower() in company.lower():
-                matches.append({'ticker': ticker, 'company': company})
-
-        return matches
+        return get_symbol_index().search(query, limit=limit)
 
     except Exception as e:
         logger.error(f"Error searching tickers: {str(e)}")
-        return []
\ No newline at end of file
+        return []
+
+def get_fetch_metrics():
+    """Return cache, coalescing, rate-limiter and circuit-breaker state for monitoring.
+
+    Returns:
+        dict: Stats keyed by component
+    """
+    return {
+        'frame_cache': frame_cache.stats(),
+        'fetch_coalescing': _fetch_flight.stats(),
+        'rate_limiter': yahoo_limiter.stats(),
+        'circuit_breakers': {name: breaker.stats() for name, breaker in list(_breakers.items())}
+    }
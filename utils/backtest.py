@@ -0,0 +1,271 @@
+"""Walk-forward backtests of the cycle-based signals.
+
+Every evaluation date sees only the `window` bars that end on it. All
+windows of a ticker are transformed in one batch by rolling_spectrum, their
+cycle tables are scored in one call to score_recommendations, and the
+resulting BUY/SELL signals are turned into positions and returns with
+array operations. Tickers are spread over a process pool; prices come from
+the price cache, and workers map them straight from the shared price store
+when it has them.
+"""
+import os
+import logging
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from utils.api_fetcher import load_price_arrays
+from utils.data_processing import process_data, rolling_spectrum, detect_window_cycles
+from utils.decision_engine import score_recommendations, TOP_CYCLES, TROUGH_WINDOW, SIGNAL_CUTOFF
+from utils.price_cache import period_start
+from utils.process_pool import run_in_workers
+from utils.shared_price_store import PriceArrays, read_prices
+
+logger = logging.getLogger(__name__)
+
+BACKTEST_WORKERS = int(os.getenv('BACKTEST_WORKERS', str(min(os.cpu_count() or 1, 8))))
+
+# Tickers accepted by one /api/backtest request
+MAX_BACKTEST_TICKERS = 20
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def walk_forward_signals(df, window=252, step=1, min_period=2, max_period=252, strength_threshold=0.1,
+                         trough_window=TROUGH_WINDOW, signal_cutoff=SIGNAL_CUTOFF, spectrum=None):
+    """Compute the recommendation for every walk-forward evaluation date.
+
+    Each row matches generate_recommendation(window_df, detect_cycles(
+    perform_fft(window_df), min_period, max_period, strength_threshold))
+    for the window of bars ending on that date.
+
+    Args:
+        df (DataFrame or PriceArrays): Processed price data
+        window (int): Bars of history behind each decision
+        step (int): Bars between decisions
+        min_period (int): detect_cycles minimum period
+        max_period (int): detect_cycles maximum period
+        strength_threshold (float): detect_cycles strength threshold
+        trough_window (float): See score_recommendations
+        signal_cutoff (float): See score_recommendations
+        spectrum (dict, optional): rolling_spectrum(df, window, step), to
+            reuse one set of spectra across several parameter settings
+
+    Returns:
+        DataFrame: One row per evaluation date ('date', 'bar' index into the
+            series, 'action', 'confidence' and the signal components)
+    """
+    if spectrum is None:
+        spectrum = rolling_spectrum(df, window=window, step=step)
+    cycles = detect_window_cycles(spectrum, min_period=min_period, max_period=max_period,
+                                  strength_threshold=strength_threshold, top_k=TOP_CYCLES)
+    return score_windows(df, spectrum, cycles, trough_window=trough_window, signal_cutoff=signal_cutoff)
+
+
+def score_windows(df, spectrum, cycles, trough_window=TROUGH_WINDOW, signal_cutoff=SIGNAL_CUTOFF):
+    """Score the walk-forward windows of a rolling spectrum.
+
+    Args:
+        df (DataFrame or PriceArrays): Processed price data
+        spectrum (dict): rolling_spectrum of df
+        cycles (DataFrame): detect_window_cycles of the spectrum
+        trough_window (float): See score_recommendations
+        signal_cutoff (float): See score_recommendations
+
+    Returns:
+        DataFrame: As walk_forward_signals
+    """
+    # One scoring "ticker" per window
+    prices = np.asarray(df['price'], dtype=float)
+    ends = spectrum['ends']
+    last_two = pd.DataFrame({'prev_price': prices[ends - 1], 'last_price': prices[ends]})
+
+    scores = score_recommendations(cycles.rename(columns={'window': 'ticker'}), last_two,
+                                   trough_window=trough_window, signal_cutoff=signal_cutoff)
+    scores.insert(0, 'bar', ends)
+    scores.insert(0, 'date', spectrum['dates'])
+    return scores.reset_index(drop=True)
+
+
+def _max_drawdown(equity):
+    peaks = np.maximum.accumulate(equity)
+    return float(np.max(1 - equity / peaks)) if len(equity) else 0.0
+
+
+def evaluate_signals(prices, signals, horizon=20, allow_short=False, cost_bps=0.0):
+    """Turn walk-forward signals into positions and performance metrics.
+
+    A BUY opens a long position and a SELL closes it (or goes short with
+    allow_short); HOLD keeps the current position. Positions take effect
+    on the bar after the signal, so no decision uses its own bar's return.
+
+    Args:
+        prices (ndarray): Price series the signals were computed on
+        signals (DataFrame): Output of walk_forward_signals
+        horizon (int): Bars ahead used to judge whether a signal was right
+        allow_short (bool): Hold -1 instead of 0 after a SELL
+        cost_bps (float): Trading cost per unit of turnover, in basis points
+
+    Returns:
+        dict: Performance metrics and the strategy equity curve
+    """
+    prices = np.asarray(prices, dtype=float)
+    bars = signals['bar'].to_numpy()
+    actions = signals['action'].to_numpy()
+    is_buy = actions == 'BUY'
+    is_sell = actions == 'SELL'
+    first, last = bars[0], len(prices) - 1
+
+    # Target position after each signal; HOLD carries the previous one forward
+    short_position = -1.0 if allow_short else 0.0
+    targets = np.select([is_buy, is_sell], [1.0, short_position], np.nan)
+    targets = pd.Series(targets).ffill().fillna(0.0).to_numpy()
+
+    held = np.full(len(prices), np.nan)
+    held[bars] = targets
+    held = pd.Series(held).ffill().fillna(0.0).to_numpy()
+
+    returns = np.zeros(len(prices))
+    returns[1:] = prices[1:] / prices[:-1] - 1
+
+    # Position decided at bar t earns bar t+1's return and pays for the
+    # trade that opened it (the first one starts from flat)
+    positions = held[first:last]
+    trades = np.abs(np.diff(positions, prepend=0.0))
+    strategy_returns = positions * returns[first + 1:last + 1] - trades * cost_bps / 10000
+    equity = np.cumprod(1 + strategy_returns)
+    benchmark = prices[last] / prices[first] - 1
+
+    # Hit rate: did the price move the signalled way over the next `horizon` bars
+    directional = (is_buy | is_sell) & (bars + horizon <= last)
+    forward = prices[np.minimum(bars + horizon, last)] / prices[bars] - 1
+    hits = np.where(is_buy, forward > 0, forward < 0)[directional]
+
+    years = max(len(strategy_returns), 1) / TRADING_DAYS_PER_YEAR
+    total_return = float(equity[-1] - 1) if len(equity) else 0.0
+    volatility = float(np.std(strategy_returns) * np.sqrt(TRADING_DAYS_PER_YEAR)) if len(strategy_returns) else 0.0
+
+    return {
+        'evaluations': int(len(bars)),
+        'buy_signals': int(np.sum(is_buy)),
+        'sell_signals': int(np.sum(is_sell)),
+        'hit_rate': float(np.mean(hits)) if len(hits) else None,
+        'total_return': total_return,
+        'annual_return': float((1 + total_return) ** (1 / years) - 1) if total_return > -1 else -1.0,
+        'benchmark_return': float(benchmark),
+        'sharpe': float(np.mean(strategy_returns) * TRADING_DAYS_PER_YEAR / volatility) if volatility else None,
+        'max_drawdown': _max_drawdown(np.concatenate([[1.0], equity])),
+        'exposure': float(np.mean(np.abs(positions))) if last > first else 0.0,
+        'turnover': float(np.sum(trades) / years),
+        'equity': equity
+    }
+
+
+def load_backtest_data(ticker, data, start, window):
+    """Return processed bars for a backtest worker, mapping the shared store when data is None."""
+    if data is None:
+        data = read_prices(ticker, start=start)
+        if data is None:
+            raise ValueError(f"{ticker} is not in the shared price store")
+    df = process_data(data)
+    if len(df) < window + 2:
+        raise ValueError(f"Need more than {window + 1} bars, got {len(df)}")
+    return df
+
+
+def backtest_ticker(ticker, data=None, start=None, window=252, step=1, horizon=20, min_period=2, max_period=252,
+                    strength_threshold=0.1, trough_window=TROUGH_WINDOW, signal_cutoff=SIGNAL_CUTOFF,
+                    allow_short=False, cost_bps=0.0, include_equity=False):
+    """Backtest one ticker.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        data (DataFrame or PriceArrays, optional): Price history; read from
+            the shared price store when omitted
+        start (Timestamp, optional): First bar to use when reading the store
+        include_equity (bool): Keep the equity curve in the result
+        Other arguments: See walk_forward_signals and evaluate_signals
+
+    Returns:
+        dict: 'ticker' plus the evaluate_signals metrics
+    """
+    df = load_backtest_data(ticker, data, start, window)
+    signals = walk_forward_signals(df, window=window, step=step, min_period=min_period, max_period=max_period,
+                                   strength_threshold=strength_threshold, trough_window=trough_window,
+                                   signal_cutoff=signal_cutoff)
+    metrics = evaluate_signals(df['price'], signals, horizon=horizon, allow_short=allow_short, cost_bps=cost_bps)
+    if include_equity:
+        metrics['equity_dates'] = np.asarray(df['date'])[signals['bar'].iloc[0] + 1:]
+    else:
+        metrics.pop('equity')
+    return {'ticker': ticker, **metrics}
+
+
+def prepare_price_jobs(tickers, period):
+    """Load (and cache) prices for a parallel run in this process.
+
+    Args:
+        tickers (list): Ticker symbols
+        period (str): History to load
+
+    Returns:
+        tuple: (jobs, errors) - jobs maps each ticker to None when workers
+            can map its bars from the shared price store, otherwise to the
+            processed DataFrame; errors maps failed tickers to the reason
+    """
+    jobs, errors = {}, {}
+    for ticker in dict.fromkeys(t.strip().upper() for t in tickers if t.strip()):
+        try:
+            data = load_price_arrays(ticker, period=period)
+            jobs[ticker] = None if isinstance(data, PriceArrays) else process_data(data)
+        except Exception as e:
+            errors[ticker] = str(e)
+    return jobs, errors
+
+
+def run_backtest(tickers, period="5y", max_workers=None, **params):
+    """Backtest several tickers in parallel.
+
+    Prices are loaded (and cached) in this process first, then tickers are
+    spread over the shared worker pool (utils.process_pool). Workers get only
+    the ticker when its bars are in the shared price store and map them
+    there, otherwise the price arrays are sent along.
+
+    Args:
+        tickers (list): Ticker symbols
+        period (str): History to replay
+        max_workers (int, optional): Worker processes (default:
+            BACKTEST_WORKERS); 1 runs everything in this process
+        **params: Passed to backtest_ticker
+
+    Returns:
+        tuple: (results DataFrame indexed by ticker, errors dict)
+    """
+    max_workers = max_workers or BACKTEST_WORKERS
+    start = period_start(period)
+    jobs, errors = prepare_price_jobs(tickers, period)
+
+    results = []
+    if max_workers <= 1 or len(jobs) <= 1:
+        for ticker, data in jobs.items():
+            try:
+                results.append(backtest_ticker(ticker, data=data, start=start, **params))
+            except Exception as e:
+                errors[ticker] = str(e)
+    else:
+        calls = {ticker: (ticker, data) for ticker, data in jobs.items()}
+        worker = partial(backtest_ticker, start=start, **params)
+        for ticker, result, error in run_in_workers(worker, calls, max_workers):
+            if error is None:
+                results.append(result)
+            else:
+                errors[ticker] = str(error)
+
+    for ticker, message in errors.items():
+        logger.warning(f"Backtest of {ticker} failed: {message}")
+
+    table = pd.DataFrame(results)
+    if not table.empty:
+        table = table.set_index('ticker').sort_index()
+    return table, errors
@@ -0,0 +1,117 @@
+"""Analysis of long-format uploads covering many tickers.
+
+A long-format CSV has one row per (ticker, date) with a price column. The
+rows are split by ticker and each series runs through the usual
+process_data -> perform_fft -> detect_cycles -> generate_recommendation
+pipeline on a process pool, since the work is CPU-bound.
+"""
+import os
+import logging
+
+import pandas as pd
+
+from utils.data_processing import process_data, perform_fft, detect_cycles, SPECTRUM_PRICE_TAIL
+from utils.decision_engine import generate_recommendation
+from utils.process_pool import run_in_workers
+from utils.visualization import (create_time_series_plot, create_frequency_plot, create_forecast_plot,
+                                 convert_numpy_to_lists)
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_PROCESS_WORKERS = int(os.getenv('UPLOAD_PROCESS_WORKERS', str(min(os.cpu_count() or 1, 8))))
+
+# Symbols longer than the Analysis.ticker column are rejected
+MAX_TICKER_LENGTH = 10
+
+# Series shorter than this cannot show a meaningful cycle
+MIN_SERIES_BARS = 10
+
+def split_by_ticker(df):
+    """Split a long-format frame into per-ticker (dates, prices) arrays.
+
+    Args:
+        df (DataFrame): Columns ticker, date and price
+
+    Returns:
+        dict: Mapping of ticker to (dates, prices) numpy arrays
+    """
+    groups = {}
+    for ticker, group in df.groupby('ticker', sort=True):
+        groups[ticker] = (group['date'].to_numpy(), group['price'].to_numpy())
+    return groups
+
+
+def analyze_series(ticker, dates, prices):
+    """Run the single-series pipeline for one ticker.
+
+    Runs in a worker process, so it takes and returns plain arrays and
+    JSON-ready structures.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        dates (ndarray): Bar dates
+        prices (ndarray): Bar prices
+
+    Returns:
+        dict: ticker, dominant_cycles, recommendation, the three plots and
+            the spectrum blob
+    """
+    df = process_data(pd.DataFrame({'date': dates, 'price': prices}))
+    if len(df) < MIN_SERIES_BARS:
+        raise ValueError(f"Only {len(df)} valid rows")
+
+    fft_results = perform_fft(df)
+    dominant_cycles = detect_cycles(fft_results)
+    recommendation = generate_recommendation(df, dominant_cycles)
+
+    return {
+        'ticker': ticker,
+        'dominant_cycles': convert_numpy_to_lists(dominant_cycles),
+        'recommendation': convert_numpy_to_lists(recommendation),
+        'time_series_plot': create_time_series_plot(df),
+        'frequency_plot': create_frequency_plot(fft_results),
+        'forecast_plot': create_forecast_plot(df, dominant_cycles),
+        'spectrum': fft_results.to_bytes(price_tail=SPECTRUM_PRICE_TAIL)
+    }
+
+
+def analyze_long_format(df, max_workers=None):
+    """Analyse every ticker of a long-format upload.
+
+    Args:
+        df (DataFrame): Columns ticker, date and price
+        max_workers (int, optional): Worker processes (default:
+            UPLOAD_PROCESS_WORKERS); 1 runs everything in this process
+
+    Returns:
+        tuple: (results, errors) - a list of analyze_series results sorted by
+            ticker, and a dict mapping tickers that failed to the reason
+    """
+    max_workers = max_workers or UPLOAD_PROCESS_WORKERS
+    groups = split_by_ticker(df)
+    results, errors = [], {}
+
+    for ticker in list(groups):
+        if not ticker or len(ticker) > MAX_TICKER_LENGTH:
+            errors[ticker] = "Invalid ticker symbol"
+            del groups[ticker]
+
+    if max_workers <= 1 or len(groups) <= 1:
+        for ticker, (dates, prices) in groups.items():
+            try:
+                results.append(analyze_series(ticker, dates, prices))
+            except Exception as e:
+                errors[ticker] = str(e)
+    else:
+        calls = {ticker: (ticker, dates, prices) for ticker, (dates, prices) in groups.items()}
+        for ticker, result, error in run_in_workers(analyze_series, calls, max_workers):
+            if error is None:
+                results.append(result)
+            else:
+                errors[ticker] = str(error)
+
+    for ticker, message in errors.items():
+        logger.warning(f"Skipped {ticker} in long-format upload: {message}")
+
+    results.sort(key=lambda result: result['ticker'])
+    return results, errors
@@ -0,0 +1,146 @@
+"""Circuit breaker for upstream market-data calls.
+
+After `failure_threshold` consecutive failures the breaker opens and calls
+fail immediately with CircuitOpenError. Once `recovery_timeout` seconds have
+passed, a single probe call is let through (half-open): success closes the
+breaker, failure re-opens it for another timeout.
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+BREAKER_RECOVERY_SECONDS = float(os.getenv('BREAKER_RECOVERY_SECONDS', '60'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the breaker is open."""
+
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure circuit breaker.
+
+    Args:
+        name (str): Name used in logs and stats
+        failure_threshold (int): Consecutive failures that open the breaker
+        recovery_timeout (float): Seconds to stay open before probing
+        failure_exceptions (tuple): Exception types that count as upstream
+            failures; any other error (e.g. an unknown ticker) still means
+            the upstream answered and counts as a success
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 recovery_timeout=BREAKER_RECOVERY_SECONDS, failure_exceptions=(Exception,)):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failure_exceptions = failure_exceptions
+
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+        self.opened_count = 0
+        self.rejected_count = 0
+        self.last_failure = None
+        self.last_failure_at = None
+        self.last_state_change = datetime.utcnow()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.recovery_timeout:
+            return HALF_OPEN
+        return self._state
+
+    def _set_state(self, state):
+        if state != self._state:
+            logger.warning(f"Circuit breaker '{self.name}' {self._state} -> {state}")
+            self._state = state
+            self.last_state_change = datetime.utcnow()
+
+    def _before_call(self):
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._set_state(HALF_OPEN)
+                return True
+
+            self.rejected_count += 1
+            retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+            raise CircuitOpenError(
+                f"{self.name} upstream unavailable (circuit open, retry in {retry_in:.0f}s)"
+            )
+
+    def _on_success(self, probe):
+        with self._lock:
+            self._failures = 0
+            if probe:
+                self._probe_in_flight = False
+            self._set_state(CLOSED)
+
+    def _on_failure(self, probe, error):
+        with self._lock:
+            self._failures += 1
+            self.last_failure = str(error)
+            self.last_failure_at = datetime.utcnow()
+            if probe:
+                self._probe_in_flight = False
+            if probe or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.opened_count += 1
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def call(self, func, *args, **kwargs):
+        """Call func through the breaker.
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        probe = self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except self.failure_exceptions as e:
+            self._on_failure(probe, e)
+            raise
+        except Exception:
+            # The upstream answered (e.g. with "unknown ticker"), so it is healthy
+            self._on_success(probe)
+            raise
+
+        self._on_success(probe)
+        return result
+
+    def stats(self):
+        """Return the breaker state for monitoring."""
+        with self._lock:
+            state = self._current_state(time.monotonic())
+            return {
+                'name': self.name,
+                'state': state,
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'recovery_timeout': self.recovery_timeout,
+                'opened_count': self.opened_count,
+                'rejected_count': self.rejected_count,
+                'last_failure': self.last_failure,
+                'last_failure_at': self.last_failure_at.isoformat() if self.last_failure_at else None,
+                'last_state_change': self.last_state_change.isoformat()
+            }
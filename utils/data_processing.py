@@ -1,19 +1,232 @@
+import os
 import pandas as pd
 import numpy as np
 from scipy import signal
+from numpy.lib.stride_tricks import sliding_window_view
+import io
+import csv
+import json
 import logging
+import importlib.util
+from collections import defaultdict
+from functools import lru_cache
+
+from utils.shared_price_store import PriceArrays
+from utils.lomb_scargle import lomb_scargle
 
 logger = logging.getLogger(__name__)
 
+# Date formats tried, in order, against the first rows of an upload
+DATE_FORMATS = (
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y/%m/%d', '%Y%m%d',
+    '%m/%d/%Y', '%d/%m/%Y', '%m/%d/%y', '%d/%m/%y', '%d-%m-%Y', '%d.%m.%Y',
+    '%m/%d/%Y %H:%M', '%d-%b-%Y', '%b %d, %Y'
+)
+
+# Bytes read up front to find the header and sample some dates
+SNIFF_BYTES = 64 * 1024
+
+def find_price_columns(columns):
+    """Pick the date and price columns the way process_data does.
+
+    Args:
+        columns (list): Column names
+
+    Returns:
+        tuple: (date column, price column); either may be None
+    """
+    date_col = 'date' if 'date' in columns else next(
+        (col for col in columns if 'date' in col.lower() or 'time' in col.lower()), None)
+    price_col = 'price' if 'price' in columns else next(
+        (col for col in columns if 'price' in col.lower() or 'close' in col.lower()), None)
+    return date_col, price_col
+
+def find_ticker_column(columns):
+    """Return the ticker/symbol column of a long-format file, or None."""
+    for col in columns:
+        if col.strip().lower() in ('ticker', 'symbol'):
+            return col
+    return None
+
+def detect_date_format(samples):
+    """Return the first of DATE_FORMATS that parses every sample, or None."""
+    samples = [sample.strip() for sample in samples if sample and sample.strip()]
+    if not samples:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            pd.to_datetime(samples, format=date_format)
+            return date_format
+        except (ValueError, TypeError):
+            continue
+    return None
+
+def _read_csv_pyarrow(source, usecols, date_format):
+    """Read the date and price columns with pyarrow's multithreaded CSV reader."""
+    import pyarrow as pa
+    from pyarrow import csv as pa_csv
+
+    column_types = {usecols[1]: pa.float64()}
+    if len(usecols) > 2:
+        column_types[usecols[2]] = pa.string()
+    if date_format is not None:
+        column_types[usecols[0]] = pa.timestamp('ns')
+
+    convert_options = pa_csv.ConvertOptions(
+        include_columns=usecols,
+        column_types=column_types,
+        timestamp_parsers=[date_format] if date_format is not None else None
+    )
+    return pa_csv.read_csv(source, convert_options=convert_options).to_pandas()
+
+def read_price_csv(source):
+    """Read an uploaded price CSV, loading only the date and price columns.
+
+    The header and a sample of rows are sniffed once to choose the columns
+    and the date format; the file is then read with explicit column types
+    (by pyarrow's CSV reader when it is installed, which also parses the
+    dates) and sorted only if it is not already in date order.
+
+    Args:
+        source (file-like or str): Seekable binary file object or path
+
+    Returns:
+        DataFrame: 'date' (datetime64) and 'price' (float) columns, ready for
+            process_data; long-format files with several tickers also get a
+            'ticker' column (and are left in file order)
+
+    Raises:
+        ValueError: If the file has no date or price column
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            head = f.read(SNIFF_BYTES)
+    else:
+        position = source.tell()
+        head = source.read(SNIFF_BYTES)
+        source.seek(position)
+
+    text = head.decode('utf-8-sig', errors='replace')
+    lines = text.splitlines()
+    if len(head) == SNIFF_BYTES and len(lines) > 1:
+        # The last line may be cut off mid-row
+        lines = lines[:-1]
+    rows = list(csv.reader(lines))
+    if not rows:
+        raise ValueError("The CSV file is empty")
+
+    header = [col.strip() for col in rows[0]]
+    date_col, price_col = find_price_columns(header)
+    if date_col is None:
+        raise ValueError("CSV must contain a date/Date column")
+    if price_col is None:
+        raise ValueError("CSV must contain price/close data")
+
+    date_index = header.index(date_col)
+    date_format = detect_date_format([row[date_index] for row in rows[1:50] if len(row) > date_index])
+
+    usecols = [rows[0][header.index(date_col)], rows[0][header.index(price_col)]]
+    ticker_col = find_ticker_column(header)
+    if ticker_col is not None:
+        usecols.append(rows[0][header.index(ticker_col)])
+
+    df = None
+    if importlib.util.find_spec('pyarrow') is not None:
+        try:
+            df = _read_csv_pyarrow(source, usecols, date_format)
+        except Exception as e:
+            # Values that are not plain numbers or dates; let pandas coerce them
+            logger.debug(f"pyarrow CSV read failed, using the default parser: {str(e)}")
+            if not isinstance(source, str):
+                source.seek(position)
+    if df is None:
+        try:
+            dtypes = {col: str for col in usecols}
+            dtypes[usecols[1]] = 'float64'
+            df = pd.read_csv(source, usecols=usecols, dtype=dtypes)
+        except ValueError:
+            if not isinstance(source, str):
+                source.seek(position)
+            df = pd.read_csv(source, usecols=usecols, dtype=str)
+            df[usecols[1]] = pd.to_numeric(df[usecols[1]], errors='coerce')
+
+    df.rename(columns=dict(zip(usecols, ['date', 'price', 'ticker'])), inplace=True)
+    if not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = pd.to_datetime(df['date'], format=date_format, errors='coerce')
+    df.dropna(inplace=True)
+
+    columns = ['date', 'price']
+    if 'ticker' in df.columns:
+        df['ticker'] = df['ticker'].str.strip().str.upper()
+        if df['ticker'].nunique() > 1:
+            # Each ticker is sorted separately by process_data
+            df.reset_index(drop=True, inplace=True)
+            return df[['ticker', *columns]]
+
+    if not df['date'].is_monotonic_increasing:
+        df.sort_values('date', inplace=True, kind='stable')
+    df.reset_index(drop=True, inplace=True)
+    result = df[columns]
+    if 'ticker' in df.columns and len(df):
+        # A single-ticker file keeps its symbol for the Analysis record
+        result.attrs['ticker'] = df['ticker'].iloc[0]
+    return result
+
+# Share of bar-to-bar steps that may skip trading days (holidays are ~4%)
+IRREGULAR_GAP_FRACTION = 0.05
+
+# Longest gap, in trading days, tolerated in a regular series
+IRREGULAR_MAX_GAP = 5
+
+def trading_day_positions(dates):
+    """Return each date's position on a Monday-Friday trading-day axis.
+
+    The first bar is at 0, the next weekday at 1 and so on; intraday bars
+    fall between whole days. Timezone-aware dates are counted in their own
+    (exchange) time zone, so DST changes do not shift the bars. Series with
+    weekend bars (crypto, calendar-day data) are placed on a calendar-day
+    axis instead, since weekends would otherwise collapse onto Monday.
+    """
+    dates = pd.DatetimeIndex(dates)
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    dates = dates.astype('datetime64[ns]')
+    days = dates.normalize()
+    day_numbers = days.values.astype('datetime64[D]')
+    if np.any(days.dayofweek >= 5):
+        whole_days = (day_numbers - day_numbers[0]).astype(float)
+    else:
+        whole_days = np.busday_count(day_numbers[0], day_numbers)
+    fraction = (dates - days).total_seconds().to_numpy() / 86400
+    return whole_days + fraction
+
+def is_irregular_spacing(dates):
+    """Return True if bars are not (roughly) one per trading day.
+
+    Intraday bars, weekly bars and series with many or long gaps count as
+    irregular; ordinary market holidays do not. Series with a bar on every
+    calendar day (crypto) are regular.
+    """
+    if len(dates) < 3:
+        return False
+    steps = np.diff(trading_day_positions(dates))
+    return bool(np.mean(~np.isclose(steps, 1)) > IRREGULAR_GAP_FRACTION or steps.max() > IRREGULAR_MAX_GAP)
+
 def process_data(df):
     """Process and clean the input data.
     
     Args:
-        df (DataFrame): Input dataframe with stock data
+        df (DataFrame or PriceArrays): Input dataframe with stock data, or
+            arrays mapped from the shared price store
         
     Returns:
         DataFrame: Processed dataframe with date and price columns
+            (PriceArrays are returned unchanged; the store only holds
+            sorted bars with valid prices)
     """
+    if isinstance(df, PriceArrays):
+        return df
+
     try:
         # Make a copy to avoid modifying the original
         df = df.copy()
@@ -28,10 +241,12 @@ def process_data(df):
                 raise ValueError("No date column found")
         
         # Convert date column to datetime
-        df['date'] = pd.to_datetime(df['date'])
+        if not pd.api.types.is_datetime64_any_dtype(df['date']):
+            df['date'] = pd.to_datetime(df['date'])
         
-        # Sort by date
-        df.sort_values('date', inplace=True)
+        # Sort by date (already-ordered input, the common case, is left as is)
+        if not df['date'].is_monotonic_increasing:
+            df.sort_values('date', inplace=True)
         
         # Ensure we have a price column
         if 'price' not in df.columns:
@@ -51,154 +266,772 @@ def process_data(df):
         # Reset index
         df.reset_index(drop=True, inplace=True)
         
+        # Flag gappy or intraday series so the spectrum is computed on the
+        # real sample times instead of assuming one bar per trading day
+        df.attrs['irregular'] = is_irregular_spacing(df['date'])
+        
         return df
         
     except Exception as e:
         logger.error(f"Error in data processing: {str(e)}")
         raise
 
-def perform_fft(df):
+@lru_cache(maxsize=64)
+def _hann_window(n):
+    """Return a read-only Hann window of length n (shared between calls)."""
+    window = signal.windows.hann(n)
+    window.flags.writeable = False
+    return window
+
+@lru_cache(maxsize=64)
+def _frequency_grid(n):
+    """Return read-only (frequencies, periods) for an n-sample daily rfft."""
+    sample_freq = 1  # 1 sample per day
+    freqs = np.fft.rfftfreq(n, d=1/sample_freq)
+
+    # Calculate periods (in days)
+    periods = np.zeros_like(freqs)
+    non_zero_freqs = freqs != 0
+    periods[non_zero_freqs] = 1 / freqs[non_zero_freqs]
+
+    freqs.flags.writeable = False
+    periods.flags.writeable = False
+    return freqs, periods
+
+# Prices kept in a stored spectrum (FFTResult.to_bytes): generate_recommendation
+# reads the last two
+SPECTRUM_PRICE_TAIL = 2
+
+class FFTResult:
+    """Spectrum of one price series, held as numpy arrays.
+
+    Supports the dict interface the analysis functions use:
+    `result['periods']`, `result['amplitudes']` etc. return arrays without
+    copying. 'original_prices' and 'windowed_prices' are only converted to
+    lists when they are actually read. cycle_mode is the detect_cycles mode
+    that suits the frequency grid ('peaks' for dense grids).
+    """
+
+    __slots__ = ('frequencies', 'periods', 'amplitudes', 'phases', 'prices', 'windowed', 'cycle_mode')
+
+    _ARRAY_KEYS = ('frequencies', 'periods', 'amplitudes', 'phases')
+    _LIST_KEYS = {'original_prices': 'prices', 'windowed_prices': 'windowed'}
+
+    def __init__(self, frequencies, periods, amplitudes, phases, prices, windowed, cycle_mode='bins'):
+        self.frequencies = frequencies
+        self.periods = periods
+        self.amplitudes = amplitudes
+        self.phases = phases
+        self.prices = prices
+        self.windowed = windowed
+        self.cycle_mode = cycle_mode
+
+    def __getitem__(self, key):
+        if key in self._ARRAY_KEYS:
+            return getattr(self, key)
+        if key in self._LIST_KEYS:
+            return np.asarray(getattr(self, self._LIST_KEYS[key])).tolist()
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._ARRAY_KEYS or key in self._LIST_KEYS
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        return [*self._ARRAY_KEYS, *self._LIST_KEYS]
+
+    def __len__(self):
+        return len(self.frequencies)
+
+    @property
+    def nbytes(self):
+        return sum(np.asarray(getattr(self, name)).nbytes for name in self.__slots__)
+
+    def to_dict(self, include_prices=False):
+        """Return the results as a JSON-serializable dict of lists.
+
+        Args:
+            include_prices (bool): Also include the original and windowed prices
+        """
+        result = {key: getattr(self, key).tolist() for key in self._ARRAY_KEYS}
+        if include_prices:
+            for key in self._LIST_KEYS:
+                result[key] = self[key]
+        return result
+
+    def to_json(self, include_prices=False):
+        """Serialize the results to a JSON string."""
+        return json.dumps(self.to_dict(include_prices))
+
+    def to_bytes(self, price_tail=None):
+        """Serialize the arrays to an uncompressed .npz blob.
+
+        Args:
+            price_tail (int, optional): Keep only the last price_tail prices
+                and drop the windowed prices, for a compact blob that still
+                carries the latest bars (e.g. for generate_recommendation)
+        """
+        arrays = {name: np.asarray(getattr(self, name)) for name in self.__slots__}
+        if price_tail is not None:
+            arrays['prices'] = arrays['prices'][len(arrays['prices']) - price_tail:]
+            arrays['windowed'] = arrays['windowed'][:0]
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Rebuild a result serialized with to_bytes."""
+        with np.load(io.BytesIO(data)) as arrays:
+            fields = {name: arrays[name] for name in cls.__slots__ if name in arrays.files}
+        # Blobs stored before cycle_mode existed are rfft spectra
+        fields['cycle_mode'] = str(fields.get('cycle_mode', 'bins'))
+        return cls(**fields)
+
+def _spectrum_results(fft_result, n, prices, windowed_prices):
+    """Build the FFTResult for one rfft output."""
+    freqs, periods = _frequency_grid(n)
+
+    # Calculate amplitudes (normalized)
+    amplitudes = np.abs(fft_result) / (n/2)
+
+    # Calculate phases
+    phases = np.angle(fft_result)
+
+    # Skip the DC component
+    return FFTResult(freqs[1:], periods[1:], amplitudes[1:], phases[1:], prices, windowed_prices)
+
+def _price_vector(data):
+    """Return the price series of a DataFrame, PriceArrays or array as floats."""
+    if isinstance(data, np.ndarray):
+        prices = np.asarray(data, dtype=float)
+    else:
+        # A zero-copy view for memory-mapped arrays
+        prices = np.asarray(data['price'], dtype=float)
+
+    # Ensure we have enough data points
+    if len(prices) < 2:
+        raise ValueError("Not enough data points for FFT analysis")
+
+    # Remove any NaN values by interpolation
+    if np.isnan(prices).any():
+        prices = pd.Series(prices).interpolate().values
+    return prices
+
+def fft_method(df, method=None):
+    """Resolve the spectrum estimator perform_fft uses for a series.
+
+    Args:
+        df (DataFrame or PriceArrays): Processed price data
+        method (str, optional): 'fft', 'zoom', 'welch' or 'auto' (default:
+            FFT_METHOD)
+
+    Returns:
+        str: 'lomb_scargle' for irregularly spaced series, otherwise 'fft',
+            'zoom' or 'welch'. 'auto' picks Welch for histories of at least
+            WELCH_MIN_BARS bars, zoom below ZOOM_FFT_MAX_BARS bars and the
+            plain rfft in between
+    """
+    method = (method or FFT_METHOD).lower()
+    if method not in FFT_METHODS:
+        raise ValueError(f"Unknown FFT method: {method}")
+    if getattr(df, 'attrs', {}).get('irregular'):
+        return 'lomb_scargle'
+    if method == 'auto':
+        n = len(df) if isinstance(df, np.ndarray) else len(df['price'])
+        if WELCH_MIN_BARS and n >= WELCH_MIN_BARS:
+            return 'welch'
+        return 'zoom' if n < ZOOM_FFT_MAX_BARS else 'fft'
+    return method
+
+def perform_fft(df, method=None):
     """Perform Fast Fourier Transform on the price data.
     
+    Series that process_data flagged as irregularly spaced are analysed
+    with perform_lomb_scargle instead.
+    
     Args:
-        df (DataFrame): Processed dataframe with price data
+        df (DataFrame or PriceArrays): Processed price data
+        method (str, optional): 'fft' for the plain rfft, 'zoom' for
+            perform_zoom_fft's dense band spectrum, 'welch' for perform_welch,
+            or 'auto' to pick by history length (default: FFT_METHOD)
         
     Returns:
-        dict: FFT results including frequencies, amplitudes, and phases
+        FFTResult: FFT results including frequencies, amplitudes, and phases
     """
+    method = fft_method(df, method)
+    if method == 'lomb_scargle':
+        return perform_lomb_scargle(df)
+    if method == 'zoom':
+        return perform_zoom_fft(df)
+    if method == 'welch':
+        return perform_welch(df)
+
     try:
-        # Get the price data
-        prices = df['price'].values
-        
-        # Ensure we have enough data points
-        if len(prices) < 2:
-            raise ValueError("Not enough data points for FFT analysis")
-            
-        # Remove any NaN values by interpolation
-        if np.isnan(prices).any():
-            prices = pd.Series(prices).interpolate().values
-        
+        prices = _price_vector(df)
+        n = len(prices)
+
         # Apply a window function to reduce spectral leakage
-        window = signal.windows.hann(len(prices))
-        windowed_prices = prices * window
-        
+        windowed_prices = prices * _hann_window(n)
+
         # Perform FFT
         fft_result = np.fft.rfft(windowed_prices)
-        
-        # Calculate frequencies
-        n = len(prices)
-        sample_freq = 1  # 1 sample per day
-        freqs = np.fft.rfftfreq(n, d=1/sample_freq)
-        
-        # Calculate periods (in days)
-        periods = np.zeros_like(freqs)
-        non_zero_freqs = freqs != 0
-        periods[non_zero_freqs] = 1 / freqs[non_zero_freqs]
-        
-        # Calculate amplitudes (normalized)
-        amplitudes = np.abs(fft_result) / (n/2)
-        
-        # Calculate phases
-        phases = np.angle(fft_result)
-        
-        # Create results dictionary
-        fft_results = {
-            'frequencies': freqs[1:],  # Skip the DC component
-            'periods': periods[1:],    # Skip the DC component
-            'amplitudes': amplitudes[1:],  # Skip the DC component
-            'phases': phases[1:],  # Skip the DC component
-            'original_prices': prices.tolist(),
-            'windowed_prices': windowed_prices.tolist()
-        }
-        
-        return fft_results
+
+        return _spectrum_results(fft_result, n, prices, windowed_prices)
     
     except Exception as e:
         logger.error(f"Error in FFT analysis: {str(e)}")
         raise
 
-def detect_cycles(fft_results, min_period=2, max_period=252, strength_threshold=0.1):
+def _band_spectrum(windowed_prices, frequencies):
+    """Evaluate the DFT of a windowed series at arbitrary frequencies (cycles/day)."""
+    zoom_fft = getattr(signal, 'zoom_fft', None)
+    if zoom_fft is not None and len(frequencies) > 1:
+        return zoom_fft(windowed_prices, [frequencies[0], frequencies[-1]], m=len(frequencies),
+                        fs=1, endpoint=True)
+
+    # SciPy < 1.8 has no chirp-z transform; evaluate the DFT sums directly
+    # (one points x n matrix product, fine for daily histories)
+    samples = np.arange(len(windowed_prices))
+    return np.exp(-2j * np.pi * np.outer(frequencies, samples)) @ windowed_prices
+
+def perform_lomb_scargle(df, max_period=None, oversampling=1):
+    """Compute the spectrum of an irregularly sampled series.
+
+    Uses a fast (Press-Rybicki) Lomb-Scargle periodogram on the trading-day
+    position of every bar, so gaps are neither interpolated nor collapsed.
+    Periods are in trading days, as with perform_fft.
+
+    Args:
+        df (DataFrame): Processed price data with a date column
+        max_period (float, optional): Longest period evaluated (default:
+            the span of the series)
+        oversampling (int): Frequency grid points per 1/span; 1 matches the
+            bin spacing of perform_fft on a gap-free series
+
+    Returns:
+        FFTResult: Frequencies up to 0.5 cycles per trading day with the
+            fitted sinusoid amplitudes (scaled by the Hann window's coherent
+            gain of 0.5 so they compare with perform_fft) and phases
+    """
+    try:
+        prices = np.asarray(df['price'], dtype=float)
+        positions = trading_day_positions(df['date'])
+        valid = ~np.isnan(prices)
+        prices, positions = prices[valid], positions[valid]
+
+        span = positions[-1] - positions[0]
+        if len(prices) < 3 or span <= 0:
+            raise ValueError("Not enough data points for Lomb-Scargle analysis")
+
+        df_step = 1 / (max(span, max_period or 0) * max(1, int(oversampling)))
+        n_freq = int(0.5 / df_step)
+        frequencies, _, amplitudes, phases = lomb_scargle(positions - positions[0], prices, df_step, n_freq)
+
+        return FFTResult(
+            frequencies,
+            1 / frequencies,
+            0.5 * amplitudes,
+            phases,
+            prices,
+            prices
+        )
+
+    except Exception as e:
+        logger.error(f"Error in Lomb-Scargle analysis: {str(e)}")
+        raise
+
+# Spectrum estimator perform_fft uses by default: 'fft', 'zoom', 'welch' or 'auto'
+FFT_METHOD = os.getenv('FFT_METHOD', 'fft').lower()
+FFT_METHODS = ('fft', 'zoom', 'welch', 'auto')
+
+# With FFT_METHOD=auto, histories shorter than this get the zoom FFT
+ZOOM_FFT_MAX_BARS = int(os.getenv('ZOOM_FFT_MAX_BARS', '512'))
+
+# With FFT_METHOD=auto, histories at least this long get a Welch
+# spectrum (0 disables); its 512-bar segments still span the 252-day band
+WELCH_MIN_BARS = int(os.getenv('WELCH_MIN_BARS', '2048'))
+
+def perform_zoom_fft(df, min_period=2, max_period=252, points=1024):
+    """Evaluate a dense spectrum over the cycle band only.
+
+    The Hann-windowed prices are transformed with a chirp-z transform on a
+    uniform frequency grid between 1/max_period and 1/min_period, instead
+    of rfft's N/2 bins spaced 1/N apart. Cycle lengths are therefore
+    resolved finer than the length of the history allows with perform_fft
+    (the main lobe width is unchanged; peaks are located more precisely).
+    The result's cycle_mode is 'peaks', since neighbouring grid points
+    belong to the same peak.
+
+    Args:
+        df (DataFrame or PriceArrays): Processed price data
+        min_period (float): Shortest period in the band (in days, >= 2)
+        max_period (float): Longest period in the band (in days)
+        points (int): Number of frequencies evaluated in the band
+
+    Returns:
+        FFTResult: Band spectrum with the same normalization as perform_fft
+    """
+    try:
+        prices = _price_vector(df)
+        n = len(prices)
+        min_period = max(float(min_period), 2.0)
+        if max_period <= min_period:
+            raise ValueError("max_period must be greater than min_period")
+
+        window = _hann_window(n)
+        windowed_prices = prices * window
+
+        # rfft bins sit on the zeros of the window's DC leakage; a dense grid
+        # does not, so remove the (window-weighted) price level first
+        level = np.dot(window, prices) / np.sum(window)
+
+        frequencies = np.linspace(1 / max_period, 1 / min_period, int(points))
+        spectrum = _band_spectrum((prices - level) * window, frequencies)
+
+        return FFTResult(
+            frequencies,
+            1 / frequencies,
+            np.abs(spectrum) / (n/2),
+            np.angle(spectrum),
+            prices,
+            windowed_prices,
+            cycle_mode='peaks'
+        )
+
+    except Exception as e:
+        logger.error(f"Error in zoom FFT analysis: {str(e)}")
+        raise
+
+def _decimated_chunks(prices, q, chunk):
+    """Yield the series low-pass filtered and downsampled by q, chunk by chunk.
+
+    Kept samples are aligned so the last bar is always included. The
+    anti-aliasing filter is the Chebyshev type I filter scipy.signal.decimate
+    uses, run causally with carried state (phase does not matter for a
+    power spectrum).
+    """
+    n = len(prices)
+    if q == 1:
+        for i in range(0, n, chunk):
+            yield prices[i:i + chunk]
+        return
+
+    sos = signal.cheby1(8, 0.05, 0.8 / q, output='sos')
+    state = signal.sosfilt_zi(sos) * prices[0]
+    first = (n - 1) % q
+    for i in range(0, n, chunk):
+        filtered, state = signal.sosfilt(sos, prices[i:i + chunk], zi=state)
+        yield filtered[(first - i) % q::q]
+
+def perform_welch(df, segment=512, overlap=0.5, decimate=1, chunk_segments=64):
+    """Compute a Welch averaged periodogram of the price data.
+
+    The series is cut into Hann-windowed, overlapping segments whose power
+    spectra are averaged, which trades frequency resolution for a much less
+    noisy spectrum. Segments are produced in chunks of chunk_segments, so
+    working memory is bounded by the segment size rather than the history
+    length (memory-mapped price arrays are never copied as a whole).
+
+    Args:
+        df (DataFrame or PriceArrays): Processed price data
+        segment (int): Samples per segment after decimation (shortened to
+            the history length if needed)
+        overlap (float): Fraction of a segment shared with the next one (0-0.9)
+        decimate (int): Downsampling factor applied first (e.g. to turn
+            intraday bars into roughly daily samples)
+        chunk_segments (int): Segments transformed per rfft call
+
+    Returns:
+        FFTResult: Averaged spectrum with perform_fft's normalization; the
+            phases (and the prices fields) are those of the most recent
+            segment, measured from its first sample as perform_fft measures
+            them from the first bar of the series
+    """
+    try:
+        prices = _price_vector(df)
+        decimate = max(1, int(decimate))
+        if not 0 <= overlap < 1:
+            raise ValueError("overlap must be between 0 and 1")
+
+        total = (len(prices) - 1 - (len(prices) - 1) % decimate) // decimate + 1
+        segment = min(int(segment), total)
+        if segment < 4:
+            raise ValueError("Not enough data points for Welch analysis")
+        step = max(1, int(round(segment * (1 - overlap))))
+        window = _hann_window(segment)
+
+        # Segments are aligned so the last one ends on the latest bar
+        next_start = (total - segment) % step
+        carry = np.empty(0)
+        carry_start = 0
+        power = np.zeros(segment // 2 + 1)
+        count = 0
+        last_spectrum = last_segment = None
+
+        for chunk in _decimated_chunks(prices, decimate, chunk_segments * step * decimate):
+            buffer = np.concatenate([carry, chunk])
+            end = carry_start + len(buffer)
+
+            if next_start + segment <= end:
+                local = next_start - carry_start
+                frames = sliding_window_view(buffer[local:], segment)[::step]
+                spectra = np.fft.rfft(frames * window, axis=1)
+                power += np.sum(np.abs(spectra) ** 2, axis=0)
+                count += len(frames)
+                last_spectrum, last_segment = spectra[-1], frames[-1].copy()
+                next_start += len(frames) * step
+
+            # Keep only what the next segment still needs
+            keep_from = max(next_start - carry_start, 0)
+            carry = buffer[keep_from:]
+            carry_start += keep_from
+
+        freqs = np.fft.rfftfreq(segment, d=decimate)
+        amplitudes = np.sqrt(power / count) / (segment/2)
+
+        # Skip the DC component
+        return FFTResult(
+            freqs[1:],
+            1 / freqs[1:],
+            amplitudes[1:],
+            np.angle(last_spectrum)[1:],
+            last_segment,
+            last_segment * window
+        )
+
+    except Exception as e:
+        logger.error(f"Error in Welch analysis: {str(e)}")
+        raise
+
+def perform_fft_batch(series, method=None):
+    """Perform the FFT analysis for many price series at once.
+
+    Series are bucketed by length; each bucket is stacked into a
+    (n_series x n_samples) matrix and transformed with a single rfft call
+    along the sample axis. Padding is avoided so every spectrum is exactly
+    what perform_fft returns for that series; series that perform_fft
+    would not analyse with the plain rfft are passed to it one by one.
+
+    Args:
+        series (dict or ndarray): Mapping of ticker to DataFrame, PriceArrays
+            or 1-D price array, or a 2-D array with one series per row
+        method (str, optional): See perform_fft
+
+    Returns:
+        dict or list: FFTResult per ticker (a list in row order
+            when given a 2-D array)
+    """
+    try:
+        if isinstance(series, np.ndarray):
+            if series.ndim != 2:
+                raise ValueError("Expected a 2-D array with one price series per row")
+            results = perform_fft_batch(dict(enumerate(series)), method)
+            return [results[row] for row in range(len(series))]
+
+        results = {}
+        buckets = defaultdict(list)
+        for key, data in series.items():
+            if fft_method(data, method) != 'fft':
+                results[key] = perform_fft(data, method)
+                continue
+            prices = _price_vector(data)
+            buckets[len(prices)].append((key, prices))
+
+        for n, members in buckets.items():
+            matrix = np.vstack([prices for _, prices in members])
+            windowed = matrix * _hann_window(n)
+            spectra = np.fft.rfft(windowed, axis=1)
+
+            for row, (key, prices) in enumerate(members):
+                results[key] = _spectrum_results(spectra[row], n, prices, windowed[row])
+
+        return results
+
+    except Exception as e:
+        logger.error(f"Error in batched FFT analysis: {str(e)}")
+        raise
+
+def rolling_spectrum(df, window=252, step=5):
+    """Compute the spectrum of every rolling window of the price data.
+
+    All windows are taken as one strided view of the price array, windowed
+    with a single broadcast multiply and transformed with one rfft call, so
+    each window's spectrum equals perform_fft on that slice of prices.
+    Windows end on the latest bar, so the last row is always current.
+
+    Args:
+        df (DataFrame or PriceArrays): Processed price data
+        window (int): Bars per window (also caps the longest period)
+        step (int): Bars between consecutive windows
+
+    Returns:
+        dict: 'dates' and 'ends' (end date and bar index of each window),
+            'periods' (all non-DC periods), and 'amplitudes' and 'phases'
+            (windows x periods arrays)
+    """
+    prices = _price_vector(df)
+    window = int(window)
+    step = max(1, int(step))
+    if window < 4 or window > len(prices):
+        raise ValueError(f"Window of {window} bars does not fit {len(prices)} data points")
+
+    first = (len(prices) - window) % step
+    frames = sliding_window_view(prices[first:], window)[::step]
+    spectra = np.fft.rfft(frames * _hann_window(window), axis=1)
+
+    freqs, periods = _frequency_grid(window)
+    positive = freqs > 0
+    spectra = spectra[:, positive]
+
+    ends = first + np.arange(len(frames)) * step + window - 1
+    if 'date' in df.columns:
+        dates = np.asarray(df['date'], dtype='datetime64[ns]')[ends]
+    else:
+        dates = ends
+
+    return {
+        'dates': dates,
+        'ends': ends,
+        'periods': periods[positive],
+        'amplitudes': np.abs(spectra) / (window/2),
+        'phases': np.angle(spectra)
+    }
+
+def perform_stft(df, window=252, step=5, min_period=2, max_period=252, top_n=3):
+    """Compute a rolling (short-time) FFT of the price data.
+
+    Args:
+        df (DataFrame or PriceArrays): Processed price data
+        window (int): Bars per window (also caps the longest period)
+        step (int): Bars between consecutive windows
+        min_period (int): Minimum period to keep (in days)
+        max_period (int): Maximum period to keep (in days)
+        top_n (int): Dominant cycles to list per window
+
+    Returns:
+        dict: 'dates' (end date of each window), 'periods' (band periods),
+            'amplitudes' (float32 array of windows x periods) and 'cycles'
+            (DataFrame with the top_n cycles of every window)
+    """
+    try:
+        spectrum = rolling_spectrum(df, window=window, step=step)
+        periods = spectrum['periods']
+        band = (periods >= min_period) & (periods <= max_period)
+        if not band.any():
+            raise ValueError(f"No periods between {min_period} and {max_period} days for a {window}-bar window")
+        band_periods = periods[band]
+        amplitudes = spectrum['amplitudes'][:, band]
+
+        cycles = _cycle_table(spectrum['dates'], band_periods, amplitudes, spectrum['phases'][:, band], top_n)
+
+        return {
+            'dates': spectrum['dates'],
+            'periods': band_periods,
+            'amplitudes': amplitudes.astype(np.float32),
+            'cycles': cycles
+        }
+
+    except Exception as e:
+        logger.error(f"Error in rolling FFT analysis: {str(e)}")
+        raise
+
+def detect_window_cycles(spectrum, min_period=2, max_period=252, strength_threshold=0.1, top_k=3):
+    """Detect dominant cycles in every window of a rolling spectrum.
+
+    Applies the detect_cycles rules (period range, strength relative to the
+    strongest bin in range, threshold, strongest first) to all windows at
+    once, so one rolling_spectrum can be re-used for many parameter sets.
+
+    Args:
+        spectrum (dict): Output of rolling_spectrum
+        min_period (int): Minimum period to consider (in days)
+        max_period (int): Maximum period to consider (in days)
+        strength_threshold (float): Minimum relative strength to consider a cycle
+        top_k (int): Cycles kept per window
+
+    Returns:
+        DataFrame: detect_cycles columns plus 'window' (row of the window in
+            the spectrum), each window's rows strongest first
+    """
+    periods = spectrum['periods']
+    amplitudes = spectrum['amplitudes']
+    in_range = (periods >= min_period) & (periods <= max_period)
+    if not in_range.any():
+        raise ValueError(f"No periods between {min_period} and {max_period} days")
+
+    max_amplitude = np.max(amplitudes[:, in_range], axis=1, keepdims=True)
+    strengths = amplitudes / max_amplitude
+    candidate = in_range & (strengths >= strength_threshold)
+
+    # Strongest top_k candidates per window, strongest first
+    top_k = min(top_k, int(in_range.sum()))
+    ranked = np.where(candidate, amplitudes, -np.inf)
+    top = np.argpartition(-ranked, top_k - 1, axis=1)[:, :top_k]
+    rows = np.arange(len(amplitudes))[:, None]
+    top = np.take_along_axis(top, np.argsort(-ranked[rows, top], axis=1, kind='stable'), axis=1)
+    keep = candidate[rows, top]
+
+    windows = np.broadcast_to(rows, top.shape)[keep]
+    selected = top[keep]
+    cycles = _cycle_fields(periods[selected], amplitudes[windows, selected], strengths[windows, selected],
+                           spectrum['phases'][windows, selected])
+    cycles.insert(0, 'window', windows)
+    return cycles
+
+def _cycle_table(dates, periods, amplitudes, phases, top_n):
+    """Build the per-window dominant-cycle table for perform_stft."""
+    top_n = min(top_n, amplitudes.shape[1])
+    rows = np.arange(len(amplitudes))[:, None]
+
+    # Strongest top_n bins per window, strongest first
+    top = np.argpartition(-amplitudes, top_n - 1, axis=1)[:, :top_n]
+    top = np.take_along_axis(top, np.argsort(-amplitudes[rows, top], axis=1), axis=1)
+
+    top_amplitudes = amplitudes[rows, top]
+    top_periods = periods[top]
+    top_phases = phases[rows, top]
+
+    table = _cycle_fields(
+        top_periods.ravel(),
+        top_amplitudes.ravel(),
+        (top_amplitudes / np.max(amplitudes, axis=1, keepdims=True)).ravel(),
+        top_phases.ravel()
+    )
+    table.insert(0, 'rank', np.tile(np.arange(1, top_n + 1), len(amplitudes)))
+    table.insert(0, 'date', np.repeat(dates, top_n))
+    return table
+
+def _cycle_fields(periods, amplitudes, strengths, phases):
+    """Compute the rounded cycle fields for arrays of cycles as one DataFrame."""
+    # Calculate current phase position
+    # This is a simplified approximation
+    current_position = (phases + np.pi) / (2 * np.pi)
+    days_to_peak = periods * (1 - current_position)
+    days_to_trough = periods * (0.5 - current_position)
+    days_to_trough = np.where(days_to_trough < 0, days_to_trough + periods, days_to_trough)
+
+    return pd.DataFrame({
+        'length': np.round(periods, 1),
+        'strength': np.round(strengths, 3),
+        'amplitude': np.round(amplitudes, 3),
+        'phase': np.round(phases, 3),
+        'current_position': np.round(current_position, 2),
+        'days_to_peak': np.round(days_to_peak, 1),
+        'days_to_trough': np.round(days_to_trough, 1)
+    })
+
+def cycle_mode(fft_results):
+    """Return the detect_cycles mode suited to a spectrum ('bins' for plain dicts)."""
+    return getattr(fft_results, 'cycle_mode', 'bins')
+
+def _select_cycles(periods, amplitudes, min_period, max_period, strength_threshold, mode, top_k):
+    """Return (indices of the dominant cycles strongest first, strongest amplitude in range)."""
+    # Filter by period range
+    mask = (periods >= min_period) & (periods <= max_period)
+    
+    # Relative strengths against the strongest bin in the range
+    max_amplitude = np.max(amplitudes[mask]) if mask.any() else 1
+    
+    if mode == 'peaks':
+        # Local maxima over the whole spectrum, so a peak at the edge of
+        # the period range is not mistaken for one
+        is_peak = np.zeros(len(amplitudes), dtype=bool)
+        if len(amplitudes) > 2:
+            is_peak[1:-1] = (amplitudes[1:-1] > amplitudes[:-2]) & (amplitudes[1:-1] >= amplitudes[2:])
+        mask &= is_peak
+    elif mode != 'bins':
+        raise ValueError(f"Unknown cycle detection mode: {mode}")
+    
+    # Identify dominant cycles (above strength threshold)
+    mask &= amplitudes / max_amplitude >= strength_threshold
+    candidates = np.flatnonzero(mask)
+    
+    # Sort by strength (amplitude), partitioning first when only the top k are needed
+    if top_k is not None and top_k < len(candidates):
+        candidates = candidates[np.argpartition(-amplitudes[candidates], top_k - 1)[:top_k]]
+    selected = candidates[np.argsort(-amplitudes[candidates])]
+    return selected, max_amplitude
+
+def detect_cycles(fft_results, min_period=2, max_period=252, strength_threshold=0.1,
+                  mode=None, top_k=None, as_frame=False):
     """Detect dominant cycles from FFT results.
     
     Args:
-        fft_results (dict): Results from the FFT analysis
+        fft_results (FFTResult or dict): Results from the FFT analysis
         min_period (int): Minimum period to consider (in days)
         max_period (int): Maximum period to consider (in days)
         strength_threshold (float): Minimum relative strength to consider a cycle
+        mode (str, optional): 'bins' keeps every frequency bin above the
+            threshold; 'peaks' keeps only local maxima of the amplitude
+            spectrum, so the leakage bins around a cycle are not reported as
+            separate cycles (default: the spectrum's cycle_mode, else 'bins')
+        top_k (int, optional): Only return the k strongest cycles
+        as_frame (bool): Return a DataFrame instead of a list of dicts
         
     Returns:
-        list: List of dictionaries containing cycle information
+        list or DataFrame: Cycle information, strongest first
     """
     try:
-        periods = fft_results['periods']
-        amplitudes = fft_results['amplitudes']
-        phases = fft_results['phases']
-        
-        # Filter by period range
-        # Convert to numpy arrays if they're lists (ensures proper comparison)
-        if isinstance(periods, list):
-            periods = np.array(periods)
-        if isinstance(amplitudes, list):
-            amplitudes = np.array(amplitudes)
-        if isinstance(phases, list):
-            phases = np.array(phases)
-            
-        mask = (periods >= min_period) & (periods <= max_period)
-        filtered_periods = periods[mask]
-        filtered_amplitudes = amplitudes[mask]
-        filtered_phases = phases[mask]
-        
-        # Find the maximum amplitude
-        if isinstance(filtered_amplitudes, list):
-            max_amplitude = max(filtered_amplitudes) if filtered_amplitudes else 1 
-        else:
-            max_amplitude = np.max(filtered_amplitudes) if len(filtered_amplitudes) > 0 else 1
-        
-        # Calculate relative strengths
-        # Handle the case where filtered_amplitudes might be a list
-        if isinstance(filtered_amplitudes, list):
-            filtered_amplitudes_np = np.array(filtered_amplitudes)
-            relative_strengths = filtered_amplitudes_np / max_amplitude
-        else:
-            relative_strengths = filtered_amplitudes / max_amplitude
-        
-        # Identify dominant cycles (above strength threshold)
-        # Ensure we're working with numpy arrays
-        if isinstance(relative_strengths, list):
-            relative_strengths = np.array(relative_strengths)
-            
-        dominant_indices = np.where(relative_strengths >= strength_threshold)[0]
-        
-        # Sort by strength (amplitude)
-        sorted_indices = dominant_indices[np.argsort(-filtered_amplitudes[dominant_indices])]
-        
-        # Collect cycle information
-        dominant_cycles = []
-        for idx in sorted_indices:
-            period = filtered_periods[idx]
-            amplitude = filtered_amplitudes[idx]
-            phase = filtered_phases[idx]
-            
-            # Calculate current phase position
-            # This is a simplified approximation
-            current_phase_position = (phase + np.pi) / (2 * np.pi)
-            days_until_next_peak = period * (1 - current_phase_position)
-            days_until_next_trough = period * (0.5 - current_phase_position)
-            if days_until_next_trough < 0:
-                days_until_next_trough += period
-            
-            dominant_cycles.append({
-                'length': round(period, 1),
-                'strength': round(relative_strengths[idx], 3),
-                'amplitude': round(amplitude, 3),
-                'phase': round(phase, 3),
-                'current_position': round(current_phase_position, 2),
-                'days_to_peak': round(days_until_next_peak, 1),
-                'days_to_trough': round(days_until_next_trough, 1)
-            })
-        
-        return dominant_cycles
+        periods = np.asarray(fft_results['periods'], dtype=float)
+        amplitudes = np.asarray(fft_results['amplitudes'], dtype=float)
+        phases = np.asarray(fft_results['phases'], dtype=float)
+        
+        selected, max_amplitude = _select_cycles(periods, amplitudes, min_period, max_period,
+                                                 strength_threshold, mode or cycle_mode(fft_results), top_k)
+        
+        cycles = _cycle_fields(
+            periods[selected],
+            amplitudes[selected],
+            amplitudes[selected] / max_amplitude,
+            phases[selected]
+        )
+        
+        return cycles if as_frame else cycles.to_dict(orient='records')
     
     except Exception as e:
         logger.error(f"Error in cycle detection: {str(e)}")
         raise
+
+def detect_cycles_batch(fft_results, min_period=2, max_period=252, strength_threshold=0.1,
+                        mode=None, top_k=None):
+    """Detect dominant cycles for many tickers into one table.
+
+    Applies detect_cycles to every spectrum but builds the cycle fields
+    with a single vectorized pass, avoiding a DataFrame per ticker.
+
+    Args:
+        fft_results (dict): Mapping of ticker to FFTResult (e.g. from
+            perform_fft_batch)
+        Other arguments: See detect_cycles
+
+    Returns:
+        DataFrame: detect_cycles columns plus 'ticker', each ticker's rows
+            strongest first
+    """
+    try:
+        tickers, periods, amplitudes, strengths, phases = [], [], [], [], []
+        for ticker, result in fft_results.items():
+            ticker_periods = np.asarray(result['periods'], dtype=float)
+            ticker_amplitudes = np.asarray(result['amplitudes'], dtype=float)
+            selected, max_amplitude = _select_cycles(ticker_periods, ticker_amplitudes, min_period, max_period,
+                                                     strength_threshold, mode or cycle_mode(result), top_k)
+            tickers.append(np.full(len(selected), ticker, dtype=object))
+            periods.append(ticker_periods[selected])
+            amplitudes.append(ticker_amplitudes[selected])
+            strengths.append(ticker_amplitudes[selected] / max_amplitude)
+            phases.append(np.asarray(result['phases'], dtype=float)[selected])
+
+        if not tickers:
+            return _cycle_fields(*(np.empty(0),) * 4).assign(ticker=pd.Series(dtype=object))
+
+        cycles = _cycle_fields(np.concatenate(periods), np.concatenate(amplitudes),
+                               np.concatenate(strengths), np.concatenate(phases))
+        cycles['ticker'] = np.concatenate(tickers)
+        return cycles
+
+    except Exception as e:
+        logger.error(f"Error in batched cycle detection: {str(e)}")
+        raise
@@ -4,136 +4,240 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def generate_recommendation(df, dominant_cycles):
+# A cycle within this fraction of its length of a trough (peak) signals BUY (SELL)
+TROUGH_WINDOW = 0.1
+
+# Net signal beyond which the action is BUY or SELL instead of HOLD
+SIGNAL_CUTOFF = 0.2
+
+# Price change between the last two bars that counts as momentum, and its weight
+MOMENTUM_THRESHOLD = 0.02
+MOMENTUM_WEIGHT = 0.1
+
+MAX_CONFIDENCE = 0.9
+
+# Strongest cycles considered per ticker
+TOP_CYCLES = 3
+
+_CYCLE_COLUMNS = ['length', 'strength', 'days_to_peak', 'days_to_trough']
+
+
+def _long_cycle_table(cycles):
+    """Normalize per-ticker cycles into one table with a ticker column."""
+    if isinstance(cycles, pd.DataFrame):
+        return cycles
+
+    frames = []
+    for ticker, ticker_cycles in cycles.items():
+        frame = ticker_cycles if isinstance(ticker_cycles, pd.DataFrame) else pd.DataFrame(
+            list(ticker_cycles), columns=_CYCLE_COLUMNS)
+        frames.append(frame[_CYCLE_COLUMNS].assign(ticker=ticker))
+    if not frames:
+        return pd.DataFrame(columns=['ticker', *_CYCLE_COLUMNS])
+    return pd.concat(frames, ignore_index=True)
+
+
+def score_recommendations(cycles, prices, trough_window=TROUGH_WINDOW, signal_cutoff=SIGNAL_CUTOFF):
+    """Score BUY/SELL/HOLD for many tickers at once with array operations.
+
+    Applies the same rules as generate_recommendation, without building any
+    reasoning text (see explain_recommendation).
+
+    Args:
+        cycles (DataFrame or dict): Either a table with a 'ticker' column plus
+            detect_cycles columns (each ticker's rows strongest first), or a
+            mapping of ticker to a detect_cycles list or DataFrame
+        prices (DataFrame or dict): 'prev_price' and 'last_price' columns
+            indexed by ticker, or a mapping of ticker to (prev_price, last_price)
+        trough_window (float): Fraction of a cycle's length within which a
+            trough (peak) counts as a BUY (SELL) signal
+        signal_cutoff (float): Net signal needed for BUY or SELL
+
+    Returns:
+        DataFrame: Indexed by ticker with action, confidence, buy_signal,
+            sell_signal, momentum, overall_signal and cycle_count
+    """
+    if not isinstance(prices, pd.DataFrame):
+        prices = pd.DataFrame.from_dict(prices, orient='index', columns=['prev_price', 'last_price'])
+    tickers = prices.index
+    prev_price = prices['prev_price'].to_numpy(dtype=float)
+    last_price = prices['last_price'].to_numpy(dtype=float)
+
+    table = _long_cycle_table(cycles)
+    codes = tickers.get_indexer(table['ticker'])
+    known = codes >= 0
+
+    # Only the strongest TOP_CYCLES cycles of each ticker
+    rank = table.groupby('ticker', sort=False).cumcount().to_numpy()
+    used = known & (rank < TOP_CYCLES)
+    codes = codes[used]
+    length = table['length'].to_numpy(dtype=float)[used]
+    weight = table['strength'].to_numpy(dtype=float)[used]
+    near_trough = table['days_to_trough'].to_numpy(dtype=float)[used] <= length * trough_window
+    near_peak = table['days_to_peak'].to_numpy(dtype=float)[used] <= length * trough_window
+
+    n = len(tickers)
+    # (bincount returns integers for empty input, hence the casts)
+    total_weight = np.bincount(codes, weights=weight, minlength=n).astype(float)
+    buy = np.bincount(codes, weights=weight * near_trough, minlength=n).astype(float)
+    sell = np.bincount(codes, weights=weight * near_peak, minlength=n).astype(float)
+    cycle_count = np.bincount(codes, minlength=n)
+
+    # Normalize signals by total weight
+    has_weight = total_weight > 0
+    buy = np.divide(buy, total_weight, out=buy, where=has_weight)
+    sell = np.divide(sell, total_weight, out=sell, where=has_weight)
+
+    # Adjust signals based on recent price movement (momentum)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        momentum = (last_price - prev_price) / prev_price
+    sell = sell + MOMENTUM_WEIGHT * (momentum > MOMENTUM_THRESHOLD)
+    buy = buy + MOMENTUM_WEIGHT * (momentum < -MOMENTUM_THRESHOLD)
+
+    overall = buy - sell
+    action = np.select([overall > signal_cutoff, overall < -signal_cutoff], ['BUY', 'SELL'], 'HOLD')
+    confidence = np.where(action == 'HOLD', 0.5 - np.abs(overall),
+                          np.minimum(MAX_CONFIDENCE, 0.5 + np.abs(overall)))
+
+    # Tickers without any cycle get a neutral HOLD regardless of momentum
+    no_cycles = cycle_count == 0
+    action[no_cycles] = 'HOLD'
+    confidence[no_cycles] = 0.5
+
+    return pd.DataFrame({
+        'action': action,
+        'confidence': confidence,
+        'buy_signal': buy,
+        'sell_signal': sell,
+        'momentum': momentum,
+        'overall_signal': overall,
+        'cycle_count': cycle_count
+    }, index=tickers)
+
+
+def explain_recommendation(score, dominant_cycles, trough_window=TROUGH_WINDOW):
+    """Build the human-readable reasoning for one scored ticker.
+
+    Args:
+        score (Series or dict): The ticker's score_recommendations row
+        dominant_cycles (list): The ticker's detect_cycles output
+        trough_window (float): As passed to score_recommendations
+
+    Returns:
+        tuple: (reasoning, details) lists as in generate_recommendation
+    """
+    reasoning, details = [], []
+
+    if not len(dominant_cycles):
+        reasoning.append("No significant market cycles detected. This suggests the market lacks clear cyclical patterns, making it difficult to predict future price movements.")
+        return reasoning, details
+
+    if isinstance(dominant_cycles, pd.DataFrame):
+        dominant_cycles = dominant_cycles.to_dict(orient='records')
+
+    # Add details for each cycle
+    for cycle in dominant_cycles[:TOP_CYCLES]:
+        days_to_trough = cycle['days_to_trough']
+        days_to_peak = cycle['days_to_peak']
+
+        details.append({
+            'cycle_length': f"{cycle['length']:.1f} days",
+            'strength': f"{cycle['strength']:.3f}",
+            'days_to_trough': f"{days_to_trough:.1f}",
+            'days_to_peak': f"{days_to_peak:.1f}"
+        })
+
+        if days_to_trough <= cycle['length'] * trough_window:
+            reasoning.append(
+                f"A {cycle['length']:.1f}-day market cycle is nearing its lowest point (trough) in {days_to_trough:.1f} days. "
+                f"This cycle has a strength rating of {cycle['strength']:.2f}, indicating a potential buying opportunity "
+                f"as prices typically rise after reaching this point in the cycle."
+            )
+
+        if days_to_peak <= cycle['length'] * trough_window:
+            reasoning.append(
+                f"A {cycle['length']:.1f}-day market cycle is approaching its highest point (peak) in {days_to_peak:.1f} days. "
+                f"With a cycle strength of {cycle['strength']:.2f}, this suggests a potential selling opportunity "
+                f"as prices typically decline after reaching this peak."
+            )
+
+    recent_change = score['momentum']
+    if recent_change > MOMENTUM_THRESHOLD:
+        reasoning.append(
+            f"The price has increased by {recent_change:.1%} recently, suggesting potential profit-taking opportunity. "
+            "This upward momentum might indicate a short-term peak forming."
+        )
+    elif recent_change < -MOMENTUM_THRESHOLD:
+        reasoning.append(
+            f"The price has decreased by {abs(recent_change):.1%} recently, presenting a potential value buying opportunity. "
+            "This downward movement might indicate a short-term bottom forming."
+        )
+
+    # Add comprehensive summary reasoning based on action
+    if score['action'] == 'BUY':
+        reasoning.insert(0,
+            "Multiple market cycles are converging towards their low points, suggesting a strong buying opportunity. "
+            "The alignment of these cycles, combined with their respective strengths, indicates a higher probability "
+            "of price appreciation in the near future."
+        )
+    elif score['action'] == 'SELL':
+        reasoning.insert(0,
+            "Multiple market cycles are approaching their peak values, indicating a strong selling opportunity. "
+            "The convergence of these cycle peaks, weighted by their individual strengths, suggests an increased "
+            "likelihood of price decline in the near term."
+        )
+    else:  # HOLD
+        if not reasoning:
+            reasoning.append(
+                "Current market cycles show balanced or unclear signals. No strong buying or selling pressure detected. "
+                "It's advisable to maintain current positions until clearer patterns emerge."
+            )
+        reasoning.insert(0,
+            "Current market cycles show mixed or weak signals without clear directional bias. "
+            "The combination of cycle positions and their strengths suggests maintaining current positions "
+            "until more definitive patterns emerge."
+        )
+
+    return reasoning, details
+
+
+def generate_recommendation(df, dominant_cycles, trough_window=TROUGH_WINDOW, signal_cutoff=SIGNAL_CUTOFF):
     """Generate trading recommendations based on detected cycles.
     
     Args:
-        df (DataFrame): Processed dataframe with price data
+        df (DataFrame or PriceArrays): Processed price data
         dominant_cycles (list): List of dominant cycles detected
+        trough_window (float): Fraction of a cycle's length within which a
+            trough (peak) counts as a BUY (SELL) signal
+        signal_cutoff (float): Net signal needed for BUY or SELL
         
     Returns:
         dict: Recommendation with action, confidence, and reasoning
     """
     try:
-        # Initialize recommendation
-        recommendation = {
-            'action': 'HOLD',
-            'confidence': 0.5,
-            'reasoning': [],
-            'details': []
-        }
-        
         # If no dominant cycles, return HOLD with clear explanation
-        if not dominant_cycles:
-            recommendation['reasoning'].append("No significant market cycles detected. This suggests the market lacks clear cyclical patterns, making it difficult to predict future price movements.")
-            return recommendation
+        if not len(dominant_cycles):
+            reasoning, details = explain_recommendation(None, dominant_cycles)
+            return {'action': 'HOLD', 'confidence': 0.5, 'confidence_pct': '50.0%', 'reasoning': reasoning,
+                    'details': details}
         
         # Get latest price data
-        last_price = df['price'].iloc[-1]
-        prev_price = df['price'].iloc[-2] if len(df) > 1 else last_price
-        
-        # Calculate recent price change
-        recent_change = (last_price - prev_price) / prev_price
-        
-        # Check if we're near a cycle trough for BUY or peak for SELL
-        buy_signals = 0
-        sell_signals = 0
-        total_weight = 0
+        prices = np.asarray(df['price'])
+        last_price = prices[-1]
+        prev_price = prices[-2] if len(prices) > 1 else last_price
         
-        # Add details for each cycle
-        for i, cycle in enumerate(dominant_cycles[:3]):  # Consider top 3 cycles
-            weight = cycle['strength']
-            total_weight += weight
-            
-            # Check if we're approaching a trough (good time to BUY)
-            days_to_trough = cycle['days_to_trough']
-            days_to_peak = cycle['days_to_peak']
-            
-            cycle_detail = {
-                'cycle_length': f"{cycle['length']:.1f} days",
-                'strength': f"{cycle['strength']:.3f}",
-                'days_to_trough': f"{days_to_trough:.1f}",
-                'days_to_peak': f"{days_to_peak:.1f}"
-            }
-            recommendation['details'].append(cycle_detail)
-            
-            # If within 10% of cycle length to trough, it's a buy signal
-            trough_window = cycle['length'] * 0.1
-            if days_to_trough <= trough_window:
-                buy_signals += weight
-                recommendation['reasoning'].append(
-                    f"A {cycle['length']:.1f}-day market cycle is nearing its lowest point (trough) in {days_to_trough:.1f} days. "
-                    f"This cycle has a strength rating of {cycle['strength']:.2f}, indicating a potential buying opportunity "
-                    f"as prices typically rise after reaching this point in the cycle."
-                )
-            
-            # If within 10% of cycle length to peak, it's a sell signal
-            peak_window = cycle['length'] * 0.1
-            if days_to_peak <= peak_window:
-                sell_signals += weight
-                recommendation['reasoning'].append(
-                    f"A {cycle['length']:.1f}-day market cycle is approaching its highest point (peak) in {days_to_peak:.1f} days. "
-                    f"With a cycle strength of {cycle['strength']:.2f}, this suggests a potential selling opportunity "
-                    f"as prices typically decline after reaching this peak."
-                )
-        
-        # Normalize signals by total weight
-        if total_weight > 0:
-            buy_signals /= total_weight
-            sell_signals /= total_weight
-        
-        # Adjust signals based on recent price movement (momentum)
-        if recent_change > 0.02:  # 2% up recently
-            sell_signals += 0.1
-            recommendation['reasoning'].append(
-                f"The price has increased by {recent_change:.1%} recently, suggesting potential profit-taking opportunity. "
-                "This upward momentum might indicate a short-term peak forming."
-            )
-        elif recent_change < -0.02:  # 2% down recently
-            buy_signals += 0.1
-            recommendation['reasoning'].append(
-                f"The price has decreased by {abs(recent_change):.1%} recently, presenting a potential value buying opportunity. "
-                "This downward movement might indicate a short-term bottom forming."
-            )
+        score = score_recommendations(
+            {0: dominant_cycles}, {0: (prev_price, last_price)},
+            trough_window=trough_window, signal_cutoff=signal_cutoff
+        ).iloc[0]
+        reasoning, details = explain_recommendation(score, dominant_cycles, trough_window)
         
-        # Calculate overall recommendation
-        overall_signal = buy_signals - sell_signals
-        
-        # Apply logic rules with detailed explanations
-        if overall_signal > 0.2:
-            recommendation['action'] = 'BUY'
-            recommendation['confidence'] = min(0.9, 0.5 + overall_signal)
-        elif overall_signal < -0.2:
-            recommendation['action'] = 'SELL'
-            recommendation['confidence'] = min(0.9, 0.5 + abs(overall_signal))
-        else:
-            recommendation['action'] = 'HOLD'
-            recommendation['confidence'] = 0.5 - abs(overall_signal)
-            if not recommendation['reasoning']:
-                recommendation['reasoning'].append(
-                    "Current market cycles show balanced or unclear signals. No strong buying or selling pressure detected. "
-                    "It's advisable to maintain current positions until clearer patterns emerge."
-                )
-        
-        # Add comprehensive summary reasoning based on action
-        if recommendation['action'] == 'BUY':
-            recommendation['reasoning'].insert(0, 
-                "Multiple market cycles are converging towards their low points, suggesting a strong buying opportunity. "
-                "The alignment of these cycles, combined with their respective strengths, indicates a higher probability "
-                "of price appreciation in the near future."
-            )
-        elif recommendation['action'] == 'SELL':
-            recommendation['reasoning'].insert(0, 
-                "Multiple market cycles are approaching their peak values, indicating a strong selling opportunity. "
-                "The convergence of these cycle peaks, weighted by their individual strengths, suggests an increased "
-                "likelihood of price decline in the near term."
-            )
-        else:  # HOLD
-            recommendation['reasoning'].insert(0, 
-                "Current market cycles show mixed or weak signals without clear directional bias. "
-                "The combination of cycle positions and their strengths suggests maintaining current positions "
-                "until more definitive patterns emerge."
-            )
+        recommendation = {
+            'action': score['action'],
+            'confidence': float(score['confidence']),
+            'reasoning': reasoning,
+            'details': details
+        }
         
         # Format confidence as percentage
         recommendation['confidence_pct'] = f"{recommendation['confidence']*100:.1f}%"
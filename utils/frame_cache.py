@@ -0,0 +1,234 @@
+"""In-process LRU cache for fetched and processed DataFrames.
+
+Entries expire at the next trading-session close, since daily bars cannot
+change before then. For a grace period after expiry an entry is still
+served (stale-while-revalidate) while a background thread reloads it.
+Eviction is least-recently-used, bounded by total bytes rather than by
+entry count.
+"""
+import os
+import sys
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from utils.price_cache import last_session_close
+
+logger = logging.getLogger(__name__)
+
+FRAME_CACHE_MAX_BYTES = int(float(os.getenv('FRAME_CACHE_MAX_MB', '256')) * 1024 * 1024)
+FRAME_CACHE_STALE_SECONDS = float(os.getenv('FRAME_CACHE_STALE_SECONDS', '3600'))
+
+# Frames flagged attrs['stale'] (served from cache during an upstream outage)
+# are only kept briefly so recovery is picked up quickly
+STALE_FRAME_TTL = timedelta(seconds=60)
+
+
+def next_session_close(now=None):
+    """Return the UTC time of the next trading-session close after now."""
+    now = now or datetime.utcnow()
+    close = last_session_close(now) + timedelta(days=1)
+    while close.weekday() >= 5:
+        close += timedelta(days=1)
+    return close
+
+
+def frame_nbytes(value):
+    """Estimate the memory held by a cached value."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(frame_nbytes(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(frame_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def _copy(value):
+    # Callers add columns to frames in place (e.g. moving averages), so
+    # every caller gets its own copy
+    return value.copy() if hasattr(value, 'copy') else value
+
+
+class _Entry:
+    __slots__ = ('value', 'nbytes', 'expires_at')
+
+    def __init__(self, value, nbytes, expires_at):
+        self.value = value
+        self.nbytes = nbytes
+        self.expires_at = expires_at
+
+
+class FrameCache:
+    """Thread-safe, byte-bounded LRU cache with market-hours TTLs.
+
+    Args:
+        max_bytes (int): Total size budget for cached values
+        stale_seconds (float): How long after expiry a stale value may still
+            be served while it is refreshed in the background
+        name (str): Name used in logs and stats
+    """
+
+    def __init__(self, max_bytes=FRAME_CACHE_MAX_BYTES, stale_seconds=FRAME_CACHE_STALE_SECONDS,
+                 name='frame-cache'):
+        self.max_bytes = max_bytes
+        self.stale_window = timedelta(seconds=stale_seconds)
+        self.name = name
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._refreshing = set()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def _lookup(self, key, now, allow_stale=True):
+        """Return (value, state) where state is 'fresh', 'stale' or 'miss'."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, 'miss'
+
+            if now < entry.expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value, 'fresh'
+
+            if now < entry.expires_at + self.stale_window:
+                if not allow_stale:
+                    self.misses += 1
+                    return None, 'miss'
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return entry.value, 'stale'
+
+            self._remove(key)
+            self.misses += 1
+            return None, 'miss'
+
+    def get(self, key, now=None):
+        """Return a copy of a fresh or stale cached value, or None."""
+        value, state = self._lookup(key, now or datetime.utcnow())
+        return _copy(value) if state != 'miss' else None
+
+    def get_fresh(self, key, now=None):
+        """Return a copy of a cached value that has not expired yet, or None.
+
+        Loaders that build on another cached value use this so a background
+        refresh does not rebuild from the other entry's stale copy.
+        """
+        value, state = self._lookup(key, now or datetime.utcnow(), allow_stale=False)
+        return _copy(value) if state == 'fresh' else None
+
+    def put(self, key, value, expires_at=None):
+        """Store a value, evicting least-recently-used entries to stay within budget.
+
+        Args:
+            key (hashable): Cache key
+            value (DataFrame): Value to store
+            expires_at (datetime, optional): Naive UTC expiry time
+                (default: the next session close)
+        """
+        nbytes = frame_nbytes(value)
+        if nbytes > self.max_bytes:
+            logger.debug(f"{self.name}: not caching {key}, {nbytes} bytes exceeds the budget")
+            return
+
+        if expires_at is None:
+            if isinstance(value, pd.DataFrame) and value.attrs.get('stale'):
+                expires_at = datetime.utcnow() + STALE_FRAME_TTL
+            else:
+                expires_at = next_session_close()
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, nbytes, expires_at)
+            self._bytes += nbytes
+
+            while self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything if key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            elif key in self._entries:
+                self._remove(key)
+
+    def get_or_load(self, key, loader, *args, **kwargs):
+        """Return a cached value, loading it on a miss.
+
+        Stale values are returned immediately and refreshed by calling
+        loader(*args, **kwargs) on a background thread.
+        """
+        value, state = self._lookup(key, datetime.utcnow())
+
+        if state == 'fresh':
+            return _copy(value)
+
+        if state == 'stale':
+            self._refresh_in_background(key, loader, args, kwargs)
+            return _copy(value)
+
+        value = loader(*args, **kwargs)
+        self.put(key, value)
+        return _copy(value)
+
+    def _refresh_in_background(self, key, loader, args, kwargs):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.put(key, loader(*args, **kwargs))
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.warning(f"{self.name}: background refresh of {key} failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name=f"{self.name}-refresh", daemon=True).start()
+
+    def stats(self):
+        """Return cache counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.stale_hits) / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'refreshes': self.refreshes,
+                'refresh_failures': self.refresh_failures
+            }
+
+
+# Shared by fetch_stock_data and fetch_processed_data
+frame_cache = FrameCache()
@@ -0,0 +1,124 @@
+"""Fast Lomb-Scargle periodogram for irregularly sampled series.
+
+Implements the Press & Rybicki (1989) method: the trigonometric sums over
+the irregular sample times are computed by "extirpolating" the samples onto
+a regular grid with Lagrange weights and taking one FFT, which brings the
+cost from O(N * n_frequencies) down to O(N log N).
+
+Besides the power, the least-squares sinusoid fit at every frequency is
+returned (amplitude and phase), so the results can stand in for an FFT
+spectrum in cycle detection.
+"""
+import numpy as np
+
+# Extirpolation grid points per sample. With SUM_OVERSAMPLING = 10, order 6
+# keeps the power within ~1e-5 of a direct least-squares fit up to 0.5
+# cycles per sample; order 4 (and oversampling 5) is off by ~1e-3
+EXTIRPOLATION_ORDER = 6
+
+# Oversampling of the FFT grid used for the trigonometric sums
+SUM_OVERSAMPLING = 10
+
+# Basis-function energy below which a fit coefficient is treated as undefined
+DEGENERATE_TOLERANCE = 1e-8
+
+
+def _next_power_of_two(n):
+    return 1 << int(np.ceil(np.log2(max(n, 1))))
+
+
+def extirpolate(x, y, n, order=EXTIRPOLATION_ORDER):
+    """Spread values y at fractional grid positions x onto an n-point grid.
+
+    The result satisfies sum(y * f(x)) ~= sum(grid * f(arange(n))) for any
+    function f that is well approximated by a polynomial of degree
+    order - 1 around each x.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y)
+    grid = np.zeros(n, dtype=y.dtype)
+
+    # Samples that fall exactly on the grid need no interpolation
+    exact = x % 1 == 0
+    np.add.at(grid, x[exact].astype(int), y[exact])
+    x, y = x[~exact], y[~exact]
+    if len(x) == 0:
+        return grid
+
+    low = np.clip((x - order // 2).astype(int), 0, n - order)
+    numerator = y * np.prod(x - low - np.arange(order)[:, None], axis=0)
+    denominator = float(np.prod(np.arange(1, order)))
+
+    for j in range(order):
+        if j > 0:
+            denominator *= j / (j - order)
+        index = low + (order - 1 - j)
+        np.add.at(grid, index, numerator / (denominator * (x - index)))
+    return grid
+
+
+def trig_sums(t, h, df, n_freq, freq_factor=1):
+    """Return (S, C) with S[k] = sum(h * sin(2 pi f_k t)), C likewise with cos.
+
+    Frequencies are f_k = freq_factor * df * (k + 1) for k in range(n_freq);
+    t must start at 0.
+    """
+    df *= freq_factor
+    n_fft = _next_power_of_two(SUM_OVERSAMPLING * (n_freq + 1))
+
+    # Shift by one frequency step so the first output is f = df, not 0
+    h = h * np.exp(2j * np.pi * df * t)
+    positions = (t * n_fft * df) % n_fft
+    grid = extirpolate(positions, h, n_fft)
+
+    sums = np.fft.ifft(grid)[:n_freq] * n_fft
+    return sums.imag, sums.real
+
+
+def lomb_scargle(t, y, df, n_freq):
+    """Compute the Lomb-Scargle periodogram and sinusoid fits.
+
+    Args:
+        t (ndarray): Sample times, ascending, starting at 0
+        y (ndarray): Sample values
+        df (float): Frequency step; frequencies are df, 2 df, ... n_freq df
+        n_freq (int): Number of frequencies
+
+    Returns:
+        tuple: (frequencies, power, amplitudes, phases) where power is
+            normalized to [0, 1] and the fitted sinusoid at frequency f is
+            amplitude * cos(2 pi f t + phase)
+    """
+    t = np.asarray(t, dtype=float)
+    y = np.asarray(y, dtype=float)
+    weight = np.full(len(t), 1 / len(t))
+
+    y = y - np.dot(weight, y)
+    sin_y, cos_y = trig_sums(t, weight * y, df, n_freq)
+    sin_2, cos_2 = trig_sums(t, weight, df, n_freq, freq_factor=2)
+
+    # The time offset tau that decouples the sine and cosine terms
+    two_omega_tau = np.arctan2(sin_2, cos_2)
+    cos_tau = np.cos(two_omega_tau / 2)
+    sin_tau = np.sin(two_omega_tau / 2)
+    cos_2tau = np.cos(two_omega_tau)
+    sin_2tau = np.sin(two_omega_tau)
+
+    y_cos = cos_y * cos_tau + sin_y * sin_tau
+    y_sin = sin_y * cos_tau - cos_y * sin_tau
+    cos_cos = 0.5 * (1 + cos_2 * cos_2tau + sin_2 * sin_2tau)
+    sin_sin = 0.5 * (1 - cos_2 * cos_2tau - sin_2 * sin_2tau)
+
+    # y ~ a cos(w (t - tau)) + b sin(w (t - tau)) = A cos(w t + phase).
+    # Where a basis function vanishes at every sample (e.g. the sine at 0.5
+    # cycles per day for whole-day samples) its coefficient is undefined
+    # and is taken as 0
+    a = np.divide(y_cos, cos_cos, out=np.zeros_like(y_cos), where=cos_cos > DEGENERATE_TOLERANCE)
+    b = np.divide(y_sin, sin_sin, out=np.zeros_like(y_sin), where=sin_sin > DEGENERATE_TOLERANCE)
+
+    power = (a * y_cos + b * y_sin) / np.dot(weight, y ** 2)
+    frequencies = df * np.arange(1, n_freq + 1)
+    amplitudes = np.hypot(a, b)
+    phases = np.angle(np.exp(-1j * (two_omega_tau / 2 + np.arctan2(b, a))))
+
+    return frequencies, power, amplitudes, phases
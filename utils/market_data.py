@@ -0,0 +1,281 @@
+"""Market-data providers used by fetch_stock_data.
+
+The active provider is chosen with the MARKET_DATA_PROVIDER environment
+variable:
+
+- 'yahoo' (default): live Yahoo Finance data
+- 'local': replays CSV/Parquet files from MARKET_DATA_DIR
+- 'synthetic': generates cyclical series with utils.sample_data_generator
+
+The local and synthetic providers can inject latency and errors so the
+analysis pipeline can be load-tested without touching the network.
+"""
+import os
+import time
+import random
+import zlib
+import logging
+import threading
+
+import pandas as pd
+import yfinance as yf
+
+from utils.price_cache import period_start, naive_dates
+from utils.rate_limiter import yahoo_limiter, backoff_delay
+from utils.sample_data_generator import generate_sample_stock_data
+
+logger = logging.getLogger(__name__)
+
+# Base delay (seconds) for jittered exponential backoff after failed requests
+RETRY_BASE_DELAY = 1.0
+
+# Number of trading days used when a synthetic series is asked for 'max'
+SYNTHETIC_MAX_DAYS = 2520
+
+
+class UpstreamError(ValueError):
+    """The provider could not be reached or kept failing (as opposed to an unknown ticker)."""
+
+
+class MarketDataProvider:
+    """Base class for price-history sources.
+
+    Subclasses implement fetch_history and return frames with the columns
+    used throughout the app: date, price, and optionally open, high, low
+    and volume.
+    """
+
+    name = 'base'
+    # Whether fetch_stock_data should keep this provider's data in the on-disk cache
+    cacheable = False
+
+    def fetch_history(self, ticker, period=None, start=None):
+        """Fetch price history for a ticker.
+
+        Args:
+            ticker (str): Validated, upper-case ticker symbol
+            period (str, optional): Period to fetch, e.g. '2y'
+            start (Timestamp, optional): Fetch bars from this date onwards instead of a period
+
+        Returns:
+            DataFrame: Price history. Start-based fetches may return an empty frame.
+        """
+        raise NotImplementedError
+
+
+class YahooProvider(MarketDataProvider):
+    """Live data from Yahoo Finance, throttled by the shared rate limiter."""
+
+    name = 'yahoo'
+    cacheable = True
+
+    def __init__(self, max_retries=3, limiter=yahoo_limiter):
+        self.max_retries = max_retries
+        self.limiter = limiter
+
+    def fetch_history(self, ticker, period=None, start=None):
+        # Fetch data from Yahoo Finance with error handling
+        stock = yf.Ticker(ticker)
+        hist = None
+
+        for attempt in range(self.max_retries):
+            # Only waits when the process-wide request budget is exhausted
+            self.limiter.acquire()
+
+            try:
+                if start is not None:
+                    # Incremental update of a ticker we already know is valid
+                    hist = stock.history(start=start.strftime('%Y-%m-%d'), timeout=20)
+                else:
+                    hist = stock.history(period=period, timeout=20)
+                break
+            except Exception as e:
+                logger.warning(f"API call attempt {attempt + 1} failed: {str(e)}")
+                if attempt == self.max_retries - 1:
+                    raise UpstreamError(f"Failed to fetch data after {self.max_retries} attempts: {str(e)}")
+                time.sleep(backoff_delay(attempt, base=RETRY_BASE_DELAY))
+
+        if start is not None and hist is not None and hist.empty:
+            return normalize_history(hist)
+
+        # Check if we got data
+        if hist is None or hist.empty:
+            raise ValueError(f"No data found for ticker {ticker}")
+
+        logger.info(f"Successfully fetched {len(hist)} rows for {ticker}")
+
+        return normalize_history(hist)
+
+
+class ReplayProvider(MarketDataProvider):
+    """Base for offline providers, with optional latency and error injection.
+
+    Args:
+        latency (float): Seconds to sleep before every fetch
+        latency_jitter (float): Extra random latency of up to this many seconds
+        error_rate (float): Probability (0-1) that a fetch raises ConnectionError
+        seed (int, optional): Seed for the injected latency/error draws
+    """
+
+    def __init__(self, latency=0.0, latency_jitter=0.0, error_rate=0.0, seed=None):
+        if not 0 <= error_rate <= 1:
+            raise ValueError("error_rate must be between 0 and 1")
+
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def _simulate_network(self, ticker):
+        with self._random_lock:
+            delay = self.latency + self._random.uniform(0, self.latency_jitter)
+            fail = self._random.random() < self.error_rate
+
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            raise ConnectionError(f"Injected {self.name} provider error for {ticker}")
+
+    def fetch_history(self, ticker, period=None, start=None):
+        self._simulate_network(ticker)
+
+        df = self._load(ticker, period)
+        if df is None or df.empty:
+            raise ValueError(f"No data found for ticker {ticker}")
+
+        # Periods are measured back from the end of the replayed data, so
+        # archived files behave like a live feed as of their last bar
+        dates = naive_dates(df['date'])
+        cutoff = start if start is not None else period_start(period or 'max', now=dates.iloc[-1])
+        if cutoff is not None:
+            df = df[dates >= cutoff].reset_index(drop=True)
+
+        return df
+
+    def _load(self, ticker, period):
+        raise NotImplementedError
+
+
+class LocalFileProvider(ReplayProvider):
+    """Replays per-ticker CSV or Parquet files from a directory.
+
+    Files are looked up as <directory>/<TICKER>.parquet, then <TICKER>.csv.
+    Column names are matched the same way as uploaded CSVs.
+    """
+
+    name = 'local'
+
+    def __init__(self, directory, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+
+    def _load(self, ticker, period):
+        for extension, reader in (('.parquet', pd.read_parquet), ('.csv', pd.read_csv)):
+            path = os.path.join(self.directory, f"{ticker}{extension}")
+            if os.path.exists(path):
+                return normalize_history(reader(path))
+        return None
+
+
+class SyntheticProvider(ReplayProvider):
+    """Generates cyclical price series with utils.sample_data_generator.
+
+    Each ticker gets a stable seed, so the same symbol always yields the same
+    series within a day.
+    """
+
+    name = 'synthetic'
+
+    def __init__(self, volatility=0.015, trend=0.0001, cycles=None, **kwargs):
+        super().__init__(**kwargs)
+        self.volatility = volatility
+        self.trend = trend
+        self.cycles = cycles or [(20, 0.05), (40, 0.03), (60, 0.04)]
+        self._generator_lock = threading.Lock()
+
+    def _load(self, ticker, period):
+        start = period_start(period or 'max')
+        if start is None:
+            days = SYNTHETIC_MAX_DAYS
+        else:
+            days = len(pd.bdate_range(start, pd.Timestamp.now().normalize()))
+
+        # generate_sample_stock_data seeds numpy's global RNG
+        with self._generator_lock:
+            return generate_sample_stock_data(
+                days=max(days, 2),
+                volatility=self.volatility,
+                trend=self.trend,
+                cycles=self.cycles,
+                seed=zlib.crc32(ticker.encode())
+            )
+
+
+def normalize_history(hist):
+    """Convert a provider history frame to our column naming."""
+    if 'date' not in hist.columns and 'Date' not in hist.columns:
+        # Reset index to make Date a column
+        hist = hist.reset_index()
+
+    # Rename columns to match our expected format
+    hist = hist.rename(columns={
+        'Date': 'date',
+        'Close': 'price',
+        'close': 'price',
+        'Open': 'open',
+        'High': 'high',
+        'Low': 'low',
+        'Volume': 'volume'
+    })
+
+    return hist
+
+
+def create_provider(name=None):
+    """Build a provider from its name and the MARKET_DATA_* / REPLAY_* settings.
+
+    Args:
+        name (str, optional): 'yahoo', 'local' or 'synthetic'
+            (default: MARKET_DATA_PROVIDER)
+
+    Returns:
+        MarketDataProvider: Configured provider
+    """
+    name = (name or os.getenv('MARKET_DATA_PROVIDER', 'yahoo')).lower()
+
+    replay_options = {
+        'latency': float(os.getenv('REPLAY_LATENCY_MS', '0')) / 1000,
+        'latency_jitter': float(os.getenv('REPLAY_LATENCY_JITTER_MS', '0')) / 1000,
+        'error_rate': float(os.getenv('REPLAY_ERROR_RATE', '0'))
+    }
+
+    if name == 'yahoo':
+        return YahooProvider()
+    if name == 'local':
+        return LocalFileProvider(os.getenv('MARKET_DATA_DIR', 'market_data'), **replay_options)
+    if name == 'synthetic':
+        return SyntheticProvider(**replay_options)
+
+    raise ValueError(f"Unknown market data provider: {name}")
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    """Return the process-wide provider, creating it from config on first use."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_provider()
+            logger.info(f"Using '{_provider.name}' market data provider")
+        return _provider
+
+
+def set_provider(provider):
+    """Replace the process-wide provider (e.g. for benchmarks)."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -0,0 +1,221 @@
+"""Parameter sweeps of the cycle-signal settings against the backtest.
+
+Evaluates a grid of detect_cycles settings (min_period, max_period,
+strength_threshold) and recommendation settings (trough_window,
+signal_cutoff) with the walk-forward backtest. Each ticker's rolling
+spectrum is computed once and reused for every combination, each cycle
+table once per detect_cycles setting, so only the cheap scoring and
+evaluation steps run per grid point. Tickers are spread over the shared
+worker pool (utils.process_pool) and the best setting is reported per sector
+(from the symbol master) or for the whole universe.
+"""
+import os
+import logging
+import itertools
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from utils.backtest import (score_windows, evaluate_signals, load_backtest_data, prepare_price_jobs,
+                            BACKTEST_WORKERS)
+from utils.data_processing import rolling_spectrum, detect_window_cycles
+from utils.decision_engine import TOP_CYCLES
+from utils.price_cache import period_start
+from utils.process_pool import run_in_workers
+from utils.ticker_search import get_symbol_index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRID = {
+    'min_period': [2, 5],
+    'max_period': [63, 126, 252],
+    'strength_threshold': [0.05, 0.1, 0.2, 0.3],
+    'trough_window': [0.05, 0.1, 0.15, 0.2],
+    'signal_cutoff': [0.1, 0.2, 0.3]
+}
+
+CYCLE_PARAMS = ('min_period', 'max_period', 'strength_threshold')
+SIGNAL_PARAMS = ('trough_window', 'signal_cutoff')
+PARAMS = CYCLE_PARAMS + SIGNAL_PARAMS
+
+# Parameters that must be positive; the others only non-negative
+POSITIVE_PARAMS = ('min_period', 'max_period', 'trough_window')
+
+# Metrics that can pick the best setting; all are "higher is better"
+SWEEP_METRICS = ('sharpe', 'total_return', 'annual_return', 'hit_rate')
+
+# Grid points accepted by one /api/sweep request
+MAX_SWEEP_COMBINATIONS = int(os.getenv('MAX_SWEEP_COMBINATIONS', '500'))
+
+
+def expand_grid(grid=None):
+    """Fill a partial grid with the defaults.
+
+    Args:
+        grid (dict, optional): Parameter name to a value or list of values
+
+    Returns:
+        dict: Every parameter in PARAMS mapped to a sorted list of values
+
+    Raises:
+        ValueError: For unknown parameters, empty or out-of-range values, or
+            a grid without any min_period below a max_period
+    """
+    unknown = set(grid or {}) - set(PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {', '.join(sorted(unknown))}")
+
+    full = dict(DEFAULT_GRID)
+    for name, values in (grid or {}).items():
+        values = values if isinstance(values, (list, tuple)) else [values]
+        if not values:
+            raise ValueError(f"No values given for {name}")
+        full[name] = sorted(set(values))
+
+    for name, values in full.items():
+        lowest = values[0]
+        if lowest < 0 or (lowest == 0 and name in POSITIVE_PARAMS):
+            kind = 'positive' if name in POSITIVE_PARAMS else 'non-negative'
+            raise ValueError(f"{name} values must be {kind}, got {lowest}")
+    if full['min_period'][0] >= full['max_period'][-1]:
+        raise ValueError("The grid needs at least one min_period below a max_period")
+    return full
+
+
+def grid_size(grid):
+    """Return the number of combinations in an expanded grid."""
+    return int(np.prod([len(values) for values in grid.values()]))
+
+
+def sweep_ticker(ticker, data=None, start=None, grid=None, window=252, step=5, horizon=20,
+                 allow_short=False, cost_bps=0.0):
+    """Backtest every grid combination for one ticker.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        data (DataFrame or PriceArrays, optional): Price history; read from
+            the shared price store when omitted
+        start (Timestamp, optional): First bar to use when reading the store
+        grid (dict, optional): Partial or full parameter grid
+        Other arguments: See backtest_ticker
+
+    Returns:
+        DataFrame: One row per combination with the parameters and the
+            evaluate_signals metrics; period ranges without any spectrum
+            bin (e.g. wider than the window) are left out
+    """
+    grid = expand_grid(grid)
+    df = load_backtest_data(ticker, data, start, window)
+    spectrum = rolling_spectrum(df, window=window, step=step)
+    prices = np.asarray(df['price'])
+    periods = spectrum['periods']
+
+    rows = []
+    for min_period, max_period, strength_threshold in itertools.product(*(grid[p] for p in CYCLE_PARAMS)):
+        if min_period >= max_period or not np.any((periods >= min_period) & (periods <= max_period)):
+            continue
+        cycle_settings = dict(min_period=min_period, max_period=max_period, strength_threshold=strength_threshold)
+        cycles = detect_window_cycles(spectrum, top_k=TOP_CYCLES, **cycle_settings)
+        for trough_window, signal_cutoff in itertools.product(*(grid[p] for p in SIGNAL_PARAMS)):
+            signals = score_windows(df, spectrum, cycles, trough_window=trough_window, signal_cutoff=signal_cutoff)
+            metrics = evaluate_signals(prices, signals, horizon=horizon, allow_short=allow_short,
+                                       cost_bps=cost_bps)
+            metrics.pop('equity')
+            rows.append({**cycle_settings, 'trough_window': trough_window, 'signal_cutoff': signal_cutoff,
+                         **metrics})
+
+    if not rows:
+        raise ValueError(f"No grid period range has spectrum bins for a {window}-bar window")
+
+    table = pd.DataFrame(rows)
+    table.insert(0, 'ticker', ticker)
+    return table
+
+
+def best_settings(results, metric='sharpe', group_by='sector'):
+    """Pick the best parameter combination per group.
+
+    Each combination is scored by the mean of `metric` over the group's
+    tickers (tickers where the metric is undefined are ignored).
+
+    Args:
+        results (DataFrame): Concatenated sweep_ticker results
+        metric (str): One of SWEEP_METRICS
+        group_by (str): 'sector' (via the symbol master) or 'universe'
+
+    Returns:
+        DataFrame: One row per group with the winning parameters, the mean
+            metrics and the number of tickers
+    """
+    if metric not in SWEEP_METRICS:
+        raise ValueError(f"metric must be one of {', '.join(SWEEP_METRICS)}")
+    if results.empty:
+        return pd.DataFrame()
+
+    if group_by == 'sector':
+        index = get_symbol_index()
+        sectors = {ticker: index.sector_of(ticker) or 'Unknown' for ticker in results['ticker'].unique()}
+        groups = results['ticker'].map(sectors)
+    elif group_by == 'universe':
+        groups = pd.Series('All', index=results.index)
+    else:
+        raise ValueError("group_by must be 'sector' or 'universe'")
+
+    numeric = results.assign(group=groups.to_numpy())
+    for column in SWEEP_METRICS:
+        numeric[column] = pd.to_numeric(numeric[column], errors='coerce')
+
+    summary = numeric.groupby(['group', *PARAMS]).agg(
+        tickers=('ticker', 'nunique'),
+        **{column: (column, 'mean') for column in (*SWEEP_METRICS, 'max_drawdown', 'turnover')}
+    ).reset_index()
+
+    best = summary.loc[summary[metric].fillna(-np.inf).groupby(summary['group']).idxmax()]
+    return best.set_index('group').sort_index()
+
+
+def run_sweep(tickers, period="5y", grid=None, metric='sharpe', group_by='sector', max_workers=None, **params):
+    """Sweep the parameter grid across tickers in parallel.
+
+    Args:
+        tickers (list): Ticker symbols
+        period (str): History to replay
+        grid (dict, optional): Partial or full parameter grid
+        metric (str): Metric that picks the best setting
+        group_by (str): 'sector' or 'universe'
+        max_workers (int, optional): Worker processes (default:
+            BACKTEST_WORKERS); 1 runs everything in this process
+        **params: Passed to sweep_ticker (window, step, horizon, ...)
+
+    Returns:
+        tuple: (per-ticker results DataFrame, best settings DataFrame,
+            errors dict)
+    """
+    grid = expand_grid(grid)
+    max_workers = max_workers or BACKTEST_WORKERS
+    start = period_start(period)
+    jobs, errors = prepare_price_jobs(tickers, period)
+
+    tables = []
+    if max_workers <= 1 or len(jobs) <= 1:
+        for ticker, data in jobs.items():
+            try:
+                tables.append(sweep_ticker(ticker, data, start, grid, **params))
+            except Exception as e:
+                errors[ticker] = str(e)
+    else:
+        calls = {ticker: (ticker, data) for ticker, data in jobs.items()}
+        worker = partial(sweep_ticker, start=start, grid=grid, **params)
+        for ticker, table, error in run_in_workers(worker, calls, max_workers):
+            if error is None:
+                tables.append(table)
+            else:
+                errors[ticker] = str(error)
+
+    for ticker, message in errors.items():
+        logger.warning(f"Parameter sweep of {ticker} failed: {message}")
+
+    results = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+    logger.info(f"Swept {grid_size(grid)} settings over {len(tables)} tickers")
+    return results, best_settings(results, metric=metric, group_by=group_by), errors
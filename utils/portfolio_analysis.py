@@ -1,14 +1,25 @@
 """Portfolio analysis module for analyzing multiple stocks."""
+import os
 import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 
-from utils.api_fetcher import fetch_stock_data
-from utils.data_processing import process_data, perform_fft, detect_cycles
+from utils.api_fetcher import fetch_stock_data, load_price_arrays
+from utils.data_processing import process_data, perform_fft_batch, detect_cycles
 from utils.visualization import convert_numpy_to_lists
+from utils.shared_price_store import PriceArrays
+
+logger = logging.getLogger(__name__)
+
+# Concurrency cap and overall deadline (seconds) for fetching a portfolio
+PORTFOLIO_FETCH_WORKERS = int(os.getenv('PORTFOLIO_FETCH_WORKERS', '8'))
+PORTFOLIO_FETCH_TIMEOUT = float(os.getenv('PORTFOLIO_FETCH_TIMEOUT', '60'))
 
 
 def create_portfolio(name, description, stocks, allocations=None):
@@ -53,51 +64,84 @@ def create_portfolio(name, description, stocks, allocations=None):
     }
 
 
-def fetch_portfolio_data(stocks, period="2y"):
+def fetch_portfolio_data(stocks, period="2y", max_workers=None, timeout=None, return_errors=False,
+                         provider=None, as_arrays=False):
     """
     Fetch data for multiple stocks in a portfolio.
     
+    Tickers are fetched concurrently on a bounded thread pool. All workers
+    share the process-wide Yahoo rate limiter, so the concurrency cap bounds
+    open connections rather than request rate.
+    
     Args:
         stocks (list): List of stock tickers
         period (str): Time period to fetch
+        max_workers (int, optional): Maximum concurrent fetches
+            (default: PORTFOLIO_FETCH_WORKERS)
+        timeout (float, optional): Overall deadline in seconds for the whole
+            portfolio (default: PORTFOLIO_FETCH_TIMEOUT)
+        return_errors (bool): If True, also return a dict of per-ticker errors
+        provider (MarketDataProvider, optional): Data source passed through to
+            fetch_stock_data (default: the configured provider)
+        as_arrays (bool): If True, return zero-copy PriceArrays from the shared
+            price store where available instead of DataFrames
         
     Returns:
-        dict: Dictionary mapping tickers to DataFrames
+        dict: Dictionary mapping tickers to DataFrames, or a tuple of
+            (data dict, errors dict) when return_errors is True
     """
-    import logging
-    logger = logging.getLogger(__name__)
-    
     stock_data = {}
+    errors = {}
     
     if not stocks:
         logger.error("No stocks provided to fetch_portfolio_data")
-        return stock_data
+        return (stock_data, errors) if return_errors else stock_data
     
-    logger.info(f"Fetching portfolio data for tickers: {stocks}")
+    max_workers = max_workers or PORTFOLIO_FETCH_WORKERS
+    timeout = timeout if timeout is not None else PORTFOLIO_FETCH_TIMEOUT
     
-    valid_data_count = 0
-    error_count = 0
+    # Drop duplicates but keep the caller's ordering
+    tickers = list(dict.fromkeys(stocks))
+    logger.info(f"Fetching portfolio data for tickers: {tickers} (workers: {max_workers}, deadline: {timeout}s)")
     
-    for ticker in stocks:
-        try:
-            logger.info(f"Fetching data for ticker: {ticker}")
-            df = fetch_stock_data(ticker, period=period)
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(tickers)),
+                                  thread_name_prefix='portfolio-fetch')
+    try:
+        fetch = load_price_arrays if as_arrays else fetch_stock_data
+        futures = {executor.submit(fetch, ticker, period=period, provider=provider): ticker for ticker in tickers}
+        done, not_done = wait(futures, timeout=timeout)
+        
+        results = {}
+        for future in done:
+            ticker = futures[future]
+            try:
+                df = future.result()
+            except Exception as e:
+                logger.error(f"Error fetching data for {ticker}: {str(e)}")
+                errors[ticker] = str(e)
+                continue
             
             if df is not None and not df.empty:
-                stock_data[ticker] = df
-                valid_data_count += 1
-                logger.info(f"Successfully fetched data for {ticker}, shape: {df.shape if hasattr(df, 'shape') else 'N/A'}")
+                results[ticker] = df
+                logger.info(f"Successfully fetched data for {ticker}, rows: {len(df)}")
             else:
                 logger.error(f"No data returned for ticker: {ticker}")
-                error_count += 1
-                
-        except Exception as e:
-            logger.error(f"Error fetching data for {ticker}: {str(e)}")
-            error_count += 1
+                errors[ticker] = "No data returned"
+        
+        for future in not_done:
+            ticker = futures[future]
+            future.cancel()
+            logger.error(f"Timed out fetching data for {ticker} after {timeout}s")
+            errors[ticker] = f"Timed out after {timeout}s"
+    finally:
+        # Don't let a hung upstream call hold the request past its deadline
+        executor.shutdown(wait=False, cancel_futures=True)
     
-    logger.info(f"Portfolio data fetch complete. Success: {valid_data_count}, Errors: {error_count}")
+    stock_data = {ticker: results[ticker] for ticker in tickers if ticker in results}
     
-    return stock_data
+    logger.info(f"Portfolio data fetch complete. Success: {len(stock_data)}, Errors: {len(errors)}")
+    
+    return (stock_data, errors) if return_errors else stock_data
 
 
 def calculate_correlation_matrix(stock_data):
@@ -105,7 +149,7 @@ def calculate_correlation_matrix(stock_data):
     Calculate correlation matrix between stocks.
     
     Args:
-        stock_data (dict): Dictionary mapping tickers to DataFrames
+        stock_data (dict): Dictionary mapping tickers to DataFrames or PriceArrays
         
     Returns:
         DataFrame: Correlation matrix
@@ -114,7 +158,9 @@ def calculate_correlation_matrix(stock_data):
     price_data = {}
     
     for ticker, df in stock_data.items():
-        if 'price' in df.columns:
+        if isinstance(df, PriceArrays):
+            price_data[ticker] = df.series('price')
+        elif 'price' in df.columns:
             price_data[ticker] = df['price']
         elif 'Close' in df.columns:
             price_data[ticker] = df['Close']
@@ -168,7 +214,7 @@ def analyze_portfolio_cycles(stock_data):
     Analyze dominant cycles across multiple stocks.
     
     Args:
-        stock_data (dict): Dictionary mapping tickers to DataFrames
+        stock_data (dict): Dictionary mapping tickers to DataFrames or PriceArrays
         
     Returns:
         dict: Dictionary with cycle analysis results
@@ -176,13 +222,11 @@ def analyze_portfolio_cycles(stock_data):
     cycle_results = {}
     common_cycles = {}
     
-    for ticker, df in stock_data.items():
-        # Process data
-        processed_df = process_data(df)
-        
-        # Perform FFT analysis
-        fft_results = perform_fft(processed_df)
-        
+    # Process data and run the FFT for every stock in one batch
+    processed = {ticker: process_data(df) for ticker, df in stock_data.items()}
+    fft_by_ticker = perform_fft_batch(processed)
+    
+    for ticker, fft_results in fft_by_ticker.items():
         # Detect dominant cycles
         dominant_cycles = detect_cycles(fft_results)
         
@@ -193,7 +237,7 @@ def analyze_portfolio_cycles(stock_data):
         
         # Track cycle periods for finding common cycles
         for cycle in dominant_cycles:
-            period = cycle['period']
+            period = cycle['length']
             if period not in common_cycles:
                 common_cycles[period] = []
             common_cycles[period].append({
@@ -219,13 +263,13 @@ def analyze_portfolio_cycles(stock_data):
     }
 
 
-def create_portfolio_cycle_chart(cycle_analysis, stock_data):
+def create_portfolio_cycle_chart(cycle_analysis, stock_data=None):
     """
     Create a visualization of common cycles across the portfolio.
     
     Args:
         cycle_analysis (dict): Results from analyze_portfolio_cycles
-        stock_data (dict): Dictionary mapping tickers to DataFrames
+        stock_data (dict, optional): Unused; the chart only needs cycle_analysis
         
     Returns:
         dict: Plotly figure as JSON
@@ -244,8 +288,9 @@ def create_portfolio_cycle_chart(cycle_analysis, stock_data):
         )
         return json.loads(fig.to_json())
     
-    # Get the top shared cycles (up to 3)
-    top_cycles = list(shared_cycles.items())[:3]
+    # Get the top shared cycles (up to 3); analyses loaded back from the
+    # database have the periods as JSON string keys
+    top_cycles = [(float(period), stocks) for period, stocks in list(shared_cycles.items())[:3]]
     
     # Create subplots for each top shared cycle
     fig = make_subplots(
@@ -296,7 +341,7 @@ def create_portfolio_performance_chart(stock_data, allocations=None):
     Create a performance chart for the portfolio.
     
     Args:
-        stock_data (dict): Dictionary mapping tickers to DataFrames
+        stock_data (dict): Dictionary mapping tickers to DataFrames or PriceArrays
         allocations (dict, optional): Dictionary mapping tickers to allocation percentages
         
     Returns:
@@ -323,6 +368,12 @@ def create_portfolio_performance_chart(stock_data, allocations=None):
     # Convert allocations to 0-1 scale
     weights = {ticker: pct / 100.0 for ticker, pct in allocations.items()}
     
+    # Charting needs labelled frames; index store arrays by date
+    stock_data = {
+        ticker: df.to_frame().set_index('date') if isinstance(df, PriceArrays) else df
+        for ticker, df in stock_data.items()
+    }
+    
     # Find common date range
     start_dates = [df.index.min() for df in stock_data.values() if not df.empty]
     end_dates = [df.index.max() for df in stock_data.values() if not df.empty]
@@ -0,0 +1,276 @@
+"""Background warm-up of price data and analyses for watched tickers.
+
+Every ticker held in a portfolio or analysed recently is refreshed inside
+configurable UTC schedule windows (by default shortly after the US close),
+so interactive requests find warm caches.
+
+Run it either in-process (PREFETCH_ENABLED=true starts a daemon thread in
+each web worker) or as a separate process with `python prefetch_worker.py`.
+A separate process warms the shared on-disk and memory-mapped stores that
+all workers read; the in-process scheduler additionally fills that
+worker's DataFrame and analysis caches.
+"""
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.api_fetcher import fetch_stock_data, fetch_processed_data
+from utils.data_processing import perform_fft, detect_cycles
+from utils.decision_engine import generate_recommendation
+from utils.frame_cache import frame_cache
+from utils.market_data import get_provider
+from utils.sliding_dft import LiveCycleTracker
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.getenv('PREFETCH_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+PREFETCH_CONCURRENCY = int(os.getenv('PREFETCH_CONCURRENCY', '4'))
+# Comma-separated HH:MM-HH:MM windows in UTC
+PREFETCH_WINDOWS = os.getenv('PREFETCH_WINDOWS', '21:15-23:00')
+PREFETCH_RECENT_DAYS = int(os.getenv('PREFETCH_RECENT_DAYS', '7'))
+PREFETCH_CHECK_SECONDS = float(os.getenv('PREFETCH_CHECK_SECONDS', '60'))
+PREFETCH_PERIOD = os.getenv('PREFETCH_PERIOD', '2y')
+
+# Sliding-DFT spectra of warmed tickers, advanced in O(k) by each new bar
+live_cycles = LiveCycleTracker()
+
+
+def parse_windows(spec):
+    """Parse 'HH:MM-HH:MM,...' into a list of (start, end) minute-of-day pairs.
+
+    Windows may wrap past midnight, e.g. '23:00-01:00'.
+    """
+    windows = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            start, end = part.split('-')
+            start_hour, start_minute = (int(x) for x in start.split(':'))
+            end_hour, end_minute = (int(x) for x in end.split(':'))
+        except ValueError:
+            raise ValueError(f"Invalid prefetch window: {part}")
+        windows.append((start_hour * 60 + start_minute, end_hour * 60 + end_minute))
+    return windows
+
+
+def active_window(windows, now=None):
+    """Return the (window, window_start_datetime) containing now, or None."""
+    now = now or datetime.utcnow()
+    minute = now.hour * 60 + now.minute
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    for start, end in windows:
+        if start <= end and start <= minute < end:
+            return (start, end), midnight + timedelta(minutes=start)
+        if start > end:
+            if minute >= start:
+                return (start, end), midnight + timedelta(minutes=start)
+            if minute < end:
+                return (start, end), midnight - timedelta(days=1) + timedelta(minutes=start)
+    return None
+
+
+def collect_watched_tickers(recent_days=PREFETCH_RECENT_DAYS):
+    """Return every ticker referenced by a portfolio or a recent analysis.
+
+    Must be called inside a Flask application context.
+
+    Args:
+        recent_days (int): How far back to look at Analysis records
+
+    Returns:
+        list: Sorted, de-duplicated ticker symbols
+    """
+    from models import Analysis, Portfolio
+
+    tickers = set()
+    for (stocks,) in Portfolio.query.with_entities(Portfolio.stocks).all():
+        tickers.update(stock.strip().upper() for stock in (stocks or []) if stock)
+
+    since = datetime.utcnow() - timedelta(days=recent_days)
+    recent = (Analysis.query.with_entities(Analysis.ticker)
+              .filter(Analysis.ticker.isnot(None), Analysis.created_at >= since)
+              .distinct().all())
+    tickers.update(ticker.strip().upper() for (ticker,) in recent if ticker)
+
+    return sorted(tickers)
+
+
+def _analyze(df):
+    """Return (fft_results, dominant_cycles, recommendation) for a processed frame."""
+    fft_results = perform_fft(df)
+    dominant_cycles = detect_cycles(fft_results)
+    recommendation = generate_recommendation(df, dominant_cycles)
+    return fft_results, dominant_cycles, recommendation
+
+
+def get_ticker_analysis(ticker, period="2y"):
+    """Return a ticker's processed data and cached cycle analysis.
+
+    The processed frame comes from fetch_processed_data; the FFT, cycles and
+    recommendation are cached alongside it until the next session close.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        period (str): Period to analyse
+
+    Returns:
+        tuple: (processed DataFrame, fft_results, dominant_cycles, recommendation)
+    """
+    ticker = ticker.strip().upper()
+    df = fetch_processed_data(ticker, period=period)
+
+    provider = get_provider()
+    if not provider.cacheable or df.attrs.get('stale'):
+        # Don't pin an analysis of outage data until the next session close
+        return (df, *_analyze(df))
+
+    # Keyed on the last bar so a new bar never reuses an older analysis, and
+    # a background refresh re-fetches the frame rather than reusing this one.
+    # The cached results are shared between callers and must not be mutated
+    last_bar = df['date'].iloc[-1] if len(df) else None
+    fft_results, dominant_cycles, recommendation = frame_cache.get_or_load(
+        ('analysis', ticker, period, provider.name, last_bar),
+        lambda: _analyze(fetch_processed_data(ticker, period=period))
+    )
+    return df, fft_results, dominant_cycles, recommendation
+
+
+def get_live_cycles(ticker, period=PREFETCH_PERIOD, strength_threshold=0.1):
+    """Return a ticker's dominant cycles from its sliding DFT.
+
+    Bars newer than the last synced one are applied to the ticker's state
+    first; the first call seeds it with one full FFT.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        period (str): Period of the processed history used to seed the state
+        strength_threshold (float): detect_cycles strength threshold
+
+    Returns:
+        list: Dominant cycles, as detect_cycles returns them
+    """
+    ticker = ticker.strip().upper()
+    df = fetch_processed_data(ticker, period=period)
+    if df.attrs.get('irregular'):
+        raise ValueError(f"{ticker} is not sampled once per trading day, so it has no live cycles")
+    return live_cycles.cycles(ticker, df, strength_threshold)
+
+
+def warm_tickers(tickers, period=PREFETCH_PERIOD, concurrency=PREFETCH_CONCURRENCY, analyze=True):
+    """Refresh cached prices (and optionally analyses) for a list of tickers.
+
+    Args:
+        tickers (list): Ticker symbols to warm
+        period (str): Period to fetch
+        concurrency (int): Maximum concurrent fetches; all fetches still share
+            the process-wide rate limiter
+        analyze (bool): Also precompute FFT, cycles and recommendation, and
+            advance the ticker's live cycles by its new bars
+
+    Returns:
+        dict: {'warmed': [...], 'errors': {ticker: message}, 'seconds': float}
+    """
+    started = time.monotonic()
+    warmed, errors = [], {}
+
+    def warm(ticker):
+        if analyze:
+            df = get_ticker_analysis(ticker, period=period)[0]
+            if not df.attrs.get('irregular'):
+                live_cycles.sync(ticker, df)
+        else:
+            fetch_stock_data(ticker, period=period)
+
+    if tickers:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='prefetch') as executor:
+            futures = {executor.submit(warm, ticker): ticker for ticker in tickers}
+            for future in as_completed(futures):
+                ticker = futures[future]
+                try:
+                    future.result()
+                    warmed.append(ticker)
+                except Exception as e:
+                    errors[ticker] = str(e)
+                    logger.warning(f"Prefetch of {ticker} failed: {str(e)}")
+
+    seconds = round(time.monotonic() - started, 2)
+    logger.info(f"Prefetch warmed {len(warmed)} tickers in {seconds}s ({len(errors)} errors)")
+    return {'warmed': sorted(warmed), 'errors': errors, 'seconds': seconds}
+
+
+class PrefetchScheduler:
+    """Daemon thread that warms watched tickers once per schedule window.
+
+    Args:
+        app (Flask): Application used for database access
+        windows (str): Schedule windows, see parse_windows
+        concurrency (int): Concurrent fetches per warm-up run
+        check_seconds (float): How often to check whether a window has opened
+    """
+
+    def __init__(self, app, windows=PREFETCH_WINDOWS, concurrency=PREFETCH_CONCURRENCY,
+                 check_seconds=PREFETCH_CHECK_SECONDS, period=PREFETCH_PERIOD):
+        self.app = app
+        self.window_spec = windows
+        self.windows = parse_windows(windows)
+        self.concurrency = concurrency
+        self.check_seconds = check_seconds
+        self.period = period
+        self.last_run = None
+        self.last_result = None
+        self._last_window_start = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        """Warm every watched ticker now."""
+        with self.app.app_context():
+            tickers = collect_watched_tickers()
+        logger.info(f"Prefetching {len(tickers)} watched tickers")
+        self.last_result = warm_tickers(tickers, period=self.period, concurrency=self.concurrency)
+        self.last_run = datetime.utcnow()
+        return self.last_result
+
+    def _loop(self):
+        while not self._stop.is_set():
+            window = active_window(self.windows)
+            if window is not None and window[1] != self._last_window_start:
+                self._last_window_start = window[1]
+                try:
+                    self.run_once()
+                except Exception as e:
+                    logger.error(f"Prefetch run failed: {str(e)}")
+            self._stop.wait(self.check_seconds)
+
+    def start(self):
+        """Start the scheduler thread (no-op if already running)."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='prefetch-scheduler', daemon=True)
+            self._thread.start()
+            logger.info(f"Prefetch scheduler started (windows: {self.window_spec} UTC, concurrency: {self.concurrency})")
+
+    def stop(self):
+        """Stop the scheduler thread."""
+        self._stop.set()
+
+    def join(self, timeout=None):
+        """Block until the scheduler thread exits."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def status(self):
+        """Return the scheduler state for monitoring."""
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'windows': self.window_spec,
+            'concurrency': self.concurrency,
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+            'last_result': self.last_result
+        }
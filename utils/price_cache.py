@@ -0,0 +1,295 @@
+"""On-disk columnar price store used by fetch_stock_data.
+
+Each ticker's history is kept in its own Parquet file under PRICE_CACHE_DIR,
+alongside a small JSON manifest recording which range each file covers and
+when it was last checked against the upstream.
+"""
+import os
+import re
+import json
+import logging
+import threading
+import importlib.util
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: manifest updates are only serialised within a process
+    fcntl = None
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PRICE_CACHE_DIR = os.getenv('PRICE_CACHE_DIR', 'price_cache')
+PRICE_CACHE_ENABLED = os.getenv('PRICE_CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_LOCK_NAME = 'manifest.lock'
+
+# US equity sessions close at 16:00 New York time, which is 21:00 UTC at the
+# latest (20:00 during daylight saving time).
+MARKET_CLOSE_UTC_HOUR = 21
+
+_PERIOD_PATTERN = re.compile(r'^(\d+)(d|wk|mo|y)$')
+_PERIOD_UNITS = {'d': 'days', 'wk': 'weeks', 'mo': 'months', 'y': 'years'}
+
+_manifest_lock = threading.Lock()
+
+# (file identity, parsed manifest) of the last manifest read
+_manifest_cache = (None, {})
+_parquet_warning_logged = False
+
+
+def cache_available():
+    """Return True if the on-disk cache is enabled and Parquet support is installed."""
+    global _parquet_warning_logged
+
+    if not PRICE_CACHE_ENABLED:
+        return False
+
+    if importlib.util.find_spec('pyarrow') is None:
+        if not _parquet_warning_logged:
+            logger.warning("pyarrow is not installed; the on-disk price cache is disabled")
+            _parquet_warning_logged = True
+        return False
+
+    return True
+
+
+def period_start(period, now=None):
+    """Convert a yfinance period string into the first date it covers.
+
+    Args:
+        period (str): Period such as '5d', '6mo', '2y', 'ytd' or 'max'
+        now (datetime, optional): Reference time (default: current UTC time)
+
+    Returns:
+        Timestamp: Naive start date, or None when the period is unbounded ('max')
+    """
+    now = pd.Timestamp(now or datetime.utcnow()).normalize()
+    period = (period or '').strip().lower()
+
+    if period == 'max':
+        return None
+    if period == 'ytd':
+        return pd.Timestamp(year=now.year, month=1, day=1)
+
+    match = _PERIOD_PATTERN.match(period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+
+    amount, unit = int(match.group(1)), match.group(2)
+    return now - pd.DateOffset(**{_PERIOD_UNITS[unit]: amount})
+
+
+def last_session_close(now=None):
+    """Return the UTC close time of the most recent completed trading session.
+
+    Args:
+        now (datetime, optional): Reference time (default: current UTC time)
+
+    Returns:
+        datetime: Naive UTC datetime of the last session close
+    """
+    now = now or datetime.utcnow()
+    close = now.replace(hour=MARKET_CLOSE_UTC_HOUR, minute=0, second=0, microsecond=0)
+
+    if now < close:
+        close -= timedelta(days=1)
+
+    # Roll back over weekends
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+
+    return close
+
+
+def _ticker_path(ticker):
+    safe_name = re.sub(r'[^A-Z0-9._-]', '_', ticker.upper())
+    return os.path.join(PRICE_CACHE_DIR, f"{safe_name}.parquet")
+
+
+def _manifest_path():
+    return os.path.join(PRICE_CACHE_DIR, MANIFEST_NAME)
+
+
+def _atomic_replace(path, write_func):
+    """Write to a temporary file next to path and move it into place."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write_func(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_manifest():
+    """Return the parsed manifest, re-reading the file only when it has changed.
+
+    The manifest is always replaced atomically, so a new inode, mtime or
+    size means new contents.
+    """
+    global _manifest_cache
+
+    path = _manifest_path()
+    try:
+        stat = os.stat(path)
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if identity == _manifest_cache[0]:
+            return _manifest_cache[1]
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read price cache manifest: {str(e)}")
+        return {}
+
+    _manifest_cache = (identity, manifest)
+    return manifest
+
+
+def load_manifest():
+    """Load the cache manifest.
+
+    Returns:
+        dict: Mapping of ticker to manifest entry (empty if no manifest exists)
+    """
+    # Copy the entries too, so callers cannot mutate the cached parse
+    return {ticker: dict(entry) for ticker, entry in _read_manifest().items()}
+
+
+def get_manifest_entry(ticker):
+    """Return the manifest entry for a ticker, or None if it is not cached."""
+    entry = _read_manifest().get(ticker.upper())
+    if entry and os.path.exists(_ticker_path(ticker)):
+        return dict(entry)
+    return None
+
+
+@contextmanager
+def _manifest_write_lock():
+    """Serialise manifest read-modify-writes between threads and, with fcntl, processes."""
+    with _manifest_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(PRICE_CACHE_DIR, MANIFEST_LOCK_NAME), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _update_manifest(ticker, entry):
+    with _manifest_write_lock():
+        manifest = load_manifest()
+        manifest[ticker.upper()] = entry
+
+        def write(tmp_path):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+
+        _atomic_replace(_manifest_path(), write)
+
+
+def naive_dates(dates):
+    """Return a datetime Series without timezone information."""
+    dates = pd.to_datetime(dates)
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None)
+    return dates
+
+
+def covers_period(entry, start):
+    """Check whether a cached entry reaches back far enough for a period start."""
+    if entry.get('start') is None:
+        return True
+    if start is None:
+        return False
+    return pd.Timestamp(entry['start']) <= start
+
+
+def is_current(entry, now=None):
+    """Check whether a cached entry has been refreshed since the last session close."""
+    checked_at = entry.get('checked_at')
+    if not checked_at:
+        return False
+    return datetime.fromisoformat(checked_at) >= last_session_close(now)
+
+
+def read_history(ticker, start=None):
+    """Read a ticker's cached history.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        start (Timestamp, optional): Only return bars on or after this date
+
+    Returns:
+        DataFrame: Cached bars, or None if the ticker is not cached
+    """
+    path = _ticker_path(ticker)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        df = pd.read_parquet(path)
+    except Exception as e:
+        logger.warning(f"Could not read cached prices for {ticker}: {str(e)}")
+        return None
+
+    if start is not None:
+        df = df[naive_dates(df['date']) >= start].reset_index(drop=True)
+
+    return df
+
+
+def merge_history(cached, new_bars):
+    """Append newly fetched bars to cached history, preferring the newer values."""
+    if new_bars is None or new_bars.empty:
+        return cached
+
+    merged = pd.concat([cached, new_bars], ignore_index=True)
+    merged = merged.drop_duplicates(subset='date', keep='last')
+    merged = merged.sort_values('date').reset_index(drop=True)
+    return merged
+
+
+def write_history(ticker, df, start, now=None):
+    """Persist a ticker's history and record it in the manifest.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        df (DataFrame): Full history to store (must contain a 'date' column)
+        start (Timestamp): Earliest date the stored history is meant to cover,
+            or None if it is the full available history
+        now (datetime, optional): Time of the upstream check
+    """
+    try:
+        os.makedirs(PRICE_CACHE_DIR, exist_ok=True)
+        _atomic_replace(_ticker_path(ticker), lambda tmp_path: df.to_parquet(tmp_path, index=False))
+
+        dates = naive_dates(df['date'])
+        _update_manifest(ticker, {
+            'start': start.isoformat() if start is not None else None,
+            'first_date': dates.iloc[0].isoformat() if len(dates) else None,
+            'last_date': dates.iloc[-1].isoformat() if len(dates) else None,
+            'rows': int(len(df)),
+            'checked_at': (now or datetime.utcnow()).isoformat()
+        })
+    except Exception as e:
+        # A cache write failure should never fail the request that triggered it
+        logger.warning(f"Could not write cached prices for {ticker}: {str(e)}")
+
+
+def touch_entry(ticker, entry, now=None):
+    """Record that the upstream was checked and had no new bars for a ticker."""
+    entry = dict(entry)
+    entry['checked_at'] = (now or datetime.utcnow()).isoformat()
+    try:
+        _update_manifest(ticker, entry)
+    except Exception as e:
+        logger.warning(f"Could not update price cache manifest for {ticker}: {str(e)}")
@@ -0,0 +1,69 @@
+"""Shared worker-process pools for CPU-bound batch work.
+
+Uploads, backtests and parameter sweeps run inside web requests served by a
+multithreaded process. Forking such a process can copy a lock held by
+another thread (cache refreshes, prefetch threads, the price-cache manifest
+lock) into a child where nothing will ever release it, so workers are
+started with the 'forkserver' method ('spawn' where it is unavailable) and
+kept in one lazily created pool per worker count instead of a new pool per
+request.
+"""
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _start_context():
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def get_process_pool(max_workers):
+    """Return the shared pool with max_workers workers, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(max_workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=_start_context())
+            _pools[max_workers] = pool
+        return pool
+
+
+def _discard_pool(max_workers, pool):
+    """Forget a broken pool so the next call starts a fresh one."""
+    with _pools_lock:
+        if _pools.get(max_workers) is pool:
+            del _pools[max_workers]
+    pool.shutdown(wait=False)
+
+
+def run_in_workers(func, calls, max_workers):
+    """Run func(*args) for every call on the shared pool.
+
+    Args:
+        func (callable): Module-level function (it is pickled to the workers)
+        calls (dict): Key (e.g. ticker) to the tuple of positional arguments
+        max_workers (int): Size of the shared pool to use
+
+    Yields:
+        tuple: (key, result, error) as calls complete; error is the
+            exception the call raised (and result None) or None
+    """
+    pool = get_process_pool(max_workers)
+    futures = {pool.submit(func, *args): key for key, args in calls.items()}
+    for future in as_completed(futures):
+        key = futures[future]
+        try:
+            yield key, future.result(), None
+        except BrokenProcessPool as e:
+            logger.error(f"Worker pool broke while running {key}: {str(e)}")
+            _discard_pool(max_workers, pool)
+            yield key, None, e
+        except Exception as e:
+            yield key, None, e
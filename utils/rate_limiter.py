@@ -0,0 +1,115 @@
+"""Process-wide rate limiting for upstream market-data requests."""
+import os
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. Callers
+    only block when the bucket is empty, so bursts below the capacity go
+    through immediately.
+    """
+
+    def __init__(self, rate, capacity, name='limiter'):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("Rate must be positive and capacity at least 1")
+
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.name = name
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.throttled_count = 0
+        self.total_wait = 0.0
+        self.last_wait = 0.0
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def wait_time(self, tokens=1):
+        """Return how many seconds a caller would currently wait for `tokens`."""
+        with self._lock:
+            self._refill(time.monotonic())
+            deficit = tokens - self._tokens
+            return max(0.0, deficit / self.rate)
+
+    def acquire(self, tokens=1, timeout=None):
+        """Take tokens from the bucket, sleeping only while it is empty.
+
+        Args:
+            tokens (int): Number of tokens to take
+            timeout (float, optional): Maximum seconds to wait
+
+        Returns:
+            float: Seconds spent waiting
+
+        Raises:
+            TimeoutError: If the tokens cannot be obtained within `timeout`
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}")
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    if waited > 0:
+                        self.throttled_count += 1
+                        self.total_wait += waited
+                    self.last_wait = waited
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+
+            if timeout is not None and waited + delay > timeout:
+                raise TimeoutError(f"{self.name}: rate limit wait of {delay:.2f}s exceeds timeout")
+
+            if waited == 0:
+                logger.info(f"{self.name}: request budget exhausted, throttling for {delay:.2f}s")
+            time.sleep(delay)
+            waited += delay
+
+    def stats(self):
+        """Return a snapshot of the limiter state for monitoring."""
+        return {
+            'name': self.name,
+            'rate_per_second': self.rate,
+            'capacity': self.capacity,
+            'current_wait': round(self.wait_time(), 3),
+            'last_wait': round(self.last_wait, 3),
+            'throttled_count': self.throttled_count,
+            'total_wait': round(self.total_wait, 3)
+        }
+
+
+def backoff_delay(attempt, base=1.0, cap=30.0):
+    """Exponential backoff with full jitter.
+
+    Args:
+        attempt (int): Zero-based number of the failed attempt
+        base (float): Base delay in seconds
+        cap (float): Maximum delay in seconds
+
+    Returns:
+        float: Seconds to sleep before the next attempt
+    """
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+# Shared by every thread in the process that talks to Yahoo Finance
+yahoo_limiter = TokenBucket(
+    rate=float(os.getenv('YAHOO_RATE_LIMIT', '2')),
+    capacity=int(os.getenv('YAHOO_RATE_BURST', '5')),
+    name='yahoo'
+)
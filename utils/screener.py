@@ -0,0 +1,256 @@
+"""Universe screener ranking tickers by their cycle signal.
+
+Runs the process_data -> perform_fft -> detect_cycles -> recommendation
+pipeline over a whole universe of tickers, in batches, using only locally
+stored prices (the shared price store, then the on-disk price cache) so a
+screen never touches the upstream provider. Each batch is one perform_fft_batch,
+one detect_cycles_batch and one score_recommendations call.
+
+Daily bars only change at the session close, so a finished screen is cached
+until the next close and later requests only re-rank and page it.
+"""
+import os
+import logging
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from utils import price_cache
+from utils.data_processing import process_data, perform_fft_batch, detect_cycles_batch
+from utils.decision_engine import score_recommendations, TOP_CYCLES
+from utils.frame_cache import FrameCache
+from utils.shared_price_store import read_prices, stored_tickers
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated tickers, or the path of a file with one ticker per line;
+# empty means every ticker in the shared price store
+SCREENER_UNIVERSE = os.getenv('SCREENER_UNIVERSE', '')
+SCREENER_PERIOD = os.getenv('SCREENER_PERIOD', '2y')
+SCREENER_BATCH_SIZE = int(os.getenv('SCREENER_BATCH_SIZE', '250'))
+SCREENER_CACHE_MAX_BYTES = int(float(os.getenv('SCREENER_CACHE_MAX_MB', '32')) * 1024 * 1024)
+
+# Series shorter than this cannot show a meaningful cycle
+MIN_SCREEN_BARS = 64
+
+MAX_PAGE_SIZE = 500
+
+SIDES = ('buy', 'sell', 'all')
+
+# Finished screens, valid until the next session close
+screen_cache = FrameCache(max_bytes=SCREENER_CACHE_MAX_BYTES, stale_seconds=0, name='screener')
+
+
+def load_universe(spec=None):
+    """Resolve the configured screening universe.
+
+    Args:
+        spec (str, optional): Comma-separated tickers or a file path
+            (default: SCREENER_UNIVERSE)
+
+    Returns:
+        list: Unique upper-case tickers in their configured order
+    """
+    spec = SCREENER_UNIVERSE if spec is None else spec
+    if spec and os.path.isfile(spec):
+        with open(spec) as f:
+            symbols = [line.split(',')[0] for line in f if not line.startswith('#')]
+    elif spec:
+        symbols = spec.split(',')
+    else:
+        symbols = stored_tickers()
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+
+
+def _local_prices(ticker, start):
+    """Return a ticker's locally stored bars, or None if there are none."""
+    arrays = read_prices(ticker, start=start)
+    if arrays is not None and not arrays.empty:
+        return arrays
+    if price_cache.cache_available():
+        return price_cache.read_history(ticker, start=start)
+    return None
+
+
+def screen_batch(tickers, start=None):
+    """Score one batch of tickers from local prices.
+
+    Args:
+        tickers (list): Ticker symbols
+        start (Timestamp, optional): First bar to use
+
+    Returns:
+        tuple: (DataFrame with one row per scored ticker, list of tickers
+            without enough local data)
+    """
+    series, skipped = {}, []
+    for ticker in tickers:
+        data = _local_prices(ticker, start)
+        if data is None or len(data) < MIN_SCREEN_BARS:
+            skipped.append(ticker)
+            continue
+        try:
+            series[ticker] = process_data(data)
+        except Exception as e:
+            logger.warning(f"Skipped {ticker} in screen: {str(e)}")
+            skipped.append(ticker)
+
+    if not series:
+        return pd.DataFrame(), skipped
+
+    fft_results = perform_fft_batch(series)
+    cycles = detect_cycles_batch(fft_results, top_k=TOP_CYCLES)
+
+    last_two = pd.DataFrame(
+        [(np.asarray(df['price'])[-2], np.asarray(df['price'])[-1]) for df in series.values()],
+        index=pd.Index(list(series), name='ticker'), columns=['prev_price', 'last_price']
+    )
+    scores = score_recommendations(cycles, last_two)
+
+    strongest = cycles.groupby('ticker', sort=False).first()
+    scores['top_cycle'] = strongest['length']
+    scores['top_strength'] = strongest['strength']
+    scores['days_to_trough'] = strongest['days_to_trough']
+    scores['days_to_peak'] = strongest['days_to_peak']
+    scores['last_price'] = last_two['last_price']
+    scores['last_date'] = [pd.Timestamp(np.asarray(df['date'])[-1]).strftime('%Y-%m-%d')
+                           for df in series.values()]
+    return scores, skipped
+
+
+def _concat(batches):
+    batches = [scores for scores in batches if not scores.empty]
+    return pd.concat(batches) if batches else pd.DataFrame()
+
+
+def _screen_key(tickers, period):
+    digest = hashlib.sha1(','.join(tickers).encode()).hexdigest()
+    return ('screen', digest, period, price_cache.last_session_close().date())
+
+
+def iter_screen(tickers, period=SCREENER_PERIOD, batch_size=SCREENER_BATCH_SIZE):
+    """Screen a universe batch by batch, caching the finished result.
+
+    On a cache hit the whole cached screen is yielded as a single batch.
+
+    Args:
+        tickers (list): Ticker symbols
+        period (str): History each spectrum covers
+        batch_size (int): Tickers per batch
+
+    Yields:
+        tuple: (scores DataFrame of the batch, skipped tickers)
+    """
+    key = _screen_key(tickers, period)
+    cached = screen_cache.get(key)
+    if cached is not None:
+        yield cached['scores'], cached['skipped']
+        return
+
+    start = price_cache.period_start(period)
+    batches, skipped = [], []
+    for offset in range(0, len(tickers), batch_size):
+        scores, batch_skipped = screen_batch(tickers[offset:offset + batch_size], start)
+        batches.append(scores)
+        skipped.extend(batch_skipped)
+        yield scores, batch_skipped
+
+    scores = _concat(batches)
+    screen_cache.put(key, {'scores': scores, 'skipped': skipped})
+    logger.info(f"Screened {len(scores)} of {len(tickers)} tickers ({len(skipped)} without local data)")
+
+
+def run_screen(tickers, period=SCREENER_PERIOD, batch_size=SCREENER_BATCH_SIZE):
+    """Screen a universe and return (scores DataFrame, skipped tickers)."""
+    batches, skipped = [], []
+    for scores, batch_skipped in iter_screen(tickers, period=period, batch_size=batch_size):
+        batches.append(scores)
+        skipped.extend(batch_skipped)
+    return _concat(batches), skipped
+
+
+def rank_screen(scores, side='buy', action=None):
+    """Rank screen results by signal strength.
+
+    Args:
+        scores (DataFrame): Rows from screen_batch
+        side (str): 'buy' ranks the strongest net buy signal first, 'sell'
+            the strongest sell signal, 'all' either direction
+        action (str, optional): Keep only BUY, SELL or HOLD rows
+
+    Returns:
+        DataFrame: Ranked rows with a 'rank' column and ticker as a column
+    """
+    if side not in SIDES:
+        raise ValueError(f"Unknown side: {side}")
+    if scores.empty:
+        return scores
+
+    if action:
+        scores = scores[scores['action'] == action.upper()]
+    key = {'buy': -scores['overall_signal'], 'sell': scores['overall_signal'],
+           'all': -scores['overall_signal'].abs()}[side]
+    order = np.lexsort((scores.index.to_numpy(), key.to_numpy()))
+
+    ranked = scores.iloc[order].rename_axis('ticker').reset_index()
+    ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+    return ranked
+
+
+def screen_records(ranked, page=1, per_page=50):
+    """Return one page of ranked rows as JSON-ready records."""
+    per_page = max(1, min(int(per_page), MAX_PAGE_SIZE))
+    rows = ranked.iloc[(page - 1) * per_page:page * per_page]
+    rows = rows.round(4).astype(object).where(rows.notna(), None)
+    return rows.to_dict(orient='records')
+
+
+def stream_screen(tickers, period=SCREENER_PERIOD, side='buy', action=None, page=1, per_page=50,
+                  batch_size=SCREENER_BATCH_SIZE):
+    """Screen a universe, yielding NDJSON-ready messages as work completes.
+
+    Messages are {'type': 'progress', ...} after every batch, then
+    {'type': 'result', ...} for each ranked row of the requested page and
+    a final {'type': 'summary', ...}. Each batch's strongest rows are sent
+    with its progress message so a client can show candidates early.
+
+    Args:
+        tickers (list): Ticker symbols
+        period (str): History each spectrum covers
+        side (str): See rank_screen
+        action (str, optional): See rank_screen
+        page (int): 1-based page of the final ranking
+        per_page (int): Rows per page
+        batch_size (int): Tickers per batch
+
+    Yields:
+        dict: Progress, result and summary messages
+    """
+    batches, skipped, done = [], [], 0
+    for scores, batch_skipped in iter_screen(tickers, period=period, batch_size=batch_size):
+        batches.append(scores)
+        skipped.extend(batch_skipped)
+        done = min(len(tickers), done + len(scores) + len(batch_skipped))
+        yield {
+            'type': 'progress',
+            'done': done,
+            'total': len(tickers),
+            'leaders': screen_records(rank_screen(scores, side, action), per_page=5)
+        }
+
+    scores = _concat(batches)
+    ranked = rank_screen(scores, side, action)
+    for record in screen_records(ranked, page, per_page):
+        yield {'type': 'result', **record}
+
+    yield {
+        'type': 'summary',
+        'screened': len(scores),
+        'matches': len(ranked),
+        'skipped': len(skipped),
+        'page': page,
+        'per_page': per_page,
+        'pages': max(1, -(-len(ranked) // max(1, min(int(per_page), MAX_PAGE_SIZE)))),
+        'trading_day': price_cache.last_session_close().date().isoformat()
+    }
@@ -0,0 +1,211 @@
+"""Read-mostly price store shared by all worker processes via memory mapping.
+
+Each ticker is stored as two .npy files in SHARED_PRICE_STORE_DIR:
+
+- <TICKER>.prices.npy: float64 array of shape (len(FIELDS), n_bars + 1); each
+  field is one contiguous row, so the close prices are a single contiguous
+  block that np.fft can read directly
+- <TICKER>.dates.npy: datetime64[ns] array of n_bars + 1 bar dates
+
+The first column of both files holds the publish generation rather than a
+bar, so a reader can tell whether the two files came from the same write.
+
+Readers open the files with np.load(mmap_mode='r'), so every worker maps the
+same page-cache pages instead of holding its own copy. Writers replace files
+atomically; workers that mapped the previous version keep reading it until
+they notice the files have been replaced.
+"""
+import os
+import re
+import time
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SHARED_PRICE_STORE_DIR = os.getenv('SHARED_PRICE_STORE_DIR', 'price_store')
+
+FIELDS = ('open', 'high', 'low', 'price', 'volume')
+_FIELD_ROWS = {field: row for row, field in enumerate(FIELDS)}
+
+
+class PriceArrays:
+    """Zero-copy view of one ticker's bars.
+
+    Supports the subset of the DataFrame interface used by the analysis
+    functions: `arrays['price']` returns a numpy array, `len(arrays)` the
+    number of bars.
+    """
+
+    __slots__ = ('ticker', 'dates', 'values')
+
+    def __init__(self, ticker, dates, values):
+        self.ticker = ticker
+        self.dates = dates
+        self.values = values
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, field):
+        if field == 'date':
+            return self.dates
+        return self.values[_FIELD_ROWS[field]]
+
+    def __contains__(self, field):
+        return field == 'date' or field in _FIELD_ROWS
+
+    @property
+    def columns(self):
+        return ['date', *FIELDS]
+
+    @property
+    def empty(self):
+        return len(self.dates) == 0
+
+    def since(self, start):
+        """Return a view of the bars on or after start (no data is copied)."""
+        if start is None:
+            return self
+        first = int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), 'ns')))
+        return PriceArrays(self.ticker, self.dates[first:], self.values[:, first:])
+
+    def series(self, field='price'):
+        """Return one field as a date-indexed Series (for alignment across tickers)."""
+        return pd.Series(self[field], index=pd.DatetimeIndex(self.dates), name=self.ticker)
+
+    def to_frame(self):
+        """Materialize a DataFrame copy with the usual column names."""
+        frame = pd.DataFrame({field: np.array(self[field]) for field in FIELDS})
+        frame.insert(0, 'date', pd.DatetimeIndex(self.dates))
+        return frame
+
+
+def _paths(ticker):
+    safe_name = re.sub(r'[^A-Z0-9._-]', '_', ticker.upper())
+    base = os.path.join(SHARED_PRICE_STORE_DIR, safe_name)
+    return f"{base}.prices.npy", f"{base}.dates.npy"
+
+
+def _save_atomic(path, array):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+    try:
+        np.save(tmp_path, array)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+_generation_lock = threading.Lock()
+_last_generation = 0
+
+
+def _next_generation():
+    """Return a publish generation: microseconds since the epoch, strictly
+    increasing within the process and exactly representable as a float64."""
+    global _last_generation
+
+    with _generation_lock:
+        _last_generation = max(time.time_ns() // 1000, _last_generation + 1)
+        return _last_generation
+
+
+def write_prices(ticker, df):
+    """Publish a ticker's history to the shared store.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        df (DataFrame): History with a date column and any of the FIELDS columns
+    """
+    dates = pd.to_datetime(df['date'])
+    if getattr(dates.dt, 'tz', None) is not None:
+        dates = dates.dt.tz_localize(None)
+
+    order = np.argsort(dates.values, kind='stable')
+    values = np.full((len(FIELDS), len(df)), np.nan)
+    for row, field in enumerate(FIELDS):
+        if field in df.columns:
+            values[row] = pd.to_numeric(df[field], errors='coerce').to_numpy(dtype=float)[order]
+
+    # Bars without a close are useless to every consumer
+    valid = ~np.isnan(values[_FIELD_ROWS['price']])
+    generation = _next_generation()
+    values = np.concatenate([np.full((len(FIELDS), 1), float(generation)), values[:, valid]], axis=1)
+    values = np.ascontiguousarray(values)
+    dates = np.concatenate([
+        np.array([generation], dtype=np.int64).view('datetime64[ns]'),
+        dates.values[order][valid].astype('datetime64[ns]')
+    ])
+
+    prices_path, dates_path = _paths(ticker)
+    try:
+        os.makedirs(SHARED_PRICE_STORE_DIR, exist_ok=True)
+        # A reader that maps the pair mid-update sees mismatched generations
+        # and falls back to the slower path
+        _save_atomic(dates_path, dates)
+        _save_atomic(prices_path, values)
+    except Exception as e:
+        logger.warning(f"Could not publish {ticker} to the shared price store: {str(e)}")
+
+
+_mapped = {}
+_mapped_lock = threading.Lock()
+
+
+def read_prices(ticker, start=None):
+    """Map a ticker's bars from the shared store.
+
+    Args:
+        ticker (str): Stock ticker symbol
+        start (Timestamp, optional): Only include bars on or after this date
+
+    Returns:
+        PriceArrays: Read-only memory-mapped view, or None if the ticker is not stored
+    """
+    ticker = ticker.upper()
+    prices_path, dates_path = _paths(ticker)
+
+    try:
+        prices_stat, dates_stat = os.stat(prices_path), os.stat(dates_path)
+    except FileNotFoundError:
+        return None
+    # Files are replaced, never rewritten, so a new inode means a new publish
+    version = (prices_stat.st_ino, prices_stat.st_mtime_ns, dates_stat.st_ino, dates_stat.st_mtime_ns)
+
+    with _mapped_lock:
+        cached = _mapped.get(ticker)
+    if cached is not None and cached[0] == version:
+        return cached[1].since(start)
+
+    try:
+        values = np.load(prices_path, mmap_mode='r')
+        dates = np.load(dates_path, mmap_mode='r')
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not map {ticker} from the shared price store: {str(e)}")
+        return None
+
+    if values.ndim != 2 or values.shape[0] != len(FIELDS) or values.shape[1] == 0 or len(dates) == 0:
+        logger.warning(f"Shared price store entry for {ticker} is malformed")
+        return None
+
+    if values[0, 0] != float(dates[:1].view(np.int64)[0]):
+        # Caught mid-publish; the caller falls back to the slower path
+        logger.debug(f"Shared price store entry for {ticker} is being updated")
+        return None
+
+    arrays = PriceArrays(ticker, dates[1:], values[:, 1:])
+    with _mapped_lock:
+        _mapped[ticker] = (version, arrays)
+    return arrays.since(start)
+
+
+def stored_tickers():
+    """List the tickers currently in the shared store."""
+    if not os.path.isdir(SHARED_PRICE_STORE_DIR):
+        return []
+    suffix = '.prices.npy'
+    return sorted(name[:-len(suffix)] for name in os.listdir(SHARED_PRICE_STORE_DIR) if name.endswith(suffix))
@@ -0,0 +1,87 @@
+"""In-process request coalescing.
+
+When several threads ask for the same key at once, only the first one runs
+the underlying call; the rest wait for it and share its result (or error).
+"""
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key."""
+
+    def __init__(self, name='single-flight'):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed_count = 0
+        self.shared_count = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """Run func(*args, **kwargs) unless a call for key is already in flight.
+
+        Args:
+            key (hashable): Identity of the call
+            func (callable): Function to execute
+
+        Returns:
+            tuple: (result, shared) where shared is True if this caller
+                waited on another caller's in-flight call
+
+        Raises:
+            Exception: Whatever the in-flight call raised
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.shared_count += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed_count += 1
+                leader = True
+
+        if not leader:
+            logger.debug(f"{self.name}: waiting on in-flight call for {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # Later callers start a fresh call instead of reusing this result
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def stats(self):
+        """Return call counters for monitoring."""
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            'name': self.name,
+            'in_flight': in_flight,
+            'executed': self.executed_count,
+            'shared': self.shared_count
+        }
@@ -0,0 +1,192 @@
+"""Sliding DFT for incremental cycle updates.
+
+A SlidingDFT keeps the DFT bins of the last `n` prices for the cycle band
+(2-252 days by default). When a new bar arrives, the oldest sample leaves
+the window and each tracked bin is updated in O(1):
+
+    X'(k) = (X(k) - x_oldest + x_new) * exp(2j*pi*k/n)
+
+so a new bar costs O(k) for k tracked bins instead of an O(n log n) FFT.
+The Hann window is applied in the frequency domain with its three-tap
+kernel, Y(k) = 0.5 X(k) - 0.25 X(k-1) - 0.25 X(k+1), which is why the
+neighbours of the band are tracked as well. This is the periodic Hann
+window; its spectrum differs from perform_fft's symmetric window only by
+O(1/n). Rounding errors accumulate in the recursion, so the bins are
+recomputed from the sample buffer with a full FFT every `resync_every`
+updates.
+"""
+import os
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import detect_cycles
+
+logger = logging.getLogger(__name__)
+
+SLIDING_DFT_RESYNC_EVERY = int(os.getenv('SLIDING_DFT_RESYNC_EVERY', '256'))
+
+
+class SlidingDFT:
+    """Incrementally updated spectrum of a fixed-length price window.
+
+    Args:
+        prices (array-like): Initial window; its length fixes the window size
+        min_period (float): Shortest cycle (in days) to track
+        max_period (float): Longest cycle (in days) to track
+        resync_every (int): Updates between full-FFT re-synchronisations
+    """
+
+    def __init__(self, prices, min_period=2, max_period=252, resync_every=SLIDING_DFT_RESYNC_EVERY):
+        prices = pd.Series(np.asarray(prices, dtype=float)).interpolate().bfill().to_numpy()
+        n = len(prices)
+        if n < 4:
+            raise ValueError("Not enough data points for a sliding DFT")
+
+        self.n = n
+        self.min_period = min_period
+        self.max_period = max_period
+        self.resync_every = resync_every
+
+        # Band bins (as in perform_fft, bin k has a period of n / k days)
+        k = np.arange(1, n // 2 + 1)
+        periods = n / k
+        self.bins = k[(periods >= min_period) & (periods <= max_period)]
+        if len(self.bins) == 0:
+            raise ValueError(f"No DFT bins between {min_period} and {max_period} days for a {n}-bar window")
+
+        # Band bins plus their neighbours, for the Hann kernel
+        self._tracked = np.unique(np.concatenate([self.bins - 1, self.bins, self.bins + 1])) % n
+        self._position = {int(b): i for i, b in enumerate(self._tracked)}
+        self._center = np.array([self._position[int(b)] for b in self.bins])
+        self._below = np.array([self._position[int(b - 1) % n] for b in self.bins])
+        self._above = np.array([self._position[int(b + 1) % n] for b in self.bins])
+        self._twiddle = np.exp(2j * np.pi * self._tracked / n)
+
+        # Ring buffer of the window; _head is the index of the oldest sample
+        self._buffer = prices.copy()
+        self._head = 0
+        self.updates = 0
+        self.resyncs = 0
+        self.resync()
+
+    def window(self):
+        """Return the current window in chronological order."""
+        return np.roll(self._buffer, -self._head)
+
+    def resync(self):
+        """Recompute the tracked bins from the buffer with a full FFT."""
+        self._spectrum = np.fft.fft(self.window())[self._tracked]
+        self._since_resync = 0
+        self.resyncs += 1
+
+    def update(self, price):
+        """Slide the window forward by one bar.
+
+        Args:
+            price (float): The new bar's price; NaN repeats the previous price
+        """
+        price = float(price)
+        if np.isnan(price):
+            price = self._buffer[self._head - 1]
+
+        oldest = self._buffer[self._head]
+        self._buffer[self._head] = price
+        self._head = (self._head + 1) % self.n
+
+        self._spectrum += price - oldest
+        self._spectrum *= self._twiddle
+        self.updates += 1
+
+        self._since_resync += 1
+        if self._since_resync >= self.resync_every:
+            self.resync()
+
+    def extend(self, prices):
+        """Apply several new bars in order."""
+        for price in np.asarray(prices, dtype=float):
+            self.update(price)
+
+    def fft_results(self):
+        """Return the windowed band spectrum in the perform_fft results format.
+
+        Returns:
+            dict: 'frequencies', 'periods', 'amplitudes' and 'phases' for the
+                tracked band, ready for detect_cycles
+        """
+        spectrum = self._spectrum
+        windowed = 0.5 * spectrum[self._center] - 0.25 * (spectrum[self._below] + spectrum[self._above])
+        frequencies = self.bins / self.n
+        return {
+            'frequencies': frequencies,
+            'periods': 1 / frequencies,
+            'amplitudes': np.abs(windowed) / (self.n / 2),
+            'phases': np.angle(windowed)
+        }
+
+    def cycles(self, strength_threshold=0.1):
+        """Return the current dominant cycles (see detect_cycles)."""
+        return detect_cycles(self.fft_results(), min_period=self.min_period,
+                             max_period=self.max_period, strength_threshold=strength_threshold)
+
+
+class LiveCycleTracker:
+    """Per-ticker sliding DFT states for keeping dominant cycles live.
+
+    Args:
+        window (int): Bars per window; shorter histories use their full length
+        min_period (float): Shortest cycle (in days) to track
+        max_period (float): Longest cycle (in days) to track
+    """
+
+    def __init__(self, window=504, min_period=2, max_period=252):
+        self.window = window
+        self.min_period = min_period
+        self.max_period = max_period
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def sync(self, ticker, df):
+        """Bring a ticker's spectrum up to date with its price history.
+
+        The first call seeds the state from the last `window` bars; later
+        calls only apply the bars dated after the last one seen.
+
+        Args:
+            ticker (str): Stock ticker symbol
+            df (DataFrame or PriceArrays): Processed price data
+
+        Returns:
+            SlidingDFT: The ticker's up-to-date state
+        """
+        ticker = ticker.upper()
+        dates = pd.DatetimeIndex(np.asarray(df['date']))
+        prices = np.asarray(df['price'], dtype=float)
+
+        with self._lock:
+            entry = self._states.get(ticker)
+            if entry is not None:
+                state, last_date = entry
+                new = dates > last_date
+                if new.any():
+                    state.extend(prices[new])
+                    self._states[ticker] = (state, dates[new][-1])
+                return state
+
+            state = SlidingDFT(prices[-self.window:], self.min_period, self.max_period)
+            self._states[ticker] = (state, dates[-1])
+            return state
+
+    def cycles(self, ticker, df, strength_threshold=0.1):
+        """Sync a ticker and return its dominant cycles."""
+        return self.sync(ticker, df).cycles(strength_threshold)
+
+    def drop(self, ticker):
+        """Forget a ticker's state."""
+        with self._lock:
+            self._states.pop(ticker.upper(), None)
+
+    def __len__(self):
+        return len(self._states)
@@ -0,0 +1,324 @@
+"""Indexed ticker search over a symbol master file.
+
+The index combines three structures:
+
+- a prefix trie over symbols, where every node keeps its best-ranked
+  completions so autocomplete is a walk of len(query) steps
+- an inverted index from company-name tokens to symbols, with a sorted
+  vocabulary for prefix matching of the last (partially typed) token
+- a symmetric-delete table (all single-character deletions) for symbols
+  and name tokens, giving edit-distance-1 and transposition tolerance
+"""
+import os
+import re
+import heapq
+import bisect
+import logging
+import threading
+from collections import defaultdict
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SYMBOL_MASTER_PATH = os.getenv('SYMBOL_MASTER_PATH', 'data/symbols.csv')
+
+# Completions kept per trie node; also the largest supported result limit
+TRIE_TOP_K = 20
+
+# Vocabulary entries expanded for a partial name token
+MAX_PREFIX_EXPANSION = 64
+
+# Tokens too common in company names to be useful on their own
+STOP_TOKENS = frozenset({
+    'inc', 'corp', 'corporation', 'co', 'company', 'ltd', 'limited', 'plc',
+    'the', 'and', 'of', 'sa', 'ag', 'nv', 'llc', 'lp', 'holdings', 'group',
+    'class', 'common', 'stock', 'shares', 'ordinary'
+})
+
+# Used when no symbol master file is available
+DEFAULT_SYMBOLS = {
+    'AAPL': 'Apple Inc.',
+    'MSFT': 'Microsoft Corporation',
+    'GOOG': 'Alphabet Inc.',
+    'GOOGL': 'Alphabet Inc.',
+    'AMZN': 'Amazon.com, Inc.',
+    'FB': 'Meta Platforms, Inc.',
+    'TSLA': 'Tesla, Inc.',
+    'NVDA': 'NVIDIA Corporation',
+    'JPM': 'JPMorgan Chase & Co.',
+    'V': 'Visa Inc.',
+    'JNJ': 'Johnson & Johnson',
+    'WMT': 'Walmart Inc.',
+    'BAC': 'Bank of America Corporation',
+    'PG': 'The Procter & Gamble Company',
+    'MA': 'Mastercard Incorporated',
+    'DIS': 'The Walt Disney Company',
+    'NFLX': 'Netflix, Inc.',
+    'XOM': 'Exxon Mobil Corporation',
+    'T': 'AT&T Inc.',
+    'INTC': 'Intel Corporation'
+}
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Match-type scores; higher wins, popularity breaks ties
+SCORE_EXACT_SYMBOL = 100.0
+SCORE_SYMBOL_PREFIX = 80.0
+SCORE_NAME_TOKEN = 40.0
+SCORE_NAME_PREFIX = 25.0
+SCORE_FUZZY_SYMBOL = 20.0
+SCORE_FUZZY_TOKEN = 15.0
+
+
+def tokenize(text):
+    """Split a company name or query into lower-case alphanumeric tokens."""
+    return _TOKEN_PATTERN.findall(str(text).lower())
+
+
+def _deletes(term):
+    """Return all single-character deletions of a term."""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class _TrieNode:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+class SymbolIndex:
+    """In-memory search index over a symbol universe.
+
+    Args:
+        symbols (DataFrame): Columns 'symbol' and 'name', plus optional
+            'rank' (higher is more popular), 'exchange' and 'sector'
+    """
+
+    def __init__(self, symbols):
+        symbols = symbols.dropna(subset=['symbol']).drop_duplicates(subset='symbol')
+        self.symbols = symbols['symbol'].astype(str).str.upper().tolist()
+        self.names = symbols['name'].fillna('').astype(str).tolist()
+        self.exchanges = symbols['exchange'].tolist() if 'exchange' in symbols else None
+        self.sectors = symbols['sector'].tolist() if 'sector' in symbols else None
+
+        if 'rank' in symbols:
+            self.ranks = pd.to_numeric(symbols['rank'], errors='coerce').fillna(0).tolist()
+        else:
+            # Without popularity data, prefer shorter (usually primary) symbols
+            self.ranks = [-len(symbol) for symbol in self.symbols]
+
+        self._symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._build_trie()
+        self._build_token_index()
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _build_trie(self):
+        self._trie = _TrieNode()
+
+        # Insert in rank order so each node's top list is already sorted
+        order = sorted(range(len(self.symbols)), key=lambda i: (-self.ranks[i], self.symbols[i]))
+        for symbol_id in order:
+            node = self._trie
+            for char in self.symbols[symbol_id]:
+                node = node.children.setdefault(char, _TrieNode())
+                if len(node.top) < TRIE_TOP_K:
+                    node.top.append(symbol_id)
+
+    def _build_token_index(self):
+        postings = defaultdict(list)
+        for symbol_id, name in enumerate(self.names):
+            for token in set(tokenize(name)):
+                if token not in STOP_TOKENS:
+                    postings[token].append(symbol_id)
+
+        self._postings = dict(postings)
+        self._vocabulary = sorted(self._postings)
+
+        deletes = defaultdict(set)
+        for token in self._vocabulary:
+            if len(token) > 2:
+                for variant in _deletes(token):
+                    deletes[variant].add(token)
+        self._token_deletes = dict(deletes)
+
+        symbol_deletes = defaultdict(set)
+        for symbol_id, symbol in enumerate(self.symbols):
+            if len(symbol) > 1:
+                for variant in _deletes(symbol):
+                    symbol_deletes[variant].add(symbol_id)
+        self._symbol_deletes = dict(symbol_deletes)
+
+    def _symbol_prefix(self, prefix):
+        node = self._trie
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.top
+
+    def _fuzzy_symbols(self, query):
+        candidates = set(self._symbol_deletes.get(query, ()))
+        for variant in _deletes(query) | {query}:
+            candidates.update(self._symbol_deletes.get(variant, ()))
+            symbol_id = self._symbol_ids.get(variant)
+            if symbol_id is not None:
+                candidates.add(symbol_id)
+        return candidates
+
+    def _prefix_tokens(self, prefix):
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + '\uffff', lo=start)
+        return self._vocabulary[start:min(end, start + MAX_PREFIX_EXPANSION)]
+
+    def _fuzzy_tokens(self, token):
+        matches = set(self._token_deletes.get(token, ()))
+        for variant in _deletes(token):
+            if variant in self._postings:
+                matches.add(variant)
+            matches.update(self._token_deletes.get(variant, ()))
+        matches.discard(token)
+        return matches
+
+    def search(self, query, limit=10):
+        """Return the best matches for a query.
+
+        Args:
+            query (str): Symbol or company-name fragment
+            limit (int): Maximum number of results
+
+        Returns:
+            list: Dicts with 'ticker' and 'company' (plus 'exchange' and
+                'sector' when the symbol master has them), best match first
+        """
+        query = (query or '').strip()
+        if not query:
+            return []
+
+        limit = min(limit, TRIE_TOP_K)
+        scores = defaultdict(float)
+
+        # Symbol matches
+        symbol_query = query.upper()
+        exact_id = self._symbol_ids.get(symbol_query)
+        if exact_id is not None:
+            scores[exact_id] += SCORE_EXACT_SYMBOL
+        for symbol_id in self._symbol_prefix(symbol_query):
+            scores[symbol_id] += SCORE_SYMBOL_PREFIX - len(self.symbols[symbol_id]) + len(symbol_query)
+        if len(symbol_query) > 1 and len(scores) < limit:
+            for symbol_id in self._fuzzy_symbols(symbol_query):
+                scores[symbol_id] += SCORE_FUZZY_SYMBOL
+
+        # Company name matches; the last token may still be being typed
+        tokens = [token for token in tokenize(query) if token not in STOP_TOKENS]
+        for position, token in enumerate(tokens):
+            is_last = position == len(tokens) - 1
+            token_scores = {}
+
+            for symbol_id in self._postings.get(token, ()):
+                token_scores[symbol_id] = SCORE_NAME_TOKEN
+
+            if is_last and len(token) >= 2:
+                for vocab_token in self._prefix_tokens(token):
+                    if vocab_token == token:
+                        continue
+                    for symbol_id in self._postings[vocab_token]:
+                        token_scores.setdefault(symbol_id, SCORE_NAME_PREFIX)
+
+            if not token_scores and len(token) > 2:
+                for vocab_token in self._fuzzy_tokens(token):
+                    for symbol_id in self._postings[vocab_token]:
+                        token_scores.setdefault(symbol_id, SCORE_FUZZY_TOKEN)
+
+            for symbol_id, score in token_scores.items():
+                scores[symbol_id] += score
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], self.ranks[item[0]]))
+        return [self._result(symbol_id) for symbol_id, _ in best]
+
+    def _result(self, symbol_id):
+        result = {'ticker': self.symbols[symbol_id], 'company': self.names[symbol_id]}
+        if self.exchanges is not None:
+            result['exchange'] = self.exchanges[symbol_id]
+        if self.sectors is not None:
+            result['sector'] = self.sectors[symbol_id]
+        return result
+
+    def sector_of(self, ticker):
+        """Return the sector for a ticker, or None if unknown."""
+        symbol_id = self._symbol_ids.get(ticker.upper())
+        if symbol_id is None or self.sectors is None:
+            return None
+        return self.sectors[symbol_id]
+
+
+def load_symbol_master(path):
+    """Load a symbol master file into the columns SymbolIndex expects.
+
+    Accepts CSV or Parquet files whose columns use common names such as
+    Symbol/Ticker, Name/Company/Security Name, Exchange, Sector and
+    MarketCap/Rank.
+
+    Args:
+        path (str): Path to a .csv or .parquet file
+
+    Returns:
+        DataFrame: Columns symbol, name and any optional columns found
+    """
+    if path.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, dtype=str, keep_default_na=False)
+
+    aliases = {
+        'symbol': ('symbol', 'ticker', 'act symbol', 'nasdaq symbol'),
+        'name': ('name', 'company', 'company name', 'security name', 'description'),
+        'exchange': ('exchange', 'listing exchange'),
+        'sector': ('sector', 'gics sector', 'industry'),
+        'rank': ('rank', 'market cap', 'marketcap', 'market_cap', 'volume')
+    }
+
+    lower_columns = {col.strip().lower(): col for col in df.columns}
+    columns = {}
+    for target, candidates in aliases.items():
+        for candidate in candidates:
+            if candidate in lower_columns:
+                columns[lower_columns[candidate]] = target
+                break
+
+    if 'symbol' not in columns.values():
+        raise ValueError(f"No symbol column found in {path}")
+
+    df = df[list(columns)].rename(columns=columns)
+    if 'name' not in df:
+        df['name'] = ''
+    return df
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_symbol_index():
+    """Return the process-wide symbol index, building it on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            symbols = None
+            if os.path.exists(SYMBOL_MASTER_PATH):
+                try:
+                    symbols = load_symbol_master(SYMBOL_MASTER_PATH)
+                except Exception as e:
+                    logger.error(f"Could not load symbol master {SYMBOL_MASTER_PATH}: {str(e)}")
+
+            if symbols is None:
+                logger.warning("No symbol master file found; ticker search is limited to common tickers")
+                symbols = pd.DataFrame({'symbol': list(DEFAULT_SYMBOLS), 'name': list(DEFAULT_SYMBOLS.values())})
+
+            _index = SymbolIndex(symbols)
+            logger.info(f"Built ticker search index over {len(_index)} symbols")
+        return _index
@@ -123,7 +123,7 @@ def create_frequency_plot(fft_results):
     """Create an interactive plot of the frequency domain analysis.
     
     Args:
-        fft_results (dict): Results from the FFT analysis
+        fft_results (FFTResult or dict): Results from the FFT analysis
         
     Returns:
         dict: Plotly figure as JSON for rendering in the browser
@@ -226,6 +226,82 @@ def create_frequency_plot(fft_results):
         logger.error(f"Error creating frequency plot: {str(e)}")
         raise
 
+def create_spectrogram_plot(stft_results, ticker=None):
+    """Create a heatmap of how cycle strengths evolved over time.
+    
+    Args:
+        stft_results (dict): Results from perform_stft
+        ticker (str, optional): Ticker shown in the title
+        
+    Returns:
+        dict: Plotly figure as JSON for rendering in the browser
+    """
+    try:
+        dates = stft_results['dates']
+        periods = np.asarray(stft_results['periods'])
+        amplitudes = np.asarray(stft_results['amplitudes'])
+        dominant = stft_results['cycles']
+        dominant = dominant[dominant['rank'] == 1]
+        
+        # Periods run from long to short; plot them ascending
+        order = np.argsort(periods)
+        
+        fig = go.Figure()
+        
+        fig.add_trace(go.Heatmap(
+            x=dates,
+            y=periods[order],
+            z=amplitudes[:, order].T,
+            colorscale='Viridis',
+            colorbar=dict(title='Amplitude'),
+            hovertemplate='<b>Window end:</b> %{x}<br><b>Period:</b> %{y:.1f} days<br><b>Amplitude:</b> %{z:.4f}<extra></extra>'
+        ))
+        
+        # Trace the strongest cycle of each window
+        fig.add_trace(go.Scatter(
+            x=dominant['date'],
+            y=dominant['length'],
+            mode='lines+markers',
+            name='Dominant Cycle',
+            line=dict(color='rgba(255, 127, 14, 1)', width=2),
+            marker=dict(size=4),
+            hovertemplate='<b>Window end:</b> %{x}<br><b>Dominant cycle:</b> %{y:.1f} days<extra></extra>'
+        ))
+        
+        title = 'Cycle History (Rolling Spectrum)'
+        if ticker:
+            title = f'{ticker} {title}'
+        
+        fig.update_layout(
+            title={
+                'text': title,
+                'font': {'size': 24}
+            },
+            xaxis_title='Window End Date',
+            yaxis_title='Period (days)',
+            showlegend=True,
+            legend=dict(
+                orientation='h',
+                yanchor='bottom',
+                y=1.02,
+                xanchor='right',
+                x=1
+            ),
+            margin=dict(l=40, r=40, t=100, b=40),
+            template='plotly_white',
+            plot_bgcolor='rgba(255,255,255,1)',
+            paper_bgcolor='rgba(255,255,255,1)'
+        )
+        
+        fig.update_yaxes(type='log')
+        
+        fig_dict = fig.to_dict()
+        return convert_numpy_to_lists(fig_dict)
+    
+    except Exception as e:
+        logger.error(f"Error creating spectrogram plot: {str(e)}")
+        raise
+
 def create_forecast_plot(df, dominant_cycles, forecast_days=30):
     """Create a forecast plot based on detected cycles.
     